@@ -0,0 +1,189 @@
+"""
+前端静态文件的内存缓存。
+
+- 启动时遍历一次静态文件夹，之后不再逐个请求检查文件是否存在
+- 每个文件第一次被请求时读入内存，计算内容哈希作为 ETag，
+  可压缩的文件同时生成 gzip（以及安装了 brotli 时的 br）版本；
+  较大且不可压缩的文件（图片、字体等）使用 mmap，不占用额外内存
+- 请求的 If-None-Match 包含所选版本的 ETag 时返回 304
+- _next/static 下的文件名带有内容哈希，标记为 immutable 长期缓存；
+  其他文件（HTML 等）每次向服务端验证 ETag
+
+文件夹的内容在启动后不再变化（打包后的程序、next build 的输出），
+前端重新构建后需要重启后端。
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import mmap
+import os
+import threading
+
+# 大于此大小且不压缩的文件使用 mmap
+MMAP_THRESHOLD = 256 * 1024
+# 小于此大小的文件压缩后收益不大
+MIN_COMPRESS_SIZE = 512
+# 流式发送 mmap 文件时每块的大小
+CHUNK_SIZE = 64 * 1024
+
+IMMUTABLE_PREFIX = "_next/static/"
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+_COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "application/wasm",
+    "application/xml",
+    "image/svg+xml",
+    "text/javascript",
+}
+
+
+def import_brotli():
+    """brotli 是可选依赖，未安装时只提供 gzip"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _compressible(mimetype):
+    return mimetype.startswith("text/") or mimetype in _COMPRESSIBLE_TYPES
+
+
+def accepted_encodings(header):
+    """Accept-Encoding 中可以使用（q 不为 0）的编码"""
+    encodings = set()
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+class Asset:
+    """一个静态文件：原始内容与各压缩版本，body 为 bytes 或 mmap"""
+
+    __slots__ = ("mimetype", "cache_control", "size", "body", "etag", "variants")
+
+    def __init__(self, full_path, relative_path, brotli):
+        mimetype = mimetypes.guess_type(relative_path)[0] or "application/octet-stream"
+        if mimetype.startswith("text/") or mimetype == "application/javascript":
+            mimetype += "; charset=utf-8"
+        self.mimetype = mimetype
+        immutable = relative_path.startswith(IMMUTABLE_PREFIX)
+        self.cache_control = IMMUTABLE_CACHE if immutable else REVALIDATE_CACHE
+
+        compress = _compressible(mimetype.split(";")[0])
+        with open(full_path, "rb") as f:
+            self.size = os.fstat(f.fileno()).st_size
+            if not compress and self.size >= MMAP_THRESHOLD:
+                self.body = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                self.body = f.read()
+
+        digest = hashlib.sha256(self.body).hexdigest()[:20]
+        self.etag = f'"{digest}"'
+        # 编码 -> (内容, ETag)，只保留比原文件小的版本
+        self.variants = {}
+        if compress and self.size >= MIN_COMPRESS_SIZE:
+            candidates = [("gzip", gzip.compress(self.body, 9, mtime=0))]
+            if brotli is not None:
+                candidates.append(("br", brotli.compress(self.body)))
+            for encoding, data in candidates:
+                if len(data) < self.size:
+                    self.variants[encoding] = (data, f'"{digest}-{encoding}"')
+
+    @staticmethod
+    def matches(if_none_match, etag):
+        """
+        If-None-Match 是否包含所发送版本的 ETag。
+        各编码版本的 ETag 不同，只与本次选择的版本比较：
+        客户端缓存的 gzip 版本不能让只接受原文的请求得到 304
+        """
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag in tags
+
+    def select(self, accept_encoding):
+        """按 Accept-Encoding 选择版本，返回 (内容, ETag, 编码)"""
+        if self.variants:
+            accepted = accepted_encodings(accept_encoding)
+            for encoding in ("br", "gzip"):
+                if encoding in accepted and encoding in self.variants:
+                    data, etag = self.variants[encoding]
+                    return data, etag, encoding
+        return self.body, self.etag, None
+
+    def respond(self, if_none_match=None, accept_encoding=None):
+        """
+        按请求头生成响应，返回 (状态码, 内容, 响应头)。
+        内容为 bytes，或 mmap 文件分块的迭代器
+        """
+        data, etag, encoding = self.select(accept_encoding)
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if self.variants:
+            headers["Vary"] = "Accept-Encoding"
+        if self.matches(if_none_match, etag):
+            return 304, b"", headers
+        headers["Content-Type"] = self.mimetype
+        headers["Content-Length"] = str(len(data))
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        if isinstance(data, mmap.mmap):
+            return 200, _chunks(data), headers
+        return 200, data, headers
+
+
+def _chunks(data):
+    for start in range(0, len(data), CHUNK_SIZE):
+        yield data[start : start + CHUNK_SIZE]
+
+
+class AssetIndex:
+    """静态文件夹的索引，文件在第一次请求时载入"""
+
+    def __init__(self, folder, fallback="index.html"):
+        self.folder = os.path.abspath(folder)
+        self.fallback = fallback
+        self._brotli = import_brotli()
+        self._lock = threading.Lock()
+        # 相对路径（以 / 分隔）-> 完整路径
+        self.paths = {}
+        # 相对路径 -> 已载入的 Asset
+        self._assets = {}
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                full_path = os.path.join(root, name)
+                relative = os.path.relpath(full_path, self.folder)
+                self.paths[relative.replace(os.sep, "/")] = full_path
+
+    def get(self, path):
+        """
+        取得 path 对应的文件；不存在时返回入口页面（前端路由），
+        入口页面也不存在时返回 None
+        """
+        if path not in self.paths:
+            path = self.fallback
+            if path not in self.paths:
+                return None
+        asset = self._assets.get(path)
+        if asset is None:
+            with self._lock:
+                asset = self._assets.get(path)
+                if asset is None:
+                    asset = Asset(self.paths[path], path, self._brotli)
+                    self._assets[path] = asset
+        return asset
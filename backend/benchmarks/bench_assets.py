@@ -0,0 +1,130 @@
+"""
+前端静态文件：原来的 send_from_directory vs AssetIndex。
+模拟浏览器打开页面（首次加载）与刷新（带 If-None-Match 重新验证），
+比较每次加载的耗时与传输的字节数。
+
+默认使用 ../frontend/out（需先 next build），不存在时生成一个类似结构的临时目录。
+
+用法: python benchmarks/bench_assets.py [静态文件夹] [加载次数]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask import Flask, send_from_directory
+from server import create_app
+
+BROWSER_HEADERS = {"Accept-Encoding": "gzip, deflate, br"}
+
+
+def legacy_app(static_folder):
+    """改动前 serve_frontend 的实现"""
+    app = Flask(__name__, static_folder=static_folder, static_url_path="/")
+
+    @app.route("/", defaults={"path": ""})
+    @app.route("/<path:path>")
+    def serve_frontend(path):
+        if path != "" and os.path.exists(os.path.join(app.static_folder, path)):
+            return send_from_directory(app.static_folder, path)
+        else:
+            return send_from_directory(app.static_folder, "index.html")
+
+    return app
+
+
+def _words(rng, count):
+    words = ["function", "return", "const", "calculator", "expression", "=>", "{}"]
+    return " ".join(rng.choice(words) for _ in range(count))
+
+
+def make_site(folder):
+    """与 next build 输出类似：HTML、带哈希的 JS/CSS 块、字体与图标"""
+    rng = random.Random(0)
+    files = {"index.html": f"<!DOCTYPE html><html>{_words(rng, 2000)}</html>"}
+    for i in range(12):
+        files[f"_next/static/chunks/chunk-{i:02x}{rng.getrandbits(32):08x}.js"] = (
+            _words(rng, rng.randint(2000, 30000))
+        )
+    files["_next/static/css/app-5f3a91.css"] = _words(rng, 8000)
+    for path, text in files.items():
+        full_path = os.path.join(folder, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w", encoding="utf-8") as f:
+            f.write(text)
+    binary = {
+        "_next/static/media/font-a1b2c3.woff2": 60000,
+        "favicon.ico": 15000,
+    }
+    for path, size in binary.items():
+        full_path = os.path.join(folder, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "wb") as f:
+            f.write(rng.randbytes(size))
+
+
+def site_paths(folder):
+    paths = [""]
+    for root, _, files in os.walk(folder):
+        for name in files:
+            relative = os.path.relpath(os.path.join(root, name), folder)
+            paths.append(relative.replace(os.sep, "/"))
+    return paths
+
+
+def load(client, paths, etags=None):
+    """加载一次全部文件，返回 (耗时, 传输字节数, 各文件的 ETag)"""
+    transferred = 0
+    new_etags = {}
+    start = time.perf_counter()
+    for path in paths:
+        headers = dict(BROWSER_HEADERS)
+        if etags and etags.get(path):
+            headers["If-None-Match"] = etags[path]
+        response = client.get("/" + path, headers=headers)
+        transferred += len(response.data)
+        new_etags[path] = response.headers.get("ETag")
+    return time.perf_counter() - start, transferred, new_etags
+
+
+def bench(name, app, paths, count):
+    client = app.test_client()
+    first = reload = float("inf")
+    for _ in range(count):
+        elapsed, first_bytes, etags = load(client, paths)
+        first = min(first, elapsed)
+        elapsed, reload_bytes, _ = load(client, paths, etags)
+        reload = min(reload, elapsed)
+    print(
+        f"{name:22}{first * 1e3:10.2f}{first_bytes / 1024:10.1f}"
+        f"{reload * 1e3:10.2f}{reload_bytes / 1024:10.1f}"
+    )
+
+
+def run(folder, count):
+    paths = site_paths(folder)
+    total = sum(os.path.getsize(os.path.join(folder, p)) for p in paths if p)
+    print(f"{folder}: {len(paths) - 1} 个文件，共 {total / 1024:.1f} KiB")
+    print(f"{'':22}{'首次 ms':>8}{'首次 KiB':>8}{'刷新 ms':>8}{'刷新 KiB':>8}")
+    bench("send_from_directory", legacy_app(folder), paths, count)
+    bench("AssetIndex", create_app(folder, instrument=False), paths, count)
+
+
+def main():
+    default = os.path.join(os.path.dirname(__file__), "../frontend/out")
+    folder = sys.argv[1] if len(sys.argv) > 1 else default
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    if os.path.exists(folder):
+        run(os.path.abspath(folder), count)
+        return
+    with tempfile.TemporaryDirectory() as folder:
+        make_site(folder)
+        run(folder, count)
+
+
+if __name__ == "__main__":
+    main()
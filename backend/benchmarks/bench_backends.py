@@ -0,0 +1,59 @@
+"""
+数值后端吞吐量：同一组表达式分别用 float 与不同精度的 decimal 后端求值
+
+用法: python benchmarks/bench_backends.py [重复次数]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from evaluator import compile_postfix
+from numeric import FLOAT, decimal_backend
+from preprocess import preprocess_tokens, tokenize_text, tokens_to_postfix
+
+CORPUS = [
+    "1+2*3-4/5",
+    "(1/3+1/7)*21",
+    "2^10-3^5",
+    "12.5 mod 3+Ans",
+    "sqrt(2)*sqrt(8)",
+    "cbrt(27)+abs(-4)",
+    "ln(10)+log(1000)",
+    "sin(30)+cos(60)+tan(45)",
+    "arcsin(0.5)+arctan(1)",
+    "10!/(3!*7!)",
+    "(10 nCr 3)+(10 nPr 3)",
+    "π*e^2",
+    "M*1.5+Ans^2",
+]
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    postfixes = [
+        tokens_to_postfix(preprocess_tokens(tokenize_text(text))) for text in CORPUS
+    ]
+    state = {"_current_ans": 1.5, "memory": 2, "angle_mode": "Deg"}
+    backends = [("float", FLOAT)] + [
+        (f"decimal({p})", decimal_backend(p)) for p in (28, 50, 100)
+    ]
+
+    baseline = None
+    print(f"{len(CORPUS)} 个表达式，重复 {repeat} 次")
+    for name, backend in backends:
+        programs = [compile_postfix(p, "Deg", backend) for p in postfixes]
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for program in programs:
+                program.run(state)
+        elapsed = time.perf_counter() - start
+        rate = repeat * len(programs) / elapsed
+        baseline = baseline or rate
+        print(f"{name:>13}: {rate:10.0f} 个/秒  (float 的 {rate / baseline:.3f} 倍)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+光标编辑：旧的 handle_input（每次按键都查找 "|" 并在列表中间插入/删除）
+与 ExpressionBuffer（间隙缓冲）的单键耗时对比
+
+用法: python benchmarks/bench_buffer.py [重复次数]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from buffer import ExpressionBuffer
+
+KEYS = ["1", "+", "←", "2", "DEL", "→", "*", "←", "←", "3"]
+
+
+def legacy_edit(expression, key):
+    """旧实现中与光标相关的部分"""
+    if "|" not in expression:
+        expression.append("|")
+    cursor_index = expression.index("|")
+    if key == "DEL":
+        if cursor_index > 0:
+            expression.pop(cursor_index - 1)
+        elif cursor_index < len(expression) - 1:
+            expression.pop(cursor_index + 1)
+    elif key == "←":
+        if cursor_index > 0:
+            expression[cursor_index - 1 : cursor_index + 1] = [
+                "|",
+                expression[cursor_index - 1],
+            ]
+    elif key == "→":
+        if cursor_index < len(expression) - 1:
+            expression[cursor_index : cursor_index + 2] = [
+                expression[cursor_index + 1],
+                "|",
+            ]
+    else:
+        expression.insert(cursor_index, key)
+    return expression
+
+
+def buffer_edit(buffer, key):
+    if key == "DEL":
+        buffer.delete_left() or buffer.delete_right()
+    elif key == "←":
+        buffer.move_left()
+    elif key == "→":
+        buffer.move_right()
+    else:
+        buffer.insert(key)
+    return buffer
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for size in (10, 1000, 100000):
+        # 光标位于表达式中间
+        wire = ["1"] * (size // 2) + ["|"] + ["1"] * (size - size // 2)
+
+        expression = list(wire)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for key in KEYS:
+                legacy_edit(expression, key)
+        old = (time.perf_counter() - start) / (repeat * len(KEYS))
+
+        buffer = ExpressionBuffer.from_wire(wire)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for key in KEYS:
+                buffer_edit(buffer, key)
+        new = (time.perf_counter() - start) / (repeat * len(KEYS))
+
+        assert buffer.to_wire() == expression, size
+        print(
+            f"{size:>7} 个 token: 列表 {old * 1e6:8.2f} µs  "
+            f"间隙缓冲 {new * 1e6:6.2f} µs"
+        )
+
+
+if __name__ == "__main__":
+    main()
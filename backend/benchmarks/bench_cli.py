@@ -0,0 +1,57 @@
+"""
+命令行批量计算的吞吐量：当前进程 vs 进程池（结果按输入顺序，两者须一致）
+
+用法: python benchmarks/bench_cli.py [表达式数] [工作进程数]
+"""
+
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import cli
+
+
+def make_lines(count, seed=0):
+    """文本与 token 列表各半，约十分之一是重复的表达式"""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(count):
+        if rng.random() < 0.1 and lines:
+            lines.append(rng.choice(lines))
+        elif i % 2:
+            a, b = rng.randint(1, 999), rng.randint(1, 99)
+            lines.append(json.dumps(f"{a}*sin({b})+sqrt({a})/{b}") + "\n")
+        else:
+            tokens = list(str(rng.randint(1, 9999))) + ["+"] + list(str(rng.random()))
+            lines.append(json.dumps(tokens) + "\n")
+    return lines
+
+
+def measure(lines, workers):
+    output = io.StringIO()
+    start = time.perf_counter()
+    cli.run(lines, output, workers=workers)
+    return time.perf_counter() - start, output.getvalue()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 2
+    lines = make_lines(count)
+
+    serial, expected = measure(lines, 0)
+    parallel, actual = measure(lines, workers)
+    assert actual == expected, "进程池的输出与当前进程不同"
+
+    print(f"{count} 个表达式")
+    print(f"  当前进程:       {count / serial:,.0f} 个/秒")
+    print(f"  {workers} 个工作进程: {count / parallel:,.0f} 个/秒")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+排列组合：阶乘相除的旧算法 vs math.perm / math.comb，并核对结果一致
+
+用法: python benchmarks/bench_combinatorics.py
+"""
+
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from numeric import FLOAT
+
+
+def legacy_perm(n, r):
+    return math.factorial(n) // math.factorial(n - r)
+
+
+def legacy_comb(n, r):
+    return math.factorial(n) // (math.factorial(n - r) * math.factorial(r))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    cases = [
+        (1000, 3),
+        (1000, 500),
+        (10000, 3),
+        (10000, 5000),
+        (100000, 3),
+        (100000, 50000),
+    ]
+    for token, legacy in (("nPr", legacy_perm), ("nCr", legacy_comb)):
+        for n, r in cases:
+            old, old_time = timed(legacy, n, r)
+            new, new_time = timed(FLOAT.binary_ops[token], float(n), float(r))
+            assert old == new, (token, n, r)
+            print(
+                f"{n:>6} {token} {r:<6} 旧 {old_time * 1000:9.2f} ms  "
+                f"新 {new_time * 1000:9.2f} ms  加速 {old_time / max(new_time, 1e-9):8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
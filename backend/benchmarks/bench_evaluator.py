@@ -0,0 +1,50 @@
+"""
+后缀表达式求值开销：每次重新编译 vs 编译一次、重复执行
+
+用法: python benchmarks/bench_evaluator.py [重复次数]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from evaluator import compile_postfix
+from preprocess import preprocess_tokens, tokens_to_postfix
+
+
+def make_expression(terms=300):
+    """生成一个包含常量、函数与变量的长表达式"""
+    tokens = []
+    for i in range(terms):
+        if i:
+            tokens.append("+-*"[i % 3])
+        tokens += ["sin", "(", str(i % 90), ")", "*", "Ans", "+", "2", "^", "M"]
+    return tokens_to_postfix(preprocess_tokens(tokens))
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    postfix = make_expression()
+    state = {"_current_ans": 1.5, "memory": 2, "angle_mode": "Deg"}
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        compile_postfix(postfix, "Deg").run(state)
+    cold = time.perf_counter() - start
+
+    program = compile_postfix(postfix, "Deg")
+    start = time.perf_counter()
+    for i in range(repeat):
+        state["_current_ans"] = i  # 只改变 Ans，无需重新编译
+        program.run(state)
+    warm = time.perf_counter() - start
+
+    print(f"后缀表达式长度: {len(postfix)}，重复 {repeat} 次")
+    print(f"编译 + 执行: 平均 {cold / repeat * 1e6:.1f} µs")
+    print(f"仅执行:      平均 {warm / repeat * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
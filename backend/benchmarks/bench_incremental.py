@@ -0,0 +1,83 @@
+"""
+逐键输入的解析开销：全量解析 vs 增量解析（比较公共前缀 / 由缓冲区给出编辑点）
+
+用法: python benchmarks/bench_incremental.py [token 数]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from buffer import ExpressionBuffer
+from preprocess import (
+    IncrementalParser,
+    postfix_texts,
+    preprocess_tokens,
+    tokens_to_postfix,
+)
+
+
+def make_keys(n, seed=0):
+    """生成一串模拟按键的 token"""
+    rng = random.Random(seed)
+    keys = []
+    while len(keys) < n:
+        keys += rng.choice(
+            [
+                ["1", "2"],
+                ["+"],
+                ["*"],
+                ["sin", "(", "3", "0", ")"],
+                ["(", "4", "-", "5", ")"],
+                ["^", "2"],
+                ["!"],
+            ]
+        )
+    return keys[:n]
+
+
+def type_full(keys):
+    for i in range(1, len(keys) + 1):
+        tokens_to_postfix(preprocess_tokens(keys[:i]))
+
+
+def type_incremental(keys):
+    parser = IncrementalParser()
+    for i in range(1, len(keys) + 1):
+        parser.parse(keys[:i])
+
+
+def type_buffer(keys):
+    parser = IncrementalParser()
+    buffer = ExpressionBuffer()
+    for key in keys:
+        buffer.insert(key)
+        parser.parse(buffer.tokens(), buffer)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    keys = make_keys(n)
+    assert postfix_texts(IncrementalParser().parse(keys)) == postfix_texts(
+        tokens_to_postfix(preprocess_tokens(keys))
+    )
+
+    for name, fn in (
+        ("全量解析", type_full),
+        ("增量解析", type_incremental),
+        ("增量解析（缓冲区）", type_buffer),
+    ):
+        start = time.perf_counter()
+        fn(keys)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name}: 输入 {n} 个 token 共 {elapsed * 1000:.1f} ms，"
+            f"平均每键 {elapsed / n * 1e6:.1f} µs"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+文本词法分析吞吐量（字符/秒）：旧的三分组正则 + 逐项判断，
+新的 lex_text（单分组正则直接查记号表），以及完整的解析与编译
+
+用法: python benchmarks/bench_lexer.py [片段数]
+"""
+
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from evaluator import compile_postfix
+from preprocess import (
+    _text_names,
+    lex_text,
+    preprocess_records,
+    text_aliases,
+    tokenize_text,
+    tokens_to_postfix,
+)
+
+PARTS = [
+    "12",
+    "+",
+    "sin(30)",
+    "*",
+    "3!",
+    "-",
+    "arcsin(0.5)",
+    " nCr ",
+    " mod ",
+    "π",
+    "2.5",
+    "(",
+    ")",
+    "/",
+    "^",
+    "Ans",
+    "√4",
+    " ",
+]
+
+_legacy_re = re.compile(
+    r"\s*(?:(\d+\.?\d*|\.\d+)|("
+    + "|".join(re.escape(name) for name in _text_names)
+    + r")|(\S))"
+)
+
+
+def legacy_tokenize_text(text):
+    """旧实现：三个分组的 findall，逐项判断属于哪一组"""
+    tokens = []
+    for number, name, unknown in _legacy_re.findall(text):
+        if unknown:
+            raise ValueError(f"无法识别的字符: {unknown}")
+        if number:
+            tokens.append(number)
+        elif name:
+            tokens.append(text_aliases.get(name, name))
+    return tokens
+
+
+def throughput(fn, text, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(text)
+    elapsed = (time.perf_counter() - start) / repeat
+    return len(text) / elapsed
+
+
+def parse(text):
+    postfix = tokens_to_postfix(preprocess_records(lex_text(text)))
+    return compile_postfix(postfix)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = random.Random(1)
+    text = "".join(rng.choice(PARTS) for _ in range(count))
+    assert legacy_tokenize_text(text) == tokenize_text(text)
+
+    print(f"{len(text)} 个字符")
+    for name, fn in (
+        ("旧正则", legacy_tokenize_text),
+        ("lex_text", lex_text),
+        ("tokenize_text", tokenize_text),
+        ("解析 + 编译", parse),
+    ):
+        rate = throughput(fn, text, 5)
+        print(f"  {name}: {rate / 1e6:.2f} M 字符/秒")
+
+
+if __name__ == "__main__":
+    main()
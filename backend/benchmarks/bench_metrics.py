@@ -0,0 +1,68 @@
+"""
+分阶段计时的开销：同一组按键经过 Flask 测试客户端的 /api/input，
+开启 vs 关闭计时，以及单个 stage() 在记录与不记录时的耗时
+
+用法: python benchmarks/bench_metrics.py [按键次数]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import core
+import metrics
+from server import create_app
+
+KEYS = ["1", "2", "+", "sin", "3", "0", ")", "*", "4", "x!", "←", "→", "="]
+
+
+def press_keys(client, count):
+    expression, state = [], core.initial_state()
+    start = time.perf_counter()
+    for i in range(count):
+        data = client.post(
+            "/api/input",
+            json={"key": KEYS[i % len(KEYS)], "expression": expression, "state": state},
+        ).get_json()
+        expression, state = data["expression"], data["state"]
+        if len(expression) > 100:
+            expression = []
+    return (time.perf_counter() - start) / count
+
+
+def stage_cost(count=200000):
+    start = time.perf_counter()
+    for _ in range(count):
+        with metrics.stage("bench"):
+            pass
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    folder = os.path.dirname(__file__)
+    plain = create_app(folder, instrument=False).test_client()
+    timed = create_app(folder, instrument=True).test_client()
+
+    # 交替测量，减少机器负载波动的影响，各取最快的一次
+    off, on = [], []
+    for _ in range(3):
+        off.append(press_keys(plain, count))
+        on.append(press_keys(timed, count))
+    off, on = min(off), min(on)
+
+    inactive = stage_cost()
+    token = metrics.begin()
+    active = stage_cost()
+    metrics.finish(token)
+
+    print(f"/api/input，{count} 次按键")
+    print(f"  关闭计时: 每次 {off * 1e6:.1f} µs")
+    print(f"  开启计时: 每次 {on * 1e6:.1f} µs（+{(on / off - 1) * 100:.1f}%）")
+    print(f"stage(): 不记录 {inactive * 1e9:.0f} ns，记录 {active * 1e9:.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
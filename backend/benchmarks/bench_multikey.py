@@ -0,0 +1,90 @@
+"""
+粘贴一个约 80 键的公式：逐个按键的 apply_key vs 一次处理全部按键的 apply_keys，
+以及经过 Flask 测试客户端时逐键的 /api/input 请求 vs 一次带 keys 的请求
+
+用法: python benchmarks/bench_multikey.py [重复次数]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import core
+from server import create_app
+
+# 常见的公式重复三遍，按 "=" 后继续输入，共 80 个按键
+FORMULA = ["sin", "3", "0", ")", "*", "(", "1", "2", ".", "5", "+", "3", "x^2", ")"]
+FORMULA += ["/", "sqrt", "2", ")", "-", "ln", "7", ")", "*", "π", "+"]
+KEYS = FORMULA * 3 + ["4", "2", "=", "*", "2"]
+
+
+def clear_caches():
+    # 粘贴的公式通常是新的，从冷缓存开始
+    core.program_cache.clear()
+    core.result_cache.clear()
+
+
+def one_by_one():
+    expression, state = [], core.initial_state()
+    for key in KEYS:
+        expression, result = core.apply_key(expression, state, key)
+    return expression, state, result
+
+
+def batched():
+    state = core.initial_state()
+    expression, result = core.apply_keys([], state, KEYS)
+    return expression, state, result
+
+
+def requests_one_by_one(client):
+    expression, state = [], core.initial_state()
+    for key in KEYS:
+        data = client.post(
+            "/api/input", json={"key": key, "expression": expression, "state": state}
+        ).get_json()
+        expression, state = data["expression"], data["state"]
+    return data
+
+
+def request_batched(client):
+    return client.post(
+        "/api/input",
+        json={"keys": KEYS, "expression": [], "state": core.initial_state()},
+    ).get_json()
+
+
+def timed(function, *args, count):
+    best = float("inf")
+    for _ in range(count):
+        clear_caches()
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    assert one_by_one() == batched()
+    client = create_app(os.path.dirname(__file__)).test_client()
+    assert requests_one_by_one(client) == request_batched(client)
+
+    print(f"{len(KEYS)} 个按键，{count} 次取最快（ms）")
+    rows = [
+        (f"apply_key × {len(KEYS)}", timed(one_by_one, count=count)),
+        ("apply_keys", timed(batched, count=count)),
+        (f"/api/input × {len(KEYS)}", timed(requests_one_by_one, client, count=count)),
+        ("/api/input keys", timed(request_batched, client, count=count)),
+    ]
+    for name, seconds in rows:
+        print(f"  {name:18}{seconds * 1e3:10.2f}")
+    print(
+        f"  核心加速 {rows[0][1] / rows[1][1]:.1f}x，请求加速 {rows[2][1] / rows[3][1]:.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
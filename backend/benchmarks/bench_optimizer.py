@@ -0,0 +1,69 @@
+"""
+常量折叠与公共子表达式消除：一组较长的表达式在 Ans、M 改变后重算，
+原程序 vs 优化后的程序（各后端分别测量，并核对两者的结果相同）
+
+用法: python benchmarks/bench_optimizer.py [每个表达式的项数] [重复次数]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from evaluator import compile_text
+from numeric import decimal_backend, EXACT, FLOAT
+from optimizer import describe, optimize
+
+TERMS = [
+    "sin(30)*Ans",
+    "(Ans+1)^2/(Ans+1)",
+    "sqrt(2)*π/4",
+    "M*(1+2+3+4)",
+    "3!*cos(60)",
+    "(M-Ans)*(M-Ans)",
+    "ln(e^2)+log(100)",
+    "abs(-5)*Ans",
+]
+
+
+def make_corpus(count, terms, seed=0):
+    """生成 count 个表达式，每个由 terms 个常见的项组成"""
+    rng = random.Random(seed)
+    return ["+".join(rng.choice(TERMS) for _ in range(terms)) for _ in range(count)]
+
+
+def measure(programs, repeat):
+    start = time.perf_counter()
+    results = []
+    for i in range(repeat):
+        state = {"_current_ans": i % 7 + 0.5, "memory": i % 5, "angle_mode": "Deg"}
+        results.append([program.run(state) for program in programs])
+    return (time.perf_counter() - start) / repeat, results
+
+
+def main():
+    terms = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    corpus = make_corpus(20, terms)
+
+    for backend in (FLOAT, decimal_backend(30), EXACT):
+        programs = [compile_text(text, "Deg", backend) for text in corpus]
+        start = time.perf_counter()
+        optimized = [optimize(program) for program in programs]
+        cost = time.perf_counter() - start
+
+        plain, expected = measure(programs, repeat)
+        fast, actual = measure(optimized, repeat)
+        assert actual == expected, "优化后的结果不同"
+
+        before = sum(describe(program)["before"] for program in programs)
+        after = sum(describe(program)["after"] for program in programs)
+        print(f"{backend.name}: 节点 {before} -> {after}，优化耗时 {cost * 1e3:.2f} ms")
+        print(f"  原程序:     每轮 {plain * 1e3:.2f} ms")
+        print(f"  优化后:     每轮 {fast * 1e3:.2f} ms（{plain / fast:.1f}x）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+进制转换：旧的 format_number_base 与 radix.format_base 的耗时对比，
+以及非 2 的幂进制下逐位 divmod 与分治转换的对比
+
+用法: python benchmarks/bench_radix.py [重复次数]
+"""
+
+import math
+import os
+import sys
+import time
+from fractions import Fraction
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from radix import DIGITS, format_base, int_to_digits
+
+
+def legacy_format_number_base(number, base):
+    """旧实现：int() 取整数部分，小数部分逐位乘 base，最多 15 位"""
+    base_value = {"Bin": 2, "Oct": 8, "Hex": 16}[base]
+    integer_part = int(number)
+    fraction = number - integer_part
+    integer_str = {"Bin": bin, "Oct": oct, "Hex": hex}[base](integer_part)[2:].upper()
+    if fraction <= 0:
+        return integer_str
+    digits = []
+    for _ in range(15):
+        fraction *= base_value
+        digit = int(fraction)
+        digits.append(DIGITS[digit])
+        fraction -= digit
+        if fraction == 0:
+            break
+    return f"{integer_str}.{''.join(digits)}"
+
+
+def naive_int_to_digits(n, base):
+    """逐位 divmod，位数的平方级"""
+    digits = []
+    while n:
+        n, digit = divmod(n, base)
+        digits.append(DIGITS[digit])
+    return "".join(reversed(digits)) or "0"
+
+
+def timed(repeat, fn, *args):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args)
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    print("1000! 与 1000!/7 转换为十六进制")
+    for name, value in (
+        ("1000!", math.factorial(1000)),
+        ("1000!/7", Fraction(math.factorial(1000), 7)),
+    ):
+        old, old_time = timed(repeat, legacy_format_number_base, value, "Hex")
+        new, new_time = timed(repeat, format_base, value, "Hex")
+        assert old == new, name
+        print(
+            f"  {name:>8}: 旧 {old_time * 1e3:8.3f} ms  新 {new_time * 1e3:8.3f} ms  "
+            f"{len(new)} 位"
+        )
+
+    print("非 2 的幂进制：逐位 divmod vs 分治")
+    for n in (1000, 5000, 20000):
+        value = math.factorial(n)
+        for base in (10, 36):
+            old, old_time = timed(
+                max(repeat // 10, 1), naive_int_to_digits, value, base
+            )
+            new, new_time = timed(max(repeat // 10, 1), int_to_digits, value, base)
+            assert old == new, (n, base)
+            print(
+                f"  {n:>5}! 转 {base:>2} 进制 ({len(new):>6} 位): "
+                f"逐位 {old_time * 1e3:9.2f} ms  分治 {new_time * 1e3:8.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+S⇔D 切换的显示延迟：float 后端从小数反推分数 vs exact 后端直接使用精确值
+
+用法: python benchmarks/bench_toggle.py [重复次数]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import core
+from preprocess import tokenize_text
+
+CASES = [
+    "1/3+1/7",
+    "22/7-355/113",
+    "1/997+1/991",
+    "(2/3)^5",
+    "1/3+1/7+1/11+1/13+1/17+1/19",
+    # 分母超过 limit_denominator 的默认上限 10^6，float 后端无法还原
+    "1/9973+1/9967",
+]
+
+
+def prepare(text, backend):
+    """计算一次表达式，返回按下 S⇔D 前的表达式与状态"""
+    state = core.initial_state()
+    state["numeric_backend"] = backend
+    expression = tokenize_text(text)
+    core.calculate(expression, state)
+    return expression, state
+
+
+def toggle_latency(expression, state, repeat):
+    """
+    连续按 S⇔D，分别统计切换到分数与切换回小数的平均耗时，
+    并返回最后一次显示的分数
+    """
+    elapsed = {True: 0.0, False: 0.0}
+    for _ in range(repeat * 2):
+        start = time.perf_counter()
+        _, result = core.apply_key(list(expression), state, "S⇔D")
+        elapsed[state["use_fraction"]] += time.perf_counter() - start
+        if state["use_fraction"]:
+            shown = result
+    return elapsed[True] / repeat, elapsed[False] / repeat, shown
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for text in CASES:
+        print(text)
+        for backend in ("float", "exact"):
+            expression, state = prepare(text, backend)
+            to_fraction, to_decimal, shown = toggle_latency(expression, state, repeat)
+            print(
+                f"  {backend:>5}: 分数 {to_fraction * 1e6:6.1f} µs  "
+                f"小数 {to_decimal * 1e6:6.1f} µs  {shown}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+对 /api/input 做并发压测，输出吞吐量与延迟分位数。
+
+先分别启动两种模式再压测，对比结果：
+    python server.py ../frontend/out development --port 5000
+    python server.py ../frontend/out production --port 5000 --workers 8
+    python benchmarks/loadtest.py http://127.0.0.1:5000 --concurrency 16 --requests 4000
+"""
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+KEYS = ["1", "2", "+", "sin", "3", "0", ")", "*", "4", "x!", "←", "→", "="]
+
+
+def worker(url, count, latencies, errors):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    expression, state = [], {
+        "showing_answer": False,
+        "_current_ans": 0,
+        "_predicted_ans": 0,
+        "memory": 0,
+        "angle_mode": "Deg",
+    }
+    for i in range(count):
+        body = json.dumps(
+            {"key": KEYS[i % len(KEYS)], "expression": expression, "state": state}
+        )
+        start = time.perf_counter()
+        try:
+            conn.request(
+                "POST", "/api/input", body, {"Content-Type": "application/json"}
+            )
+            response = conn.getresponse()
+            data = json.loads(response.read())
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(
+                parts.hostname, parts.port or 80, timeout=30
+            )
+            continue
+        latencies.append(time.perf_counter() - start)
+        expression, state = data["expression"], data["state"]
+        if len(expression) > 200:
+            expression = []
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/input 并发压测")
+    parser.add_argument("url", nargs="?", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=4000, help="总请求数")
+    args = parser.parse_args()
+
+    latencies, errors = [], []
+    per_worker = args.requests // args.concurrency
+    threads = [
+        threading.Thread(target=worker, args=(args.url, per_worker, latencies, errors))
+        for _ in range(args.concurrency)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"请求数: {len(latencies)}，失败: {len(errors)}，耗时 {elapsed:.2f} s")
+    print(f"吞吐量: {len(latencies) / elapsed:.0f} req/s")
+    if latencies:
+        print(
+            f"延迟: p50 {pct(0.5):.2f} ms，p95 {pct(0.95):.2f} ms，p99 {pct(0.99):.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+"""
+计算流程的基准测试套件：用固定种子生成表达式语料，分阶段计时，
+输出 JSON 结果，并与保存的基线比较，热点路径变慢时以非零状态退出。
+
+语料分为四类：
+- keypad: 常见的按键输入，3–15 个 token
+- nested: 50–200 层括号嵌套
+- long:   1000 个以上 token 的长表达式
+- heavy:  大量使用 !、nCr、^ 的表达式
+
+阶段：preprocess_tokens、tokens_to_postfix、evaluate_postfix、format_result，
+以及经过 Flask 测试客户端的完整 /api/input 请求（按 "=" 计算）。
+每个结果为该类语料中每个表达式的耗时（µs，多轮取最小值）。
+
+计时前先检查 TEXT_CHECKS 中文本表达式的结果，并逐键发送 API_CHECKS 中的按键序列，
+任一检查失败时同样以非零状态退出。
+
+用法:
+    python benchmarks/suite.py                          # 与 benchmarks/baseline.json 比较
+    python benchmarks/suite.py --output results.json    # 另存本次结果
+    python benchmarks/suite.py --save-baseline          # 以本次结果作为新的基线
+    python benchmarks/suite.py --threshold 0.5          # 慢 50% 以上才算退化
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import core
+from preprocess import preprocess_tokens, tokens_to_postfix
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+STAGES = (
+    "preprocess_tokens",
+    "tokens_to_postfix",
+    "evaluate_postfix",
+    "format_result",
+    "api_input",
+)
+
+FUNCTIONS = ["sin", "cos", "tan", "sqrt", "ln", "log", "abs"]
+OPERATORS = ["+", "-", "*", "/"]
+
+
+def _number(rng):
+    if rng.random() < 0.2:
+        return [*str(rng.randint(0, 99)), ".", *str(rng.randint(0, 99))]
+    return list(str(rng.randint(1, 999)))
+
+
+def _term(rng):
+    """一个数、常量或函数调用"""
+    choice = rng.random()
+    if choice < 0.6:
+        return _number(rng)
+    if choice < 0.7:
+        return [rng.choice(["π", "e", "Ans", "M"])]
+    return [rng.choice(FUNCTIONS), "(", *_number(rng), ")"]
+
+
+def keypad(rng):
+    tokens = _term(rng)
+    for _ in range(rng.randint(0, 3)):
+        tokens += [rng.choice(OPERATORS), *_term(rng)]
+    return tokens
+
+
+def nested(rng):
+    depth = rng.randint(50, 200)
+    tokens = ["("] * depth + _number(rng)
+    for _ in range(depth):
+        tokens += [rng.choice(OPERATORS), *_term(rng), ")"]
+    return tokens
+
+
+def long(rng):
+    tokens = _term(rng)
+    while len(tokens) < 1000:
+        tokens += [rng.choice(OPERATORS), *_term(rng)]
+    return tokens
+
+
+def heavy(rng):
+    # 浮点后端中大数阶乘是整数，只与整数相乘，避免与浮点数混合时溢出
+    choice = rng.randrange(3)
+    if choice == 0:
+        return [*str(rng.randint(50, 300)), "!", "*", *str(rng.randint(20, 200)), "!"]
+    if choice == 1:
+        n = rng.randint(50, 500)
+        tokens = [*str(n), "nCr", *str(rng.randint(1, n // 4))]
+    else:
+        tokens = [*str(rng.randint(2, 9)), "^", *str(rng.randint(100, 300))]
+    return tokens + [rng.choice(["+", "*"]), *keypad(rng)]
+
+
+# 每类语料的生成函数与表达式数
+CORPUS = {
+    "keypad": (keypad, 200),
+    "nested": (nested, 20),
+    "long": (long, 10),
+    "heavy": (heavy, 40),
+}
+
+
+def make_corpus(seed):
+    rng = random.Random(seed)
+    return {
+        name: [generate(rng) for _ in range(count)]
+        for name, (generate, count) in CORPUS.items()
+    }
+
+
+def _attempt(function, *args):
+    # 计算出错也是工作量的一部分
+    try:
+        return function(*args)
+    except (ArithmeticError, ValueError):
+        return None
+
+
+def _clear_caches():
+    core.program_cache.clear()
+    core.result_cache.clear()
+
+
+def stage_jobs(expressions):
+    """每个阶段：(输入列表, 处理单个输入的函数)"""
+    state = {**core.initial_state(), "_current_ans": 2, "memory": 3}
+    preprocessed = [_attempt(preprocess_tokens, tokens) for tokens in expressions]
+    postfix = [
+        _attempt(tokens_to_postfix, records)
+        for records in preprocessed
+        if records is not None
+    ]
+    postfix = [item for item in postfix if item is not None]
+    values = [_attempt(core.evaluate_postfix, item, state) for item in postfix]
+    values = [value for value in values if value is not None]
+
+    jobs = {
+        "preprocess_tokens": (
+            expressions,
+            lambda item: _attempt(preprocess_tokens, item),
+        ),
+        "tokens_to_postfix": (
+            [item for item in preprocessed if item is not None],
+            lambda item: _attempt(tokens_to_postfix, item),
+        ),
+        "evaluate_postfix": (
+            postfix,
+            lambda item: _attempt(core.evaluate_postfix, item, state),
+        ),
+        "format_result": (values, lambda value: core.format_result(value, state)),
+    }
+    client = _flask_client()
+    if client is not None:
+
+        def request(tokens):
+            with contextlib.redirect_stdout(io.StringIO()):
+                client.post(
+                    "/api/input",
+                    json={
+                        "key": "=",
+                        "expression": tokens + ["|"],
+                        "state": dict(state),
+                    },
+                )
+
+        jobs["api_input"] = (expressions, request)
+    return jobs
+
+
+# 文本表达式与 float 后端下的显示结果
+TEXT_CHECKS = {
+    # 科学计数法是一个数，不是与常量 e、变量 E 的隐式乘法
+    "3E2": "300",
+    "1e3": "1000",
+    "2.5e-3": "0.0025",
+    ".5E1": "5",
+    "2e+3": "2000",
+    "2(1e3)": "2000",
+    # 指数缺少数字时 e 仍是常量
+    "2e": "5.43656365691809",
+    # 带指数的数字不与相邻数字合并成另一个数
+    "3e2.5": "Error: 语法错误: 3e2 .5",
+    "1e3 2": "Error: 语法错误: 1e3 2",
+    "2 1e3": "Error: 语法错误: 2 1e3",
+}
+
+
+def check_text():
+    """计算 TEXT_CHECKS，返回结果不符的描述"""
+    failures = []
+    for text, expected in TEXT_CHECKS.items():
+        try:
+            result = core.evaluate_text(text)["result"]
+        except ValueError as e:
+            result = f"Error: {e}"
+        if result != expected:
+            failures.append(f"{text}: 期望 {expected}，得到 {result}")
+    return failures
+
+
+# 逐键经过 /api/input 的按键序列：结果超过 int 转字符串上限的大数，
+# 以及在下一次请求中带回这样的 Ans
+API_CHECKS = [
+    ["1", "6", "0", "0", "x!"],
+    ["2", "0", "0", "0", "x!", "=", "*", "2", "=", "M+", "MR", "/", "3", "="],
+]
+
+
+def check_api(client):
+    """在各数值后端下逐键发送 API_CHECKS，返回失败的描述"""
+    failures = []
+    for keys in API_CHECKS:
+        for backend in ("float", "exact", "decimal"):
+            expression = []
+            state = {**core.initial_state(), "numeric_backend": backend}
+            for key in keys:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    response = client.post(
+                        "/api/input",
+                        json={"key": key, "expression": expression, "state": state},
+                    )
+                if response.status_code != 200:
+                    failures.append(
+                        f"{backend}: {' '.join(keys)} 在 {key} 处 HTTP {response.status_code}"
+                    )
+                    break
+                data = response.get_json()
+                expression, state = data["expression"], data["state"]
+    return failures
+
+
+def _flask_client():
+    try:
+        from server import create_app
+    except ImportError:
+        print("未安装 Flask，跳过 api_input", file=sys.stderr)
+        return None
+    return create_app(os.path.dirname(__file__)).test_client()
+
+
+def _calibrate(inputs, function, target=0.02):
+    """每轮需要重复的遍数"""
+    start = time.perf_counter()
+    for item in inputs:
+        function(item)
+    elapsed = time.perf_counter() - start
+    return max(1, int(target / elapsed)) if elapsed else 1000
+
+
+def reference_speed(rounds=21):
+    """
+    固定的纯 Python 工作量的耗时（µs），与基线比较时按它换算，
+    抵消不同机器或 CPU 频率造成的整体快慢
+    """
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        table = {}
+        for i in range(20000):
+            table[i % 97] = table.get(i % 89, 0) + len(str(i))
+        timings.append(time.perf_counter() - start)
+    return round(min(timings) * 1e6, 3)
+
+
+def run(corpus, rounds, stages):
+    results = {}
+    for category, expressions in corpus.items():
+        jobs = stage_jobs(expressions)
+        for stage in stages:
+            if stage not in jobs:
+                continue
+            inputs, function = jobs[stage]
+            if not inputs:
+                continue
+            # 每轮至少约 20 ms，多轮取最小值，减少调度与频率波动的影响
+            repeat = _calibrate(inputs, function)
+            timings = []
+            gc.disable()
+            for _ in range(rounds):
+                elapsed = 0.0
+                for _ in range(repeat):
+                    # 每遍都从冷缓存开始，测量的是计算而不是缓存命中
+                    _clear_caches()
+                    start = time.perf_counter()
+                    for item in inputs:
+                        function(item)
+                    elapsed += time.perf_counter() - start
+                timings.append(elapsed / (repeat * len(inputs)))
+            gc.enable()
+            results[f"{stage}/{category}"] = round(min(timings) * 1e6, 3)
+    return results
+
+
+def compare(results, baseline, threshold, scale=1.0):
+    """打印与基线的对比（基线按 scale 换算到本机），返回变慢超过 threshold 的项"""
+    regressions = []
+    print(f"{'阶段/语料':32} {'基线 µs':>12} {'本次 µs':>12} {'比值':>7}")
+    for name, value in results.items():
+        old = baseline.get(name)
+        if old is not None:
+            old *= scale
+        if old is None:
+            print(f"{name:32} {'-':>12} {value:12.3f}")
+            continue
+        ratio = value / old if old else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  <-- 退化"
+        print(f"{name:32} {old:12.3f} {value:12.3f} {ratio:7.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="计算流程的基准测试套件")
+    parser.add_argument("--seed", type=int, default=0, help="语料的随机种子")
+    parser.add_argument("--rounds", type=int, default=7, help="每个阶段的轮数")
+    parser.add_argument(
+        "--stages", nargs="+", choices=STAGES, default=STAGES, help="只运行这些阶段"
+    )
+    parser.add_argument("--output", help="把本次结果写入 JSON 文件")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="基线文件")
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="以本次结果作为新的基线"
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=0.5, help="比基线慢多少算退化，默认 0.5"
+    )
+    args = parser.parse_args()
+
+    client = _flask_client()
+    failures = check_text()
+    if client is not None:
+        failures += check_api(client)
+    if failures:
+        print("检查失败:", file=sys.stderr)
+        for failure in failures:
+            print(f"  {failure}", file=sys.stderr)
+        sys.exit(1)
+
+    corpus = make_corpus(args.seed)
+    reference = reference_speed()
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "rounds": args.rounds,
+            "corpus": {name: len(items) for name, items in corpus.items()},
+        },
+        "results": run(corpus, args.rounds, args.stages),
+    }
+    # 开始与结束时各测一次，取较快的一次
+    report["meta"]["reference_us"] = min(reference, reference_speed())
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"已保存基线: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        print("没有基线文件，使用 --save-baseline 保存", file=sys.stderr)
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("meta", {}).get("seed") != args.seed:
+        print("警告: 基线使用了不同的语料种子", file=sys.stderr)
+
+    baseline_reference = baseline.get("meta", {}).get("reference_us")
+    scale = 1.0
+    if baseline_reference:
+        scale = report["meta"]["reference_us"] / baseline_reference
+    print(f"本机相对基线的速度换算: {scale:.2f}")
+    regressions = compare(
+        report["results"], baseline.get("results", {}), args.threshold, scale
+    )
+    if regressions:
+        print(
+            f"\n{len(regressions)} 项比基线慢 {args.threshold:.0%} 以上:",
+            file=sys.stderr,
+        )
+        for name in regressions:
+            print(f"  {name}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+class ExpressionBuffer:
+    """
+    带光标的表达式缓冲区（间隙缓冲）。
+
+    光标左侧的 token 按顺序存放在 _left，右侧的 token 逆序存放在 _right，
+    两个列表的末尾都紧挨着光标，因此在光标处插入、删除和移动光标都是
+    均摊 O(1) 的，不需要查找 "|" 或移动其余元素。
+    与前端使用的 ["1", "+", "|", "2"] 形式可以无损互相转换。
+
+    缓冲区还记录上次解析以来最左侧被修改的位置，增量解析器据此直接
+    定位编辑点，不必与上次解析的 token 逐个比较（见 take_edit_start）。
+    """
+
+    __slots__ = ("_left", "_right", "version", "_edit_start", "_parse_mark")
+
+    CURSOR = "|"
+
+    def __init__(self, tokens=(), cursor=None):
+        tokens = list(tokens)
+        if cursor is None:
+            cursor = len(tokens)
+        self._left = tokens[:cursor]
+        self._right = tokens[cursor:][::-1]
+        # 每次修改（包括移动光标）加一，便于判断内容是否变化
+        self.version = 0
+        # 上次解析以来最左侧被修改的位置，与那次解析的标记
+        self._edit_start = 0
+        self._parse_mark = None
+
+    @classmethod
+    def from_wire(cls, expression):
+        """由含 "|" 的 token 列表构造；没有光标时光标位于末尾"""
+        tokens = list(expression)
+        try:
+            cursor = tokens.index(cls.CURSOR)
+        except ValueError:
+            return cls(tokens)
+        # 只有第一个 "|" 是光标，其余的保持为普通 token
+        del tokens[cursor]
+        return cls(tokens, cursor)
+
+    def to_wire(self):
+        """转换为含 "|" 的 token 列表"""
+        return self._left + [self.CURSOR] + self._right[::-1]
+
+    def tokens(self):
+        """不含光标的 token 元组"""
+        return tuple(self._left) + tuple(reversed(self._right))
+
+    @property
+    def cursor(self):
+        return len(self._left)
+
+    def take_edit_start(self, mark, new_mark):
+        """
+        上次以 mark 解析以来最左侧被修改的位置，此前的 token 都没有变化；
+        上次的解析标记不是 mark（期间解析器处理过其他表达式）时返回 None。
+        之后改为相对 new_mark 这次解析记录
+        """
+        start = self._edit_start if self._parse_mark is mark else None
+        self._parse_mark = new_mark
+        self._edit_start = len(self._left) + len(self._right)
+        return start
+
+    def insert(self, token):
+        """在光标处插入 token，光标移到它之后"""
+        if len(self._left) < self._edit_start:
+            self._edit_start = len(self._left)
+        self._left.append(token)
+        self.version += 1
+
+    def delete_left(self):
+        """删除光标左侧的 token，左侧为空时返回 False"""
+        if not self._left:
+            return False
+        self._left.pop()
+        if len(self._left) < self._edit_start:
+            self._edit_start = len(self._left)
+        self.version += 1
+        return True
+
+    def delete_right(self):
+        """删除光标右侧的 token，右侧为空时返回 False"""
+        if not self._right:
+            return False
+        self._right.pop()
+        if len(self._left) < self._edit_start:
+            self._edit_start = len(self._left)
+        self.version += 1
+        return True
+
+    def move_left(self):
+        if not self._left:
+            return False
+        self._right.append(self._left.pop())
+        self.version += 1
+        return True
+
+    def move_right(self):
+        if not self._right:
+            return False
+        self._left.append(self._right.pop())
+        self.version += 1
+        return True
+
+    def clear(self):
+        if self._left or self._right:
+            self._left.clear()
+            self._right.clear()
+            self._edit_start = 0
+            self.version += 1
+
+    def __len__(self):
+        return len(self._left) + len(self._right)
+
+    def __repr__(self):
+        return f"ExpressionBuffer({self.to_wire()!r})"
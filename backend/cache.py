@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+class LRUCache:
+    """线程安全的有界 LRU 缓存，附带命中/未命中/淘汰计数"""
+
+    def __init__(self, maxsize=256):
+        if maxsize <= 0:
+            raise ValueError("maxsize 必须为正数")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        """读取缓存，命中时将其移动到最近使用的位置"""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """写入缓存，超出容量时淘汰最久未使用的项"""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """清空缓存并重置计数"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """返回缓存统计信息"""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+
+class CachedResult:
+    """
+    一个表达式版本的计算结果：原始数值（或错误信息）
+    以及按需生成、生成后保留的各种显示形式
+    """
+
+    __slots__ = ("value", "error", "renderings")
+
+    def __init__(self, value=None, error=None):
+        self.value = value
+        self.error = error
+        self.renderings = {}
+
+    def render(self, mode, formatter):
+        """取得某种显示形式，首次请求时调用 formatter(value) 生成"""
+        text = self.renderings.get(mode)
+        if text is None:
+            text = self.renderings[mode] = formatter(self.value)
+        return text
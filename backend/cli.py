@@ -0,0 +1,152 @@
+"""
+命令行批量计算：逐行读取 NDJSON 表达式，按输入顺序输出 NDJSON 结果。
+不依赖 Flask、pywebview 与前端，适合离线处理大批量的表达式。
+
+每行输入可以是：
+- 文本，如 "12+sin(30)*3!"
+- token 列表，如 ["1", "+", "2"]
+- 对象 {"expression": 文本或 token 列表, ...}，其余字段原样带回结果中
+
+每行输出 {"value", "result"} 或 {"error"}，空行忽略。
+输入按块流式处理，内存占用只与块大小和进行中的块数有关。
+
+用法:
+    python cli.py < input.ndjson > output.ndjson
+    python cli.py input.ndjson -o output.ndjson --workers 4
+    python cli.py input.ndjson --state '{"numeric_backend": "exact"}'
+"""
+
+import argparse
+import io
+import itertools
+import json
+import multiprocessing
+import sys
+from collections import deque
+
+import core
+
+DEFAULT_CHUNK_SIZE = 1000
+
+# 工作进程的求值 state，由 _init_worker 设置
+_worker_state = None
+
+
+def _dumps(item):
+    # Decimal 等数值按字符串输出，与 Flask 的 JSON 序列化一致
+    return json.dumps(item, ensure_ascii=False, default=str) + "\n"
+
+
+def iter_lines(lines, state=None):
+    """逐行计算 NDJSON 输入，按顺序生成输出行；单行出错不影响其余行"""
+    # 与 iter_evaluate 取出的表达式一一对应：(带回的字段, 解析错误)
+    pending = deque()
+
+    def expressions():
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                pending.append((None, f"无效的 JSON: {e}"))
+                yield None
+                continue
+            if isinstance(item, dict):
+                fields = {k: v for k, v in item.items() if k != "expression"}
+                pending.append((fields, None))
+                yield item.get("expression")
+            else:
+                pending.append((None, None))
+                yield item
+
+    for result in core.iter_evaluate(expressions(), state):
+        fields, error = pending.popleft()
+        if error is not None:
+            result = {"error": error}
+        elif fields:
+            result = {**fields, **result}
+        yield _dumps(result)
+
+
+def _init_worker(state):
+    global _worker_state
+    _worker_state = state
+
+
+def _evaluate_chunk(chunk):
+    return "".join(iter_lines(chunk, _worker_state))
+
+
+def run(lines, output, state=None, workers=0, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    计算 lines 中的全部表达式并写入 output。
+    workers > 1 时分块交给进程池计算，最多 2 * workers 个块同时进行，
+    结果仍按输入顺序写出。
+    """
+    if workers <= 1:
+        output.writelines(iter_lines(lines, state))
+        return
+
+    lines = iter(lines)
+    chunks = iter(lambda: list(itertools.islice(lines, chunk_size)), [])
+    window = 2 * workers
+    with multiprocessing.Pool(
+        workers, initializer=_init_worker, initargs=(state,)
+    ) as pool:
+        # 不使用 imap：它会在后台读完全部输入，内存不再有界
+        in_flight = deque()
+        for chunk in chunks:
+            if len(in_flight) >= window:
+                output.write(in_flight.popleft().get())
+            in_flight.append(pool.apply_async(_evaluate_chunk, (chunk,)))
+        while in_flight:
+            output.write(in_flight.popleft().get())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量计算 NDJSON 表达式")
+    parser.add_argument("input", nargs="?", help="输入文件，默认为标准输入")
+    parser.add_argument("-o", "--output", help="输出文件，默认为标准输出")
+    parser.add_argument(
+        "--state",
+        default="{}",
+        help='计算使用的 state（JSON），如 \'{"angle_mode": "Rad"}\'',
+    )
+    parser.add_argument(
+        "--workers", type=int, default=0, help="工作进程数，默认在当前进程中计算"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"每块的行数，默认为 {DEFAULT_CHUNK_SIZE}",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        state = json.loads(args.state)
+    except ValueError as e:
+        parser.error(f"无效的 state: {e}")
+    try:
+        core.validate_state(state)
+    except ValueError as e:
+        parser.error(f"无效的 state: {e}")
+    if args.chunk_size < 1:
+        parser.error("chunk-size 必须大于 0")
+
+    if args.input:
+        source = open(args.input, encoding="utf-8")
+    else:
+        source = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+    if args.output:
+        sink = open(args.output, "w", encoding="utf-8")
+    else:
+        sink = io.TextIOWrapper(sys.stdout.buffer, encoding="utf-8")
+
+    with source, sink:
+        run(source, sink, state, args.workers, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,284 +1,125 @@
 from preprocess import (
+    IncrementalParser,
+    lex_text,
+    preprocess_records,
     preprocess_tokens,
     tokens_to_postfix,
-    precedence,
-    function_names,
-    suffix_ops,
 )
-import math
-import random
+from evaluator import compile_postfix, compile_text
+from optimizer import reuse
+from numeric import (
+    FLOAT,
+    format_decimal,
+    format_scientific,
+    get_backend,
+    leading_decimal,
+    parse_fraction,
+    split_exact,
+)
+from buffer import ExpressionBuffer
+from metrics import stage
+from cache import CachedResult, LRUCache
+from radix import DEFAULT_FRACTION_DIGITS, format_base
+from registry import (
+    FUNCTION,
+    LPAR,
+    NUMBER,
+    OPERAND,
+    RPAR,
+    lookup,
+    named_variables,
+    user_function_names,
+)
+from decimal import localcontext
 from fractions import Fraction
+import logging
 
+logger = logging.getLogger(__name__)
 
-def evaluate_postfix(tokens, state):
-    """计算后缀表达式的值"""
-    stack = []
-
-    # 获取角度模式
-    angle_mode = state.get("angle_mode", "Deg")
-
-    # 角度转弧度函数
-    def to_radians(x):
-        return x * math.pi / 180 if angle_mode == "Deg" else x
-
-    # 弧度转角度函数
-    def to_degrees(x):
-        return x * 180 / math.pi if angle_mode == "Deg" else x
-
-    for token in tokens:
-        if (
-            token not in precedence
-            and token not in function_names
-            and token not in ["Random", "Ans", "M"]
-        ):
-            # 数字或变量
-            try:
-                if token == "π":
-                    value = math.pi
-                elif token == "e":
-                    value = math.e
-                else:
-                    value = float(token)
-                stack.append(value)
-            except ValueError:
-                raise ValueError(f"语法错误: {token}")
-        else:
-            # 运算符或函数
-            if token in suffix_ops or token in function_names:
-                if not stack:
-                    raise ValueError("缺少操作数")
-                x = stack.pop()
-
-                if token == "!":
-                    if x < 0 or not x.is_integer():
-                        raise ValueError("阶乘只能用于非负整数")
-                    result = math.factorial(int(x))
-                elif token == "%":
-                    result = x / 100
-                elif token == "abs":
-                    result = abs(x)
-                elif token == "sin":
-                    if angle_mode == "Hyp":
-                        result = math.sinh(x)
-                    else:
-                        result = math.sin(to_radians(x))
-                elif token == "cos":
-                    if angle_mode == "Hyp":
-                        result = math.cosh(x)
-                    else:
-                        result = math.cos(to_radians(x))
-                elif token == "tan":
-                    if angle_mode == "Hyp":
-                        result = math.tanh(x)
-                    else:
-                        result = math.tan(to_radians(x))
-                elif token == "arcsin":
-                    if angle_mode == "Hyp":
-                        result = math.asinh(x)
-                    else:
-                        result = to_degrees(math.asin(x))
-                elif token == "arccos":
-                    if angle_mode == "Hyp":
-                        result = math.acosh(x)
-                    else:
-                        result = to_degrees(math.acos(x))
-                elif token == "arctan":
-                    if angle_mode == "Hyp":
-                        result = math.atanh(x)
-                    else:
-                        result = to_degrees(math.atan(x))
-                elif token == "int":
-                    result = int(x)
-                elif token == "sqrt":
-                    if x < 0:
-                        raise ValueError("平方根的参数不能为负数")
-                    result = math.sqrt(x)
-                elif token == "cbrt":
-                    result = math.copysign(abs(x) ** (1 / 3), x)  # 支持负数的立方根
-                elif token == "log":
-                    if x <= 0:
-                        raise ValueError("对数的参数必须为正数")
-                    result = math.log10(x)
-                elif token == "ln":
-                    if x <= 0:
-                        raise ValueError("对数的参数必须为正数")
-                    result = math.log(x)
-                else:
-                    raise ValueError(f"未知运算: {token}")
-
-                stack.append(result)
-
-            elif token == "Random":
-                stack.append(random.random())
-
-            elif token == "Ans":
-                stack.append(state["_current_ans"])
-
-            elif token == "M":
-                stack.append(state.get("memory", 0))
-
-            elif token in ["(+)", "(-)"]:
-                if not stack:
-                    raise ValueError("缺少操作数")
-                x = stack.pop()
-                if token == "(-)":
-                    x = -x
-                stack.append(x)
-
-            else:  # 二元运算符
-                if len(stack) < 2:
-                    raise ValueError("缺少操作数")
-                b = stack.pop()
-                a = stack.pop()
-
-                if token == "+":
-                    result = a + b
-                elif token == "-":
-                    result = a - b
-                elif token == "*":
-                    result = a * b
-                elif token == "/":
-                    if b == 0:
-                        raise ValueError("除数不能为零")
-                    result = a / b
-                elif token == "mod":
-                    if b == 0:
-                        raise ValueError("除数不能为零")
-                    result = a % b
-                elif token == "^":
-                    try:
-                        result = pow(a, b)
-                    except OverflowError:
-                        raise ValueError("结果过大")
-                elif token == "nPr":
-                    # 检查参数
-                    if not (a >= 0 and b >= 0 and a.is_integer() and b.is_integer()):
-                        raise ValueError("排列数的参数必须是非负整数")
-                    if b > a:
-                        raise ValueError("排列数的第二个参数不能大于第一个参数")
-                    # 计算 P(n,r) = n!/(n-r)!
-                    n, r = int(a), int(b)
-                    result = math.factorial(n) // math.factorial(n - r)
-                elif token == "nCr":
-                    # 检查参数
-                    if not (a >= 0 and b >= 0 and a.is_integer() and b.is_integer()):
-                        raise ValueError("组合数的参数必须是非负整数")
-                    if b > a:
-                        raise ValueError("组合数的第二个参数不能大于第一个参数")
-                    # 计算 C(n,r) = n!/((n-r)!r!)
-                    n, r = int(a), int(b)
-                    result = math.factorial(n) // (
-                        math.factorial(n - r) * math.factorial(r)
-                    )
-
-                stack.append(result)
-
-    if not stack:
-        stack = [0]
-    if len(stack) > 1:
-        raise ValueError("操作符不足")
-
-    return stack[0]
-
-
-def handle_input(expression, state, key):
-    """处理输入按键，维护 expression 数组，并将 '|' 视为光标位置。"""
+# 编译结果缓存：键为去掉光标后的 token 元组、角度模式和数值后端
+program_cache = LRUCache(maxsize=512)
+# 计算结果缓存：键见 result_key，光标移动、格式切换等不改变表达式的按键直接命中
+result_cache = LRUCache(maxsize=512)
+# 增量解析器：逐键追加时只解析编辑点之后的 token
+incremental_parser = IncrementalParser()
 
-    # 如果 expression 里没有光标，则默认加在末尾
-    if "|" not in expression:
-        expression.append("|")
 
-    cursor_index = expression.index("|")
+def evaluate_postfix(tokens, state):
+    """计算后缀表达式的值"""
+    return compile_postfix(
+        tokens, state.get("angle_mode", "Deg"), get_backend(state)
+    ).run(state)
+
+
+# 直接插入一个或多个 token 的按键
+KEY_TOKENS = {
+    "": [],
+    "MR": ["M"],
+    "x^2": ["^", "2"],
+    "x^3": ["^", "3"],
+    "x^y": ["^"],
+    "x^-1": ["^", "-1"],
+    "10^x": ["10", "^"],
+    "e^x": ["e", "^"],
+    "x!": ["!"],
+    "|x|": ["abs"],
+    "sin^-1": ["arcsin"],
+    "cos^-1": ["arccos"],
+    "tan^-1": ["arctan"],
+    "Mod": ["mod"],
+    "Ran#": ["Random"],
+    "*10^n": ["*", "10", "^"],
+}
+
+
+def edit_buffer(buffer, state, key):
+    """处理输入按键，在 ExpressionBuffer 的光标处编辑表达式并更新 state"""
 
     # 处理 Ans 变量
     state["ans"] = state["_current_ans"]
 
-    OP_MAPEX = {
-        "": [],
-        "MR": ["M"],
-        "x^2": ["^", "2"],
-        "x^3": ["^", "3"],
-        "x^y": ["^"],
-        "x^-1": ["^", "-1"],
-        "10^x": ["10", "^"],
-        "e^x": ["e", "^"],
-        "x!": ["!"],
-        "|x|": ["abs"],
-        "sin^-1": ["arcsin"],
-        "cos^-1": ["arccos"],
-        "tan^-1": ["arctan"],
-        "Mod": ["mod"],
-        "Ran#": ["Random"],
-        "*10^n": ["*", "10", "^"],
-    }
     # key 可能被映射为列表
-    mapped_key = OP_MAPEX.get(key, None)
-    if mapped_key is not None:
-        key_list = mapped_key
-    else:
+    key_list = KEY_TOKENS.get(key, None)
+    if key_list is None:
         # 答案状态
         state["showing_answer"] = False
+        key_list = []
         # 处理特殊按键
         match key:
             case "=" | "M+" | "M-" | "MC":
                 state["showing_answer"] = True
-                key_list = []
             case "SCI":
                 # 切换科学计数法状态
                 state["use_scientific"] = not state.get("use_scientific", False)
                 state["use_fraction"] = False
                 state["number_base"] = "Dec"
-                key_list = []
             case "S⇔D":
                 # 切换分数显示状态
                 state["use_fraction"] = not state.get("use_fraction", False)
                 state["use_scientific"] = False
                 state["number_base"] = "Dec"
-                key_list = []
             case "Dec" | "Bin" | "Oct" | "Hex":
                 state["number_base"] = key
                 state["use_scientific"] = False
                 state["use_fraction"] = False
-                key_list = []
             case "Deg" | "Rad" | "Hyp":
                 # 切换角度模式
                 state["angle_mode"] = key
-                key_list = []
             case "DEL":
-                # 删除光标左侧的一个 token
-                if cursor_index > 0:
-                    expression.pop(cursor_index - 1)
-                    cursor_index -= 1
-                # 若左侧没有 token 了，就删除右侧
-                elif cursor_index < len(expression) - 1:
-                    expression.pop(cursor_index + 1)
-                key_list = []
+                # 删除光标左侧的一个 token，若左侧没有 token 了，就删除右侧
+                buffer.delete_left() or buffer.delete_right()
             case "AC":
                 # 全部清空
-                expression = ["|"]
-                key_list = []
+                buffer.clear()
             case "MC":
                 # 清除内存
                 state["memory"] = 0
-                key_list = []
             case "←":
                 # 光标左移
-                if cursor_index > 0:
-                    expression[cursor_index], expression[cursor_index - 1] = (
-                        expression[cursor_index - 1],
-                        expression[cursor_index],
-                    )
-                    cursor_index -= 1
-                key_list = []
+                buffer.move_left()
             case "→":
                 # 光标右移
-                if cursor_index < len(expression) - 1:
-                    expression[cursor_index], expression[cursor_index + 1] = (
-                        expression[cursor_index + 1],
-                        expression[cursor_index],
-                    )
-                    cursor_index += 1
-                key_list = []
+                buffer.move_right()
             case "Exit":
                 import sys
                 import webview
@@ -294,33 +135,456 @@ def handle_input(expression, state, key):
 
     # 将新的 key_list 插入到光标位置之前
     for k in key_list:
-        expression.insert(cursor_index, k)
-        cursor_index += 1
+        buffer.insert(k)
+
+
+def handle_input(expression, state, key):
+    """处理输入按键，维护 expression 数组，并将 '|' 视为光标位置。"""
+    buffer = ExpressionBuffer.from_wire(expression)
+    edit_buffer(buffer, state, key)
+    return buffer.to_wire()
+
+
+# 只改变显示格式、无需重新计算的按键
+FORMAT_ONLY_KEYS = {"SCI", "S⇔D", "Dec", "Bin", "Oct", "Hex"}
+# 完成一次运算、需要更新 Ans 的按键
+ANSWER_KEYS = {"=", "M+", "M-", "MC"}
+# 编辑表达式、切换角度模式的按键
+EDIT_KEYS = {"DEL", "AC", "←", "→"}
+ANGLE_KEYS = {"Deg", "Rad", "Hyp"}
+
+# 插入 token 的按键按第一个 token 的类别归类
+_TOKEN_KEY_TYPES = {
+    NUMBER: "number",
+    OPERAND: "operand",
+    FUNCTION: "function",
+    LPAR: "parenthesis",
+    RPAR: "parenthesis",
+}
+
+
+def key_type(key):
+    """按键的类别，用于统计"""
+    if not isinstance(key, str):
+        return "other"
+    if key in ANSWER_KEYS:
+        return "answer"
+    if key in FORMAT_ONLY_KEYS:
+        return "format"
+    if key in EDIT_KEYS:
+        return "edit"
+    if key in ANGLE_KEYS:
+        return "angle"
+    tokens = KEY_TOKENS.get(key, [key])
+    if not tokens:
+        return "other"
+    return _TOKEN_KEY_TYPES.get(lookup(tokens[0]).kind, "operator")
+
+
+def initial_state():
+    """返回计算器的初始状态"""
+    return {
+        "showing_answer": False,
+        "ans": 0,
+        "_current_ans": 0,
+        "_predicted_ans": 0,
+        "use_scientific": False,
+        "use_fraction": False,
+        "memory": 0,
+        "number_base": "Dec",
+        "angle_mode": "Deg",
+    }
+
+
+# 显示与计算设置：取值必须是 JSON 标量，它们会成为缓存键的一部分
+_SETTING_FIELDS = (
+    "showing_answer",
+    "use_scientific",
+    "use_fraction",
+    "number_base",
+    "angle_mode",
+    "numeric_backend",
+    "precision",
+    "base_fraction_digits",
+    "word_size",
+)
+
+
+def validate_state(state):
+    """
+    检查客户端传来的 state，无效时抛出 ValueError。
+    数值后端或精度无效时之后的每次计算都会失败，因此在进入服务端时拒绝。
+    """
+    if not isinstance(state, dict):
+        raise ValueError("state 必须是对象")
+    for name in _SETTING_FIELDS:
+        if isinstance(state.get(name), (list, dict)):
+            raise ValueError(f"{name} 的值无效")
+    for name in ("variables", "functions"):
+        if not isinstance(state.get(name, {}), dict):
+            raise ValueError(f"{name} 必须是对象")
+    get_backend(state)
+    return state
+
+
+def store_result(state, name, exact_name, value):
+    """
+    把结果写入 state[name]。精确的 Fraction 结果无法直接 JSON 序列化，
+    另存为 state[exact_name] 中的 "分子/分母" 字符串，格式切换与 Ans 都读取它。
+    """
+    state[name], exact = split_exact(value)
+    # 只在需要时写入，保持 float 后端下 state 的内容不变
+    if exact is not None or state.get(exact_name) is not None:
+        state[exact_name] = exact
+
+
+def predicted_value(state):
+    """最近一次预测结果，exact 后端下优先取精确值"""
+    backend = get_backend(state)
+    exact = state.get("_predicted_exact")
+    if exact is not None and backend.name == "exact":
+        return parse_fraction(exact)
+    return backend.coerce(state["_predicted_ans"])
+
+
+def commit_answer(state, key, ans):
+    """按键完成运算时更新 Ans 与内存"""
+    # state ans：当前运算中使用的 Ans 变量值
+    # state _current_ans：最新完成（=）的运算结果
+    # state _predicted_ans：最新预测的运算结果
+    if key in ANSWER_KEYS:
+        store_result(state, "_current_ans", "_current_exact", ans)
+    if key in ("M+", "M-"):
+        # 内存可能是其他数值后端留下的值，先转换为当前后端的类型
+        backend = get_backend(state)
+        memory = backend.coerce(state["memory"])
+        with localcontext(backend.context):
+            memory = memory + ans if key == "M+" else memory - ans
+        state["memory"] = split_exact(memory)[0]
+
+
+def press_key(buffer, state, key):
+    """在 ExpressionBuffer 上处理一次按键，返回显示结果"""
+    with stage("edit"):
+        edit_buffer(buffer, state, key)
+    tokens = buffer.tokens()
+    if key in FORMAT_ONLY_KEYS:
+        # 仅格式化
+        with stage("format"):
+            return format_only(tokens, state)
+    # 正常计算
+    result, ans = calculate(tokens, state, buffer)
+    commit_answer(state, key, ans)
+    return result
+
+
+def apply_key(expression, state, key):
+    """处理一次按键并计算显示结果，返回 (expression, result)"""
+    buffer = ExpressionBuffer.from_wire(expression)
+    result = press_key(buffer, state, key)
+    return buffer.to_wire(), result
+
+
+def _restore_prediction(skipped, state):
+    """
+    跳过的计算只会在成功时更新预测结果。之后的计算出错时，
+    从后往前补算跳过的按键（使用当时的 state），取最近一次成功的预测结果。
+    """
+    for i in range(len(skipped) - 1, -1, -1):
+        tokens, snapshot = skipped[i]
+        if _calculate(tokens, snapshot)[2]:
+            state["_predicted_ans"] = snapshot["_predicted_ans"]
+            exact = snapshot.get("_predicted_exact")
+            # 与逐个按键相同：store_result 在字段已存在时写入 None。
+            # 字段可能由更早的跳过按键（快照中没有）的精确结果创建
+            if (
+                exact is not None
+                or "_predicted_exact" in state
+                or _had_exact_prediction(skipped[:i])
+            ):
+                state["_predicted_exact"] = exact
+            break
+    skipped.clear()
+
+
+def _discard_skipped(skipped, state):
+    """
+    计算成功后丢弃跳过的按键。逐个按键时，它们的精确结果会创建 _predicted_exact，
+    之后的结果再写入 None；字段尚不存在时在这里补上
+    """
+    if "_predicted_exact" not in state and _had_exact_prediction(skipped):
+        state["_predicted_exact"] = None
+    skipped.clear()
+
+
+def _had_exact_prediction(skipped):
+    """跳过的按键中是否有成功且带精确值的预测结果（只有 exact 后端会产生）"""
+    for tokens, snapshot in skipped:
+        if snapshot.get("numeric_backend") != "exact":
+            continue
+        if _calculate(tokens, snapshot)[2] and snapshot.get("_predicted_exact"):
+            return True
+    return False
+
+
+def apply_keys(expression, state, keys):
+    """
+    依次处理多个按键（粘贴、宏），返回 (expression, result)，
+    expression、state 与 result 都与逐个调用 apply_key 相同。
+
+    中间按键的显示结果会被丢弃，只有 ANSWER_KEYS（更新 Ans 与内存）
+    与最后一个按键需要计算；其余按键只记下表达式与当时的 state，
+    在需要预测结果时才补算。
+    """
+    if not keys:
+        raise ValueError("没有按键")
+    buffer = ExpressionBuffer.from_wire(expression)
+    # 跳过计算的按键：(表达式, 当时的 state)
+    skipped = []
+    last = len(keys) - 1
+    for i, key in enumerate(keys):
+        with stage("edit"):
+            edit_buffer(buffer, state, key)
+        if key in FORMAT_ONLY_KEYS:
+            # 格式切换不改变表达式与数值，只有最后一个按键需要显示
+            if i == last:
+                _restore_prediction(skipped, state)
+                with stage("format"):
+                    result = format_only(buffer.tokens(), state)
+            continue
+        if i < last and key not in ANSWER_KEYS:
+            skipped.append((buffer.tokens(), dict(state)))
+            continue
+        result, ans, predicted = _calculate(buffer.tokens(), state, buffer)
+        if predicted:
+            _discard_skipped(skipped, state)
+        else:
+            _restore_prediction(skipped, state)
+        commit_answer(state, key, ans)
+    return buffer.to_wire(), result
+
+
+def strip_cursor(expression):
+    """去掉光标后的 token 元组"""
+    tokens = tuple(expression)
+    # 表达式中通常恰有一个光标，按位置切片比逐个比较快
+    try:
+        i = tokens.index("|")
+    except ValueError:
+        return tokens
+    rest = tokens[i + 1 :]
+    if "|" in rest:
+        rest = strip_cursor(rest)
+    return tokens[:i] + rest
+
+
+def compile_expression(expression, angle_mode="Deg", backend=FLOAT, source=None):
+    """
+    将表达式编译为 Program，相同的 token 序列、角度模式和数值后端只编译一次。
+    source 为表达式所在的 ExpressionBuffer，增量解析器从中取得编辑点
+    """
+    key = (strip_cursor(expression), angle_mode, backend.key)
+    program = program_cache.get(key)
+    if program is None:
+        postfix = incremental_parser.parse(key[0], source)
+        program = compile_postfix(postfix, angle_mode, backend)
+        program_cache.put(key, program)
+    return program
+
+
+def _value_key(value):
+    """相等但结果不同的值（0 与 0.0、0.0 与 -0.0）不能共用缓存"""
+    if isinstance(value, float):
+        return float, repr(value)
+    return type(value), value
+
+
+def result_key(tokens, state, backend):
+    """
+    结果缓存的键：token、角度模式、数值后端，以及表达式引用到的 Ans、M、
+    命名变量的值；调用用户函数时还包括全部函数体与变量。
+    含 Random 的表达式每次结果不同，返回 None 表示不缓存。
+    """
+    names = set(tokens)
+    if "Random" in names:
+        return None
+    key = (tokens, state.get("angle_mode", "Deg"), backend.key)
+    try:
+        if not names.isdisjoint(user_function_names):
+            # 函数体可以引用任何变量、Ans 与内存，全部计入键
+            functions = state.get("functions", {})
+            if any("Ran" in body for body in functions.values()):
+                return None
+            variables = state.get("variables", {})
+            names.update(("Ans", "M"))
+            key += (
+                tuple(sorted(functions.items())),
+                tuple(sorted((k, _value_key(v)) for k, v in variables.items())),
+            )
+        elif not names.isdisjoint(named_variables):
+            variables = state.get("variables", {})
+            key += tuple(
+                (name, _value_key(variables.get(name, 0)))
+                for name in sorted(names.intersection(named_variables))
+            )
+        if "Ans" in names:
+            key += (
+                _value_key(state.get("_current_ans")),
+                state.get("_current_exact"),
+            )
+        if "M" in names:
+            key += (_value_key(state.get("memory", 0)),)
+        hash(key)
+    except (AttributeError, TypeError):
+        return None
+    return key
+
+
+def cached_result(expression, state, compute=True, source=None):
+    """
+    取得表达式的 CachedResult，未缓存时计算并写入缓存。
+    compute 为 False 时只查缓存，未命中返回 None。
+    source 为表达式所在的 ExpressionBuffer（可以省略），见 compile_expression。
+    """
+    backend = get_backend(state)
+    tokens = strip_cursor(expression)
+    key = result_key(tokens, state, backend)
+    cached = result_cache.get(key) if key is not None else None
+    if cached is None and compute:
+        try:
+            with stage("parse"):
+                program = compile_expression(
+                    tokens, state.get("angle_mode", "Deg"), backend, source
+                )
+            # Ans、M 或变量改变后重算同一表达式时使用优化后的程序
+            with stage("evaluate"):
+                cached = CachedResult(value=reuse(program).run(state))
+        except ValueError as e:
+            cached = CachedResult(error=f"Error: {str(e)}")
+        if key is not None:
+            result_cache.put(key, cached)
+    return cached
+
+
+def render_cached(cached, state):
+    """按当前显示模式取得（或生成）缓存结果的显示文本"""
+    if state.get("use_scientific", False):
+        mode = "SCI"
+    elif state.get("use_fraction", False):
+        mode = "S⇔D"
+    else:
+        mode = (
+            state.get("number_base", "Dec"),
+            state.get("base_fraction_digits", DEFAULT_FRACTION_DIGITS),
+            state.get("word_size"),
+        )
+    text = cached.render(mode, lambda value: format_value(value, state))
+    return f"{answer_prefix(state)}{text}"
+
+
+def format_only(expression, state):
+    """格式切换：优先使用当前表达式的缓存结果，否则格式化最近一次预测结果"""
+    try:
+        cached = cached_result(expression, state, compute=False)
+    except ValueError:
+        cached = None
+    try:
+        if cached is not None and cached.error is None:
+            return render_cached(cached, state)
+        return format_result(predicted_value(state), state)
+    except ValueError as e:
+        # 无效的显示设置（进制、小数位数、字长）与计算出错时一样显示错误
+        return f"Error: {str(e)}"
+
 
-    return expression
+def calculate(expression, state, source=None):
+    """计算表达式的值，source 为表达式所在的 ExpressionBuffer（可以省略）"""
+    str_result, result, _ = _calculate(expression, state, source)
+    return str_result, result
 
 
-def calculate(expression, state):
-    """计算表达式的值"""
-    processed = preprocess_tokens(expression)
+def _calculate(expression, state, source=None):
+    """calculate 的实现，另外返回是否更新了预测结果（格式化出错时也已更新）"""
+    predicted = False
     try:
-        postfix = tokens_to_postfix(processed)
-        result = evaluate_postfix(postfix, state)
+        cached = cached_result(expression, state, source=source)
+        if cached.error is not None:
+            return cached.error, 0, False
+        result = cached.value
 
         # 更新预测结果
-        state["_predicted_ans"] = result
+        store_result(state, "_predicted_ans", "_predicted_exact", result)
+        predicted = True
 
         # 格式化结果
-        str_result = format_result(result, state)
-        return str_result, result
+        with stage("format"):
+            str_result = render_cached(cached, state)
+        return str_result, result, True
     except ValueError as e:
-        return f"Error: {str(e)}", 0
+        return f"Error: {str(e)}", 0, predicted
     except Exception as e:
-        import traceback
+        logger.exception("计算出错: %s", expression)
+        return f"Error: {str(e)}", 0, predicted
+
+
+def evaluation_state(state=None):
+    """不经过按键的求值使用的 state：补全 Ans、内存与角度模式的默认值"""
+    return {"_current_ans": 0, "memory": 0, "angle_mode": "Deg", **(state or {})}
+
+
+def evaluate_text(text, state=None):
+    """
+    计算文本表达式（如 "12+sin(30)*3!"），无需逐键模拟输入。
+    返回 {"value", "result"}；表达式有误时抛出异常。
+    """
+    state = evaluation_state(state)
+    with stage("parse"):
+        program = compile_text(text, state["angle_mode"], get_backend(state))
+    with stage("evaluate"):
+        result = reuse(program).run(state)
+    with stage("format"):
+        return {"value": split_exact(result)[0], "result": format_value(result, state)}
+
+
+def iter_evaluate(expressions, state=None):
+    """
+    逐个计算一批表达式，按输入顺序生成结果。
+    表达式可以是 token 列表或文本；重复的表达式只编译一次。
+    每一项生成 {"value", "result"} 或 {"error"}，单项出错不影响其余项。
+    """
+    state = evaluation_state(state)
+    angle_mode = state["angle_mode"]
+    programs = LRUCache(maxsize=4096)
+
+    for expression in expressions:
+        try:
+            if isinstance(expression, str):
+                key = expression
+            elif isinstance(expression, list):
+                key = strip_cursor(expression)
+            else:
+                raise ValueError("表达式必须是 token 列表或文本")
+            program = programs.get(key)
+            if program is None:
+                if isinstance(key, str):
+                    records = preprocess_records(lex_text(key))
+                else:
+                    records = preprocess_tokens(key)
+                postfix = tokens_to_postfix(records)
+                program = compile_postfix(postfix, angle_mode, get_backend(state))
+                programs.put(key, program)
+            result = program.run(state)
+            yield {
+                "value": split_exact(result)[0],
+                "result": format_value(result, state),
+            }
+        except Exception as e:
+            yield {"error": str(e)}
+
 
-        print(f"错误: {str(e)}")
-        print(traceback.format_exc())
-        return f"Error: {str(e)}", 0
+def evaluate_many(expressions, state=None):
+    """计算一批表达式，返回与输入顺序一致的结果列表"""
+    return list(iter_evaluate(expressions, state))
 
 
 def decimal_to_fraction(decimal):
@@ -334,61 +598,64 @@ def decimal_to_fraction(decimal):
         return f"{decimal}/1"
 
 
-def format_number_base(number, base):
-    """根据进制格式化数字，包括整数和小数"""
+def format_number_base(
+    number, base, fraction_digits=DEFAULT_FRACTION_DIGITS, word_size=None
+):
+    """根据进制格式化数字，包括整数和小数（精确展开，见 radix.format_base）"""
+    return format_base(number, base, fraction_digits, word_size)
 
-    def convert_fractional_part(fraction, base):
-        """将小数部分转换为指定进制"""
-        result = []
-        hex_digits = "0123456789ABCDEF"  # 十六进制数字表
-        for _ in range(15):  # 限制精度为 15 位
-            fraction *= base
-            digit = int(fraction)
-            # 根据进制选择正确的数字表示
-            if base == 16:
-                result.append(hex_digits[digit])
-            else:
-                result.append(str(digit))
-            fraction -= digit
-            if fraction == 0:
-                break
-        return "".join(result)
-
-    if base not in ["Bin", "Oct", "Hex"]:
-        raise ValueError("Base must be 'Bin', 'Oct', or 'Hex'")
-    base_map = {"Bin": 2, "Oct": 8, "Hex": 16}
-    base_value = base_map[base]
-
-    if isinstance(number, str):
-        number = float(number)
-    # 处理整数部分和小数部分
-    integer_part = int(number)
-    fractional_part = number - integer_part
-    # 转换整数部分
-    if base == "Bin":
-        integer_str = bin(integer_part)[2:]
-    elif base == "Oct":
-        integer_str = oct(integer_part)[2:]
-    elif base == "Hex":
-        integer_str = hex(integer_part)[2:].upper()
-    # 转换小数部分
-    if fractional_part > 0:
-        fractional_str = convert_fractional_part(fractional_part, base_value)
-        return f"{integer_str}.{fractional_str}"
-    else:
-        return integer_str
 
+def format_number(number, spec):
+    """
+    按格式说明格式化数值。
+    分子、分母超过 int 转字符串上限的 Fraction 先转换为 float；
+    超出 float 范围的整数（如大数阶乘）与 Fraction 精确取出前导数字后按 Decimal 格式化。
+    """
+    try:
+        return format(number, spec)
+    except (OverflowError, ValueError):
+        if not isinstance(number, (int, Fraction)):
+            raise
+    try:
+        return format(float(number), spec)
+    except OverflowError:
+        return format(leading_decimal(number, 30), spec)
 
-def format_result(result, state):
-    """格式化结果"""
+
+def format_value(result, state):
+    """按当前显示模式格式化数值（不含 Ans 前缀）"""
+    # decimal 后端按设定的精度显示全部有效数字
+    digits = get_backend(state).digits
     if state.get("use_scientific", False):
-        str_result = f"{result:.30e}"
+        if digits is None:
+            str_result = format_number(result, ".30e")
+        else:
+            str_result = format_scientific(result, digits)
     elif state.get("use_fraction", False):
-        str_result = decimal_to_fraction(result)
+        if isinstance(result, Fraction):
+            # 精确值无需再从小数反推分数
+            str_result = f"{result.numerator}/{result.denominator}"
+        else:
+            str_result = decimal_to_fraction(result)
     elif state.get("number_base", "Dec") != "Dec":
-        str_result = format_number_base(result, state.get("number_base", "Dec"))
+        str_result = format_number_base(
+            result,
+            state.get("number_base", "Dec"),
+            state.get("base_fraction_digits", DEFAULT_FRACTION_DIGITS),
+            state.get("word_size"),
+        )
+    elif digits is None:
+        str_result = format_number(result, ".15g")
     else:
-        str_result = f"{result:.15g}"
+        str_result = format_decimal(result, digits)
+    return str_result
+
+
+def answer_prefix(state):
+    return "Ans = " if state["showing_answer"] else "Ans (predicted) = "
 
-    prefix = "Ans = " if state["showing_answer"] else "Ans (predicted) = "
-    return f"{prefix}{str_result}"
+
+def format_result(result, state):
+    """格式化结果"""
+    str_result = format_value(result, state)
+    return f"{answer_prefix(state)}{str_result}"
@@ -0,0 +1,175 @@
+from decimal import DecimalException, localcontext
+
+from cache import LRUCache
+from numeric import FLOAT, decimal_error
+from preprocess import lex_text, preprocess_records, tokens_to_postfix
+from registry import TOKENS_BY_OPCODE, user_function_names
+
+# 指令类型
+PUSH = 0  # 压入常量
+LOAD = 1  # 从 state 读取变量
+UNARY = 2  # 一元运算
+BINARY = 3  # 二元运算
+FAIL = 4  # 执行到此处时报错
+CALL = 5  # 调用用户函数
+
+# 用户函数的最大嵌套深度，防止函数互相调用时无限递归
+MAX_CALL_DEPTH = 32
+
+# 文本表达式（包括用户函数的函数体）的编译结果：键为文本、角度模式和数值后端
+text_programs = LRUCache(maxsize=512)
+
+
+def _unknown_operation(token):
+    def fail(*args):
+        raise ValueError(f"未知运算: {token}")
+
+    return fail
+
+
+class Program:
+    """编译后的后缀表达式，可以在不同的 state 下重复执行"""
+
+    __slots__ = ("postfix", "angle_mode", "backend", "code", "optimized")
+
+    def __init__(self, postfix, angle_mode, backend, code):
+        self.postfix = postfix
+        self.angle_mode = angle_mode
+        self.backend = backend
+        self.code = code
+        # 优化后的程序，由 optimizer 在需要时生成（False 表示执行过一次、尚未优化）
+        self.optimized = None
+
+    def run(self, state):
+        """执行程序，返回表达式的值"""
+        context = self.backend.context
+        if context is None:
+            return self._execute(state)
+        # decimal 后端：在后端的精度下执行，信号异常转换为普通的计算错误
+        with localcontext(context):
+            try:
+                return self._execute(state)
+            except DecimalException as e:
+                raise decimal_error(e) from None
+
+    def _execute(self, state):
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        for op, arg in self.code:
+            if op == PUSH:
+                push(arg)
+            elif op == UNARY:
+                if not stack:
+                    raise ValueError("缺少操作数")
+                push(arg(pop()))
+            elif op == BINARY:
+                if len(stack) < 2:
+                    raise ValueError("缺少操作数")
+                b = pop()
+                push(arg(pop(), b))
+            elif op == LOAD:
+                push(arg(state))
+            elif op == CALL:
+                if not stack:
+                    raise ValueError("缺少操作数")
+                push(self._call(arg, pop(), state))
+            else:
+                raise ValueError(arg)
+
+        if not stack:
+            return 0
+        if len(stack) > 1:
+            raise ValueError("操作符不足")
+        return stack[0]
+
+    def _call(self, name, argument, state):
+        """以 x = argument 执行用户函数的函数体"""
+        body = state.get("functions", {}).get(name)
+        if body is None:
+            raise ValueError(f"函数 {name} 未定义")
+        depth = state.get("_call_depth", 0)
+        if depth >= MAX_CALL_DEPTH:
+            raise ValueError("函数嵌套过深")
+        program = compile_text(body, self.angle_mode, self.backend)
+        return program._execute(
+            {
+                **state,
+                "variables": {**state.get("variables", {}), "x": argument},
+                "_call_depth": depth + 1,
+            }
+        )
+
+
+# 按 (后端, 角度模式) 缓存的 opcode 分派表
+_dispatch_tables = {}
+
+
+def _dispatch_table(backend, angle_mode):
+    """
+    按 opcode 索引的指令表，每个后端与角度模式只生成一次。
+    数字与未登记的 token 对应 None，编译时再逐个解析。
+    """
+    key = (backend.key, angle_mode)
+    table = _dispatch_tables.get(key)
+    if table is not None:
+        return table
+    unary_ops = backend.unary_table(angle_mode)
+    binary_ops = backend.binary_ops
+    table = []
+    for token in TOKENS_BY_OPCODE:
+        text = token.text
+        if text in user_function_names:
+            table.append((CALL, text))
+        elif token.arity == 1:
+            table.append((UNARY, unary_ops.get(text) or _unknown_operation(text)))
+        elif token.arity == 2:
+            table.append((BINARY, binary_ops.get(text) or _unknown_operation(text)))
+        elif text in backend.loaders:
+            table.append((LOAD, backend.loaders[text]))
+        elif text in backend.constants:
+            table.append((PUSH, backend.constants[text]))
+        else:
+            table.append(None)
+    table = tuple(table)
+    _dispatch_tables[key] = table
+    return table
+
+
+def _compile_operand(text, backend):
+    """数字与未登记的 token：常量预先解析，无法解析的推迟到执行时报错"""
+    if text in backend.loaders:
+        return LOAD, backend.loaders[text]
+    if text in backend.constants:
+        return PUSH, backend.constants[text]
+    try:
+        return PUSH, backend.parse(text)
+    except ValueError:
+        # 语法错误推迟到执行时报告，保持与逐个求值相同的报错顺序
+        return FAIL, f"语法错误: {text}"
+
+
+def compile_postfix(tokens, angle_mode="Deg", backend=FLOAT):
+    """
+    将后缀表达式（记号表中的记录）编译为 Program：常量预先解析，运算符预先绑定。
+    backend 为 numeric 中的数值后端，决定数的类型与运算的实现。
+    """
+    table = _dispatch_table(backend, angle_mode)
+    code = []
+    for token in tokens:
+        instruction = table[token.opcode]
+        if instruction is None:
+            instruction = _compile_operand(token.text, backend)
+        code.append(instruction)
+    return Program(tuple(tokens), angle_mode, backend, tuple(code))
+
+
+def compile_text(text, angle_mode="Deg", backend=FLOAT):
+    """将文本表达式编译为 Program，相同的文本、角度模式和数值后端只编译一次"""
+    key = (text, angle_mode, backend.key)
+    program = text_programs.get(key)
+    if program is None:
+        postfix = tokens_to_postfix(preprocess_records(lex_text(text)))
+        program = compile_postfix(postfix, angle_mode, backend)
+        text_programs.put(key, program)
+    return program
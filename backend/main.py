@@ -1,18 +1,30 @@
+import importlib
 import os
 import sys
-from server import create_app
+import threading
+import time
 
-PORT = 8848
+# 导入 main 的时刻，启动耗时以此为起点
+_START = time.perf_counter()
+
+HOST = "127.0.0.1"
+# 等待后端开始监听的最长时间（秒）
+READY_TIMEOUT = 30
 
 if getattr(sys, "frozen", False):
     # Pyinstaller package
-    STATICPATH = os.path.join(sys._MEIPASS, "static")  # type:ignore
+    STATICPATH = os.path.join(sys._MEIPASS, "static")  # type: ignore
     # ICONPATH = os.path.join(sys._MEIPASS, "favicon.png")
 else:
     # Development mode
     STATICPATH = os.path.join(os.path.dirname(__file__), "../frontend/out")
     # ICONPATH = os.path.join(os.path.dirname(__file__), "../favicon.png")
 
+# 后端就绪前窗口显示的页面
+LOADING_PAGE = """<!DOCTYPE html>
+<html><body style="margin:0;height:100vh;display:flex;align-items:center;
+justify-content:center;font-family:sans-serif;color:#888">正在启动…</body></html>"""
+
 
 def hide_console():
     """隐藏命令行窗口"""
@@ -41,15 +53,107 @@ def is_dark_mode():
         return False
 
 
-if __name__ == "__main__":
-    hide_console()
-
-    import threading
+def _pad(text, width):
+    """按显示宽度左对齐，中文字符占两列"""
+    return text + " " * (width - sum(2 if ord(c) > 0x2E80 else 1 for c in text))
+
+
+class StartupProfile:
+    """记录启动各阶段的起止时刻（相对导入 main 的时刻），enabled 为 False 时不记录"""
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.phases = []
+        self._lock = threading.Lock()
+
+    def record(self, name, start, end=None):
+        if self.enabled:
+            with self._lock:
+                thread = threading.current_thread().name
+                self.phases.append(
+                    (name, start - _START, (end or start) - _START, thread)
+                )
+
+    def mark(self, name):
+        """记录一个时刻"""
+        self.record(name, time.perf_counter())
+
+    def timed(self, name, function, *args, **kwargs):
+        """执行 function 并记录耗时"""
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.record(name, start, time.perf_counter())
+
+    def report(self):
+        print("启动耗时（ms，从导入 main 算起）:")
+        print(f"  {_pad('阶段', 16)}{'开始':>7}{'结束':>7}{'耗时':>7}  线程")
+        for name, start, end, thread in sorted(self.phases, key=lambda p: p[2]):
+            duration = f"{(end - start) * 1e3:9.1f}" if end > start else " " * 9
+            print(f"  {name:<16}{start * 1e3:9.1f}{end * 1e3:9.1f}{duration}  {thread}")
+        print("每个模块的导入耗时可用 python -X importtime main.py 查看")
+
+
+class Backend(threading.Thread):
+    """
+    在后台线程中导入 Flask 与计算模块并启动服务，与窗口的初始化同时进行。
+    监听套接字建立后（此时已经可以接受连接）设置 ready，端口由系统分配。
+    """
+
+    def __init__(self, static_folder, profile):
+        super().__init__(name="backend", daemon=True)
+        self.static_folder = static_folder
+        self.profile = profile
+        self.ready = threading.Event()
+        self.url = None
+        self.error = None
+
+    def run(self):
+        try:
+            for module in ("flask", "core", "server"):
+                self.profile.timed(f"导入 {module}", importlib.import_module, module)
+            from server import create_app
+            from werkzeug.serving import make_server
+
+            app = self.profile.timed("创建应用", create_app, self.static_folder)
+            # 端口 0：由系统分配空闲端口，避免与其他程序冲突
+            server = self.profile.timed(
+                "监听端口", make_server, HOST, 0, app, threaded=True
+            )
+        except Exception as e:
+            self.error = e
+            self.ready.set()
+            raise
+        self.url = f"http://{HOST}:{server.server_port}"
+        self.profile.mark("后端就绪")
+        self.ready.set()
+        server.serve_forever()
+
+
+def _import_webview():
+    # 使用 import 语句，PyInstaller 才能找到并打包 webview
     import webview
 
-    static_folder_path = STATICPATH
-    production_mode = True
+    return webview
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="科学计算器")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="页面加载完成后打印各启动阶段的耗时",
+    )
+    args = parser.parse_args()
+
+    profile = StartupProfile(args.profile_startup)
+    if not args.profile_startup:
+        hide_console()
 
+    static_folder_path = STATICPATH
     if not os.path.isabs(static_folder_path):
         static_folder_path = os.path.abspath(static_folder_path)
 
@@ -57,20 +161,47 @@ if __name__ == "__main__":
         print(f"错误: 指定的静态文件路径不存在: {static_folder_path}")
         sys.exit(1)
 
-    app = create_app(static_folder_path)
-    flask_thread = threading.Thread(
-        target=app.run, kwargs={"debug": not production_mode, "port": PORT}
-    )
-    flask_thread.daemon = True  # 守护线程
-    flask_thread.start()
+    backend = Backend(static_folder_path, profile)
+    backend.start()
 
-    webview.create_window(
+    webview = profile.timed("导入 webview", _import_webview)
+    window = webview.create_window(
         "Scientific Calculator",
-        f"http://127.0.0.1:{PORT}",
+        html=LOADING_PAGE,
         width=600,
         height=800,
         # background_color="#09090b" if is_dark_mode() else "#ffffff",
     )
+    loading = threading.Event()
+    reported = threading.Event()
+
+    def load_when_ready():
+        # webview.start 在窗口创建后于单独的线程中调用
+        profile.mark("窗口就绪")
+        if not backend.ready.wait(READY_TIMEOUT) or backend.error is not None:
+            window.load_html(f"<p>后端启动失败: {backend.error or '超时'}</p>")
+            return
+        loading.set()
+        window.load_url(backend.url)
+
+    def on_loaded():
+        # 先加载的是启动页面，计算器页面加载完成后才输出
+        if loading.is_set() and not reported.is_set():
+            reported.set()
+            profile.mark("页面加载完成")
+            profile.report()
+
+    if args.profile_startup:
+        window.events.loaded += on_loaded
     # Windows pywebview 不支持自定义图标，其通过可执行文件指定图标
     # webview.start(icon=ICONPATH)
-    webview.start()
+    webview.start(load_when_ready)
+
+
+if __name__ == "__main__":
+    # 打包后的程序需要支持 multiprocessing 启动计算进程；
+    # 子进程的命令行参数由 multiprocessing 传入，必须在解析参数之前处理
+    import multiprocessing
+
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,181 @@
+"""
+请求的分阶段计时与汇总指标。
+
+- stage(name)：记录当前请求中一个阶段（解析、求值、格式化等）的耗时。
+  耗时保存在 contextvar 中，不同线程与协程的请求互不影响；
+  没有调用 begin() 时（命令行、基准测试）只多一次 contextvar 查询
+- begin() / finish()：开始、结束一次请求的记录，current() 取得已记录的部分
+- Metrics：各阶段耗时的分位数、按键类别计数与错误计数，以 Prometheus 文本格式输出
+"""
+
+import threading
+from collections import Counter, deque
+from contextvars import ContextVar
+from time import perf_counter
+
+# 分位数按每个 (接口, 阶段) 最近 WINDOW 次的耗时计算
+WINDOW = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+# 错误信息作为标签，限制不同取值的数量
+MAX_ERROR_LABELS = 100
+MAX_LABEL_LENGTH = 64
+
+# 当前请求各阶段的耗时（秒），未开始记录时为 None
+_timings = ContextVar("stage_timings", default=None)
+
+
+class _Stage:
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = perf_counter() - self.start
+        self.timings[self.name] = self.timings.get(self.name, 0.0) + elapsed
+
+
+class _Untimed:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_UNTIMED = _Untimed()
+
+
+def stage(name):
+    """记录一个阶段的耗时：with stage("parse"): ...，同名阶段的耗时累加"""
+    timings = _timings.get()
+    if timings is None:
+        return _UNTIMED
+    return _Stage(timings, name)
+
+
+def begin():
+    """开始记录当前请求，返回交给 finish 的标记"""
+    return _timings.set({})
+
+
+def current():
+    """当前请求到目前为止各阶段的耗时（副本），未开始记录时为空"""
+    return dict(_timings.get() or {})
+
+
+def finish(token):
+    """结束记录，返回 {阶段: 耗时（秒）}"""
+    timings = _timings.get()
+    _timings.reset(token)
+    return timings or {}
+
+
+def server_timing(timings):
+    """Server-Timing 响应头，耗时以毫秒为单位"""
+    return ", ".join(
+        f"{name};dur={seconds * 1e3:.3f}" for name, seconds in timings.items()
+    )
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def error_label(message):
+    """
+    错误信息归类：去掉 "Error: " 前缀与冒号后的具体内容，
+    如 "Error: 语法错误: 1..2" 归为 "语法错误"
+    """
+    message = message.removeprefix("Error: ")
+    return message.split(":", 1)[0].strip()[:MAX_LABEL_LENGTH] or "未知错误"
+
+
+class Metrics:
+    """线程安全的指标汇总"""
+
+    def __init__(self, window=WINDOW):
+        self._lock = threading.Lock()
+        self._window = window
+        # (接口, 阶段) -> 最近的耗时
+        self._samples = {}
+        # (接口, 阶段) -> [次数, 总耗时]
+        self._totals = {}
+        self._keys = Counter()
+        self._errors = Counter()
+
+    def observe(self, endpoint, timings):
+        """记录一次请求各阶段的耗时"""
+        with self._lock:
+            for name, seconds in timings.items():
+                key = (endpoint, name)
+                samples = self._samples.get(key)
+                if samples is None:
+                    samples = self._samples[key] = deque(maxlen=self._window)
+                    self._totals[key] = [0, 0.0]
+                samples.append(seconds)
+                totals = self._totals[key]
+                totals[0] += 1
+                totals[1] += seconds
+
+    def count_key(self, key_type):
+        with self._lock:
+            self._keys[key_type] += 1
+
+    def count_error(self, message):
+        label = error_label(message)
+        with self._lock:
+            if label not in self._errors and len(self._errors) >= MAX_ERROR_LABELS:
+                label = "其他"
+            self._errors[label] += 1
+
+    def render(self):
+        """Prometheus 文本格式"""
+        with self._lock:
+            samples = {key: sorted(values) for key, values in self._samples.items()}
+            totals = {key: tuple(value) for key, value in self._totals.items()}
+            keys = dict(self._keys)
+            errors = dict(self._errors)
+
+        lines = [
+            f"# HELP calculator_stage_seconds 请求各阶段的耗时（分位数取最近 {self._window} 次）",
+            "# TYPE calculator_stage_seconds summary",
+        ]
+        for (endpoint, name), values in sorted(samples.items()):
+            labels = _labels(endpoint=endpoint, stage=name)
+            for q in QUANTILES:
+                value = values[min(len(values) - 1, int(q * len(values)))]
+                lines.append(
+                    f'calculator_stage_seconds{{{labels},quantile="{q}"}} {value:.9f}'
+                )
+            count, total = totals[(endpoint, name)]
+            lines.append(f"calculator_stage_seconds_sum{{{labels}}} {total:.9f}")
+            lines.append(f"calculator_stage_seconds_count{{{labels}}} {count}")
+
+        lines += [
+            "# HELP calculator_keys_total 按类别统计的按键次数",
+            "# TYPE calculator_keys_total counter",
+        ]
+        for key_type, count in sorted(keys.items()):
+            lines.append(f"calculator_keys_total{{{_labels(type=key_type)}}} {count}")
+
+        lines += [
+            "# HELP calculator_errors_total 按错误信息统计的计算错误次数",
+            "# TYPE calculator_errors_total counter",
+        ]
+        for message, count in sorted(errors.items()):
+            lines.append(
+                f"calculator_errors_total{{{_labels(message=message)}}} {count}"
+            )
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,850 @@
+"""
+数值后端：决定表达式中的数用什么类型表示、运算表如何实现。
+
+- float：IEEE 双精度，默认后端，运算直接映射到 math 模块
+- decimal：decimal.Decimal，有效数字位数由 state["precision"] 指定，
+  超越函数按级数在略高的精度下计算后再舍入
+- exact：有理数运算保持为精确的 Fraction，遇到无理运算时退回 float
+
+后端由 state["numeric_backend"] 选择。每个后端按角度模式预先生成运算表，
+编译后的 Program 直接绑定对应后端的函数，float 路径没有额外的类型判断。
+"""
+
+import math
+import random
+from decimal import (
+    ROUND_DOWN,
+    Context,
+    Decimal,
+    InvalidOperation,
+    Overflow,
+    localcontext,
+)
+from fractions import Fraction
+from threading import Lock
+
+from registry import named_variables, variable_names
+
+DEFAULT_PRECISION = 50
+MAX_PRECISION = 1000
+
+# 计算超越函数时额外保留的位数
+_GUARD_DIGITS = 5
+
+
+class Backend:
+    """一种数值后端：字面量解析、常量、变量读取与各角度模式下的运算表"""
+
+    __slots__ = (
+        "name",
+        "digits",
+        "context",
+        "parse",
+        "coerce",
+        "constants",
+        "loaders",
+        "unary_ops",
+        "binary_ops",
+    )
+
+    def __init__(
+        self,
+        name,
+        digits,
+        context,
+        parse,
+        coerce,
+        constants,
+        unary_ops,
+        binary_ops,
+        loaders=None,
+    ):
+        self.name = name
+        # 显示的有效数字位数，None 表示沿用 float 的显示格式
+        self.digits = digits
+        # 执行时使用的 decimal 上下文，float 后端为 None
+        self.context = context
+        self.parse = parse
+        self.coerce = coerce
+        self.constants = constants
+        self.loaders = {
+            **(
+                loaders
+                or {
+                    "Random": lambda state: coerce(random.random()),
+                    "Ans": lambda state: coerce(state["_current_ans"]),
+                    "M": lambda state: coerce(state.get("memory", 0)),
+                }
+            ),
+            **{name: _variable_loader(coerce, name) for name in named_variables},
+            **{name: _argument_loader(coerce, name) for name in variable_names},
+        }
+        self.unary_ops = unary_ops
+        self.binary_ops = binary_ops
+
+    @property
+    def key(self):
+        """区分编译结果的键：同一后端不同精度的运算表不能共用"""
+        return (self.name, self.digits)
+
+    def unary_table(self, angle_mode):
+        """取得角度模式对应的一元运算表，未知模式按弧度处理"""
+        return self.unary_ops.get(angle_mode, self.unary_ops["Rad"])
+
+
+def _variable_loader(coerce, name):
+    """读取命名变量，未赋值的变量为 0"""
+
+    def load(state):
+        return coerce(state.get("variables", {}).get(name, 0))
+
+    return load
+
+
+def _argument_loader(coerce, name):
+    """读取自由变量（用户函数的参数），未绑定时与未知 token 一样报语法错误"""
+
+    def load(state):
+        value = state.get("variables", {}).get(name)
+        if value is None:
+            raise ValueError(f"语法错误: {name}")
+        return coerce(value)
+
+    return load
+
+
+def _unary_tables(common, trig):
+    """由公共运算与 {角度模式: 三角函数} 生成各模式的一元运算表"""
+    tables = {}
+    for mode, functions in trig.items():
+        ops = dict(common)
+        ops.update(functions)
+        tables[mode] = ops
+    return tables
+
+
+# float 后端
+
+
+def _factorial(x):
+    if x < 0 or not x.is_integer():
+        raise ValueError("阶乘只能用于非负整数")
+    return math.factorial(int(x))
+
+
+def _sqrt(x):
+    if x < 0:
+        raise ValueError("平方根的参数不能为负数")
+    return math.sqrt(x)
+
+
+def _log(x):
+    if x <= 0:
+        raise ValueError("对数的参数必须为正数")
+    return math.log10(x)
+
+
+def _ln(x):
+    if x <= 0:
+        raise ValueError("对数的参数必须为正数")
+    return math.log(x)
+
+
+def _divide(a, b):
+    if b == 0:
+        raise ValueError("除数不能为零")
+    return a / b
+
+
+def _mod(a, b):
+    if b == 0:
+        raise ValueError("除数不能为零")
+    return a % b
+
+
+def _power(a, b):
+    try:
+        result = pow(a, b)
+    except OverflowError:
+        raise ValueError("结果过大")
+    # 负数的非整数次幂在 Python 中得到复数，与 decimal 后端一样报错
+    if isinstance(result, complex):
+        raise ValueError("结果不是实数")
+    return result
+
+
+def _check_combinatorics(a, b, name):
+    if not (a >= 0 and b >= 0 and a.is_integer() and b.is_integer()):
+        raise ValueError(f"{name}的参数必须是非负整数")
+    if b > a:
+        raise ValueError(f"{name}的第二个参数不能大于第一个参数")
+
+
+def _permutation(a, b):
+    _check_combinatorics(a, b, "排列数")
+    # P(n,r) = n!/(n-r)!，math.perm 直接连乘，不构造两个阶乘
+    return math.perm(int(a), int(b))
+
+
+def _combination(a, b):
+    _check_combinatorics(a, b, "组合数")
+    # C(n,r) = n!/((n-r)!r!)，math.comb 按 min(r, n-r) 项计算
+    return math.comb(int(a), int(b))
+
+
+def _coerce_float(value):
+    """Ans 与内存可能来自其他后端（字符串、Decimal、Fraction），统一转换为 float"""
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            # exact 后端保存的 "分子/分母"
+            return float(Fraction(value))
+    if isinstance(value, (Decimal, Fraction)):
+        return float(value)
+    return value
+
+
+FLOAT = Backend(
+    name="float",
+    digits=None,
+    context=None,
+    parse=float,
+    coerce=_coerce_float,
+    constants={"π": math.pi, "e": math.e},
+    unary_ops=_unary_tables(
+        {
+            "!": _factorial,
+            "%": lambda x: x / 100,
+            "abs": abs,
+            "int": int,
+            "sqrt": _sqrt,
+            "cbrt": lambda x: math.copysign(abs(x) ** (1 / 3), x),  # 支持负数的立方根
+            "log": _log,
+            "ln": _ln,
+            "(+)": lambda x: x,
+            "(-)": lambda x: -x,
+        },
+        {
+            "Deg": {
+                "sin": lambda x: math.sin(x * math.pi / 180),
+                "cos": lambda x: math.cos(x * math.pi / 180),
+                "tan": lambda x: math.tan(x * math.pi / 180),
+                "arcsin": lambda x: math.asin(x) * 180 / math.pi,
+                "arccos": lambda x: math.acos(x) * 180 / math.pi,
+                "arctan": lambda x: math.atan(x) * 180 / math.pi,
+            },
+            "Rad": {
+                "sin": math.sin,
+                "cos": math.cos,
+                "tan": math.tan,
+                "arcsin": math.asin,
+                "arccos": math.acos,
+                "arctan": math.atan,
+            },
+            "Hyp": {
+                "sin": math.sinh,
+                "cos": math.cosh,
+                "tan": math.tanh,
+                "arcsin": math.asinh,
+                "arccos": math.acosh,
+                "arctan": math.atanh,
+            },
+        },
+    ),
+    binary_ops={
+        "+": lambda a, b: a + b,
+        "-": lambda a, b: a - b,
+        "*": lambda a, b: a * b,
+        "/": _divide,
+        "mod": _mod,
+        "^": _power,
+        "nPr": _permutation,
+        "nCr": _combination,
+    },
+)
+
+
+# decimal 后端
+# 运算在 Program.run 设置的上下文中执行，整数（阶乘、排列组合的结果）保持为 int
+
+
+def _is_integral(x):
+    if isinstance(x, int):
+        return True
+    return x.is_finite() and x == x.to_integral_value()
+
+
+def _guarded(func):
+    """以更高的精度计算，结果再按当前精度舍入"""
+
+    def wrapper(x):
+        with localcontext() as ctx:
+            ctx.prec += _GUARD_DIGITS
+            y = func(Decimal(x))
+        return +y
+
+    return wrapper
+
+
+def _compute_pi():
+    """按当前精度计算 π（decimal 文档中的级数）"""
+    with localcontext() as ctx:
+        ctx.prec += 2
+        three = Decimal(3)
+        lasts, t, s, n, na, d, da = 0, three, 3, 1, 0, 0, 24
+        while s != lasts:
+            lasts = s
+            n, na = n + na, na + 8
+            d, da = d + da, da + 32
+            t = (t * n) / d
+            s += t
+    return +s
+
+
+def _sin_series(x):
+    s, term, i = x, x, 1
+    x2 = x * x
+    while True:
+        i += 2
+        term = -term * x2 / (i * (i - 1))
+        if s + term == s:
+            return s
+        s += term
+
+
+def _cos_series(x):
+    s, term, i = Decimal(1), Decimal(1), 0
+    x2 = x * x
+    while True:
+        i += 2
+        term = -term * x2 / (i * (i - 1))
+        if s + term == s:
+            return s
+        s += term
+
+
+def _atan_series(x):
+    # 反复用 atan(x) = 2·atan(x / (1 + √(1 + x²))) 把参数缩小，再求级数
+    halvings = 0
+    while abs(x) > Decimal("0.1"):
+        x = x / (1 + (1 + x * x).sqrt())
+        halvings += 1
+    s, term, n = x, x, 1
+    x2 = x * x
+    while True:
+        term = -term * x2
+        n += 2
+        if s + term / n == s:
+            break
+        s += term / n
+    return s * (1 << halvings)
+
+
+def _sinh_series(x):
+    s, term, i = x, x, 1
+    x2 = x * x
+    while True:
+        i += 2
+        term = term * x2 / (i * (i - 1))
+        if s + term == s:
+            return s
+        s += term
+
+
+def _make_decimal_backend(precision):
+    context = Context(prec=precision)
+    with localcontext(context) as ctx:
+        ctx.prec = precision + _GUARD_DIGITS + 5
+        pi = _compute_pi()
+        half_pi = pi / 2
+        e = Decimal(1).exp()
+
+    def reduce_radians(x):
+        """把弧度约化到 [-π, π]"""
+        if x.adjusted() >= precision:
+            raise ValueError("三角函数的参数过大")
+        return x.remainder_near(2 * pi)
+
+    def sin(x):
+        return _sin_series(reduce_radians(x))
+
+    def cos(x):
+        return _cos_series(reduce_radians(x))
+
+    def tan(x):
+        x = reduce_radians(x)
+        c = _cos_series(x)
+        if c == 0:
+            raise ValueError("math domain error")
+        return _sin_series(x) / c
+
+    def asin(x):
+        if abs(x) > 1:
+            raise ValueError("math domain error")
+        if abs(x) == 1:
+            return half_pi.copy_sign(x)
+        return _atan_series(x / (1 - x * x).sqrt())
+
+    def acos(x):
+        return half_pi - asin(x)
+
+    def degrees(x):
+        """角度制：先在角度上精确约化，特殊角直接给出精确值"""
+        if x.adjusted() >= precision:
+            raise ValueError("三角函数的参数过大")
+        x = x.remainder_near(360)
+        return x, x * pi / 180
+
+    def sin_deg(x):
+        x, radians = degrees(x)
+        if x == 0 or abs(x) == 180:
+            return Decimal(0)
+        if abs(x) == 90:
+            return Decimal(1).copy_sign(x)
+        return _sin_series(radians)
+
+    def cos_deg(x):
+        x, radians = degrees(x)
+        if abs(x) == 90:
+            return Decimal(0)
+        if x == 0 or abs(x) == 180:
+            return Decimal(-1 if x else 1)
+        return _cos_series(radians)
+
+    def tan_deg(x):
+        x, radians = degrees(x)
+        if x == 0 or abs(x) == 180:
+            return Decimal(0)
+        if abs(x) == 90:
+            raise ValueError("math domain error")
+        return _sin_series(radians) / _cos_series(radians)
+
+    def sinh(x):
+        if abs(x) < 1:
+            return _sinh_series(x)
+        return (x.exp() - (-x).exp()) / 2
+
+    def cosh(x):
+        return (x.exp() + (-x).exp()) / 2
+
+    def tanh(x):
+        if abs(x) < 1:
+            return _sinh_series(x) / cosh(x)
+        # 大参数时 tanh 趋于 ±1，避免 exp 溢出
+        if x.adjusted() > 5:
+            return Decimal(1).copy_sign(x)
+        e2 = (2 * x).exp()
+        return (e2 - 1) / (e2 + 1)
+
+    def asinh(x):
+        y = abs(x)
+        return (y + (y * y + 1).sqrt()).ln().copy_sign(x)
+
+    def acosh(x):
+        if x < 1:
+            raise ValueError("math domain error")
+        return (x + (x * x - 1).sqrt()).ln()
+
+    def atanh(x):
+        if abs(x) >= 1:
+            raise ValueError("math domain error")
+        return ((1 + x) / (1 - x)).ln() / 2
+
+    trig = {
+        "Deg": {
+            "sin": sin_deg,
+            "cos": cos_deg,
+            "tan": tan_deg,
+            "arcsin": lambda x: asin(x) * 180 / pi,
+            "arccos": lambda x: acos(x) * 180 / pi,
+            "arctan": lambda x: _atan_series(x) * 180 / pi,
+        },
+        "Rad": {
+            "sin": sin,
+            "cos": cos,
+            "tan": tan,
+            "arcsin": asin,
+            "arccos": acos,
+            "arctan": _atan_series,
+        },
+        "Hyp": {
+            "sin": sinh,
+            "cos": cosh,
+            "tan": tanh,
+            "arcsin": asinh,
+            "arccos": acosh,
+            "arctan": atanh,
+        },
+    }
+    trig = {
+        mode: {name: _guarded(f) for name, f in functions.items()}
+        for mode, functions in trig.items()
+    }
+
+    return Backend(
+        name="decimal",
+        digits=precision,
+        context=context,
+        parse=_parse_decimal,
+        coerce=_coerce_decimal,
+        constants={"π": context.plus(pi), "e": context.plus(e)},
+        unary_ops=_unary_tables(_DECIMAL_COMMON_OPS, trig),
+        binary_ops=_DECIMAL_BINARY_OPS,
+    )
+
+
+def _parse_decimal(token):
+    try:
+        return Decimal(token)
+    except InvalidOperation:
+        raise ValueError(f"无效的数字: {token}")
+
+
+def _coerce_decimal(value):
+    """把 Ans、内存等外部值转换为 Decimal；float 按其最短十进制表示转换"""
+    if isinstance(value, (Decimal, int)):
+        return value
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    if isinstance(value, str) and "/" in value:
+        value = Fraction(value)
+    if isinstance(value, Fraction):
+        return Decimal(value.numerator) / value.denominator
+    return _parse_decimal(value)
+
+
+def _decimal_factorial(x):
+    if x < 0 or not _is_integral(x):
+        raise ValueError("阶乘只能用于非负整数")
+    return math.factorial(int(x))
+
+
+def _decimal_sqrt(x):
+    if x < 0:
+        raise ValueError("平方根的参数不能为负数")
+    return Decimal(x).sqrt()
+
+
+def _decimal_cbrt(x):
+    if x == 0:
+        return Decimal(0)
+    with localcontext() as ctx:
+        ctx.prec += _GUARD_DIGITS
+        y = abs(Decimal(x)) ** (Decimal(1) / 3)
+    return (+y).copy_sign(x)
+
+
+def _decimal_log(x):
+    if x <= 0:
+        raise ValueError("对数的参数必须为正数")
+    return Decimal(x).log10()
+
+
+def _decimal_ln(x):
+    if x <= 0:
+        raise ValueError("对数的参数必须为正数")
+    return Decimal(x).ln()
+
+
+def _decimal_int(x):
+    if isinstance(x, int):
+        return x
+    return x.to_integral_value(rounding=ROUND_DOWN)
+
+
+def _decimal_divide(a, b):
+    if b == 0:
+        raise ValueError("除数不能为零")
+    return Decimal(a) / b
+
+
+def _decimal_mod(a, b):
+    if b == 0:
+        raise ValueError("除数不能为零")
+    # Decimal 的 % 结果与被除数同号，调整为与 float 相同的向下取整语义
+    r = Decimal(a) % b
+    if r and (r < 0) != (b < 0):
+        r += b
+    return r
+
+
+def _decimal_power(a, b):
+    if a == 0 and b < 0:
+        raise ValueError("0.0 cannot be raised to a negative power")
+    if a < 0 and not _is_integral(b):
+        raise ValueError("结果不是实数")
+    if isinstance(a, int) and isinstance(b, int):
+        return a**b
+    return Decimal(a) ** b
+
+
+def _check_decimal_combinatorics(a, b, name):
+    if not (a >= 0 and b >= 0 and _is_integral(a) and _is_integral(b)):
+        raise ValueError(f"{name}的参数必须是非负整数")
+    if b > a:
+        raise ValueError(f"{name}的第二个参数不能大于第一个参数")
+
+
+def _decimal_permutation(a, b):
+    _check_decimal_combinatorics(a, b, "排列数")
+    return math.perm(int(a), int(b))
+
+
+def _decimal_combination(a, b):
+    _check_decimal_combinatorics(a, b, "组合数")
+    return math.comb(int(a), int(b))
+
+
+_DECIMAL_COMMON_OPS = {
+    "!": _decimal_factorial,
+    "%": lambda x: Decimal(x) / 100,
+    "abs": abs,
+    "int": _decimal_int,
+    "sqrt": _decimal_sqrt,
+    "cbrt": _decimal_cbrt,
+    "log": _decimal_log,
+    "ln": _decimal_ln,
+    "(+)": lambda x: x,
+    "(-)": lambda x: -x,
+}
+
+_DECIMAL_BINARY_OPS = {
+    "+": lambda a, b: a + b,
+    "-": lambda a, b: a - b,
+    "*": lambda a, b: a * b,
+    "/": _decimal_divide,
+    "mod": _decimal_mod,
+    "^": _decimal_power,
+    "nPr": _decimal_permutation,
+    "nCr": _decimal_combination,
+}
+
+
+def decimal_error(error):
+    """把 decimal 的信号异常转换为计算器的错误信息"""
+    if isinstance(error, Overflow):
+        return ValueError("结果过大")
+    return ValueError("无效运算")
+
+
+# 每种精度的 decimal 后端只构造一次（需要预先计算 π 与 e）
+_decimal_backends = {}
+_decimal_lock = Lock()
+
+
+def decimal_backend(precision=DEFAULT_PRECISION):
+    if (
+        not isinstance(precision, int)
+        or isinstance(precision, bool)
+        or not 1 <= precision <= MAX_PRECISION
+    ):
+        raise ValueError(f"精度必须是 1 到 {MAX_PRECISION} 之间的整数")
+    backend = _decimal_backends.get(precision)
+    if backend is None:
+        with _decimal_lock:
+            backend = _decimal_backends.get(precision)
+            if backend is None:
+                backend = _make_decimal_backend(precision)
+                _decimal_backends[precision] = backend
+    return backend
+
+
+# exact 后端
+# 整数与 Fraction 视为精确值，经 + - * / mod 与整数次幂后仍是精确值；
+# 三角、对数、开方（非完全平方）等运算把参数转换为 float，结果不再精确
+
+# 整数次幂的结果超过该位数时改用 float 计算，避免构造巨大的精确值；
+# 约 3000 位十进制数字，仍在 int 转字符串（JSON 序列化）的默认上限之内
+_MAX_EXACT_BITS = 10_000
+
+
+def _is_rational(x):
+    return isinstance(x, (int, Fraction))
+
+
+def _parse_exact(token):
+    try:
+        return Fraction(token)
+    except ValueError:
+        # inf、nan 等 float 能表示而 Fraction 不能表示的字面量
+        return float(token)
+
+
+def _coerce_exact(value):
+    """外部值中整数与 "分子/分母" 字符串视为精确值，float 仍是近似值"""
+    if isinstance(value, (int, float, Fraction)):
+        return value
+    if isinstance(value, Decimal):
+        return Fraction(value)
+    return _parse_exact(value)
+
+
+def _load_exact(state, exact_name, name):
+    """读取 Ans：上次结果为精确值时，state 中另存了它的 "分子/分母" 形式"""
+    exact = state.get(exact_name)
+    if exact is not None:
+        return parse_fraction(exact)
+    return _coerce_exact(state[name])
+
+
+def _exact_percent(x):
+    return Fraction(x, 100) if _is_rational(x) else x / 100
+
+
+def _exact_sqrt(x):
+    if x < 0:
+        raise ValueError("平方根的参数不能为负数")
+    if _is_rational(x):
+        # 分子分母都是完全平方数时开方结果仍是有理数
+        x = Fraction(x)
+        n, d = math.isqrt(x.numerator), math.isqrt(x.denominator)
+        if n * n == x.numerator and d * d == x.denominator:
+            return Fraction(n, d)
+    return math.sqrt(x)
+
+
+def _exact_divide(a, b):
+    if b == 0:
+        raise ValueError("除数不能为零")
+    if _is_rational(a) and _is_rational(b):
+        return Fraction(a) / b
+    return a / b
+
+
+def _exact_power(a, b):
+    if _is_rational(a) and _is_rational(b) and b.denominator == 1:
+        if a == 0 and b < 0:
+            raise ValueError("0.0 cannot be raised to a negative power")
+        bits = max(abs(a.numerator).bit_length(), a.denominator.bit_length())
+        if bits * abs(b) <= _MAX_EXACT_BITS:
+            return Fraction(a) ** int(b)
+        try:
+            a, b = float(a), float(b)
+        except OverflowError:
+            raise ValueError("结果过大")
+    return _power(a, b)
+
+
+EXACT = Backend(
+    name="exact",
+    digits=None,
+    context=None,
+    parse=_parse_exact,
+    coerce=_coerce_exact,
+    constants=FLOAT.constants,
+    unary_ops={
+        mode: {**ops, "%": _exact_percent, "sqrt": _exact_sqrt}
+        for mode, ops in FLOAT.unary_ops.items()
+    },
+    binary_ops={**FLOAT.binary_ops, "/": _exact_divide, "^": _exact_power},
+    loaders={
+        "Random": lambda state: random.random(),
+        "Ans": lambda state: _load_exact(state, "_current_exact", "_current_ans"),
+        "M": lambda state: _coerce_exact(state.get("memory", 0)),
+    },
+)
+
+
+def parse_fraction(text):
+    """解析 split_exact 生成的 "分子/分母"，比 Fraction(str) 的正则解析快得多"""
+    numerator, _, denominator = text.partition("/")
+    return Fraction(int(numerator), int(denominator))
+
+
+# 超过该位数（约 3900 位十进制数字）的整数不直接写入 state：
+# JSON 序列化时 int 转字符串受 Python 的默认上限（4300 位）限制
+_MAX_STATE_BITS = 13_000
+
+
+def _is_huge(number):
+    return abs(number).bit_length() > _MAX_STATE_BITS
+
+
+def _state_int(number):
+    """过大的整数（如大数阶乘）以前导有效数字的字符串写入 state，精确值只在结果缓存中"""
+    if _is_huge(number):
+        return str(leading_decimal(number, MAX_PRECISION))
+    return number
+
+
+def split_exact(value):
+    """
+    把结果拆成 (可直接 JSON 序列化的值, 精确值字符串)。
+    Fraction 的精确值表示为 "分子/分母"，其他数值没有精确值字符串。
+    过大的整数与分子、分母过大的 Fraction 只保留近似值。
+    inf 与 nan 不是合法的 JSON，写成 "inf"、"-inf"、"nan"，各后端都能读回。
+    """
+    if isinstance(value, int):
+        return _state_int(value), None
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value), None
+    if not isinstance(value, Fraction):
+        return value, None
+    if value.denominator == 1:
+        return _state_int(value.numerator), None
+    try:
+        plain = float(value)
+    except OverflowError:
+        plain = _state_int(int(value))
+    if _is_huge(value.numerator) or _is_huge(value.denominator):
+        return plain, None
+    return plain, f"{value.numerator}/{value.denominator}"
+
+
+def get_backend(state):
+    """按 state 中的 numeric_backend 与 precision 选择数值后端"""
+    name = state.get("numeric_backend", "float")
+    if name == "float":
+        return FLOAT
+    if name == "exact":
+        return EXACT
+    if name == "decimal":
+        return decimal_backend(state.get("precision", DEFAULT_PRECISION))
+    raise ValueError(f"未知的数值后端: {name}")
+
+
+def leading_decimal(number, digits):
+    """
+    取整数（或分子、分母很大的 Fraction）的前若干位有效数字，转换为 Decimal。
+    大整数直接转换为 Decimal 的开销与位数的平方成正比，这里只做一次整除。
+    """
+    if isinstance(number, Fraction):
+        with localcontext(Context(prec=digits + 10)):
+            return leading_decimal(number.numerator, digits) / leading_decimal(
+                number.denominator, digits
+            )
+    # 由二进制位数估计十进制指数，多保留若干位保证舍入正确
+    exponent = int((abs(number).bit_length() - 1) * math.log10(2))
+    shift = max(exponent - digits - 10, 0)
+    if not shift:
+        return Decimal(number)
+    leading = number // 10**shift if number > 0 else -(-number // 10**shift)
+    # 经字符串构造，不受当前上下文精度的舍入影响
+    return Decimal(f"{leading}E{shift}")
+
+
+def format_decimal(value, digits):
+    """
+    按有效数字位数显示 Decimal：去掉末尾的 0，
+    指数较大或较小时与 float 的 g 格式一样改用科学计数法
+    """
+    if isinstance(value, int):
+        value = leading_decimal(value, digits)
+    if value.is_nan():
+        return "nan"
+    if value.is_infinite():
+        return "-inf" if value < 0 else "inf"
+    value = Context(prec=digits).normalize(value)
+    if value == 0:
+        return "0"
+    if -4 <= value.adjusted() < digits:
+        return format(value, "f")
+    return format(value, "e")
+
+
+def format_scientific(value, digits):
+    """按有效数字位数显示为科学计数法（位数固定，与 float 的 SCI 显示一致）"""
+    if isinstance(value, int):
+        value = leading_decimal(value, digits)
+    return format(value, f".{digits - 1}e")
@@ -0,0 +1,175 @@
+"""
+耗时运算的进程池：大数阶乘、排列组合等会长时间占用 CPU 的表达式
+在独立的工作进程中计算，并受单次请求的时间预算限制。
+超时的工作进程会被直接终止并替换，不影响其他请求。
+"""
+
+import asyncio
+import multiprocessing
+import queue
+import threading
+import time
+
+import core
+from evaluator import compile_text
+
+# 可能产生超大整数、计算量不可控的运算
+EXPENSIVE_TOKENS = {"!", "nPr", "nCr"}
+
+TIMEOUT_RESULT = "Error: 计算超时"
+
+
+def _called_tokens(program, state):
+    """表达式及其直接或间接调用的用户函数体中出现的全部 token"""
+    functions = state.get("functions", {})
+    tokens = set()
+    pending = [program]
+    visited = set()
+    while pending:
+        texts = {token.text for token in pending.pop().postfix}
+        tokens |= texts
+        # 每个函数体只展开一次，互相调用的函数不会无限展开
+        for name in (texts & functions.keys()) - visited:
+            visited.add(name)
+            try:
+                pending.append(compile_text(functions[name], program.angle_mode))
+            except Exception:
+                continue
+    return tokens
+
+
+def is_expensive(expression, state):
+    """
+    判断表达式是否需要放到工作进程中计算，解析失败的表达式直接在本地报错。
+    调用的用户函数按函数体判断，如 f(x)=x! 时 f(5000) 同样交给进程池。
+    """
+    try:
+        program = core.compile_expression(expression, state.get("angle_mode", "Deg"))
+    except Exception:
+        return False
+    tokens = _called_tokens(program, state)
+    # int 的结果是整数，整数的整数次幂同样可能极大
+    return bool(tokens & EXPENSIVE_TOKENS) or {"int", "^"} <= tokens
+
+
+def _worker_main(conn):
+    """工作进程：循环接收 (expression, state)，返回 (result, ans, state)"""
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        expression, state = job
+        result, ans = core.calculate(expression, state)
+        conn.send((result, ans, state))
+
+
+class _Worker:
+    __slots__ = ("process", "conn")
+
+    def __init__(self, context):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def call(self, job, timeout):
+        """发送任务并等待结果，超时抛出 TimeoutError"""
+        self.conn.send(job)
+        if not self.conn.poll(timeout):
+            raise TimeoutError
+        return self.conn.recv()
+
+    def kill(self):
+        self.process.terminate()
+        self.process.join(1)
+        self.conn.close()
+
+
+class EvaluationPool:
+    """
+    有界的计算进程池。工作进程在首次需要时才启动，
+    超时的进程被终止后由新进程替换。
+    """
+
+    def __init__(self, size=2, timeout=3.0):
+        self.size = size
+        self.timeout = timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._started = 0
+        self._lock = threading.Lock()
+
+    def _acquire(self, deadline):
+        """取得空闲或新启动的工作进程，到 deadline 仍没有可用进程时抛出 TimeoutError"""
+        while True:
+            with self._lock:
+                if self._idle.empty() and self._started < self.size:
+                    self._started += 1
+                    break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError
+            try:
+                return self._idle.get(timeout=min(remaining, 0.1))
+            except queue.Empty:
+                # 被终止的进程会腾出名额，重新检查是否可以启动新进程
+                continue
+        try:
+            return _Worker(self._context)
+        except Exception:
+            with self._lock:
+                self._started -= 1
+            raise
+
+    def _discard(self, worker):
+        worker.kill()
+        with self._lock:
+            self._started -= 1
+
+    def calculate(self, expression, state):
+        """
+        在工作进程中计算，返回 (result, ans)，并用计算后的状态更新 state。
+        等待空闲进程的时间也计入时间预算。
+        """
+        deadline = time.monotonic() + self.timeout
+        try:
+            worker = self._acquire(deadline)
+        except TimeoutError:
+            return TIMEOUT_RESULT, 0
+        try:
+            result, ans, new_state = worker.call(
+                (expression, state), max(deadline - time.monotonic(), 0)
+            )
+        except TimeoutError:
+            self._discard(worker)
+            return TIMEOUT_RESULT, 0
+        except (OSError, EOFError):
+            # 工作进程意外退出
+            self._discard(worker)
+            raise
+        self._idle.put(worker)
+        state.update(new_state)
+        return result, ans
+
+    async def calculate_async(self, expression, state):
+        """在线程中等待工作进程，不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.calculate, expression, state)
+
+
+async def apply_key_async(pool, expression, state, key):
+    """与 core.apply_key 相同，但耗时的表达式交给进程池计算"""
+    expression = core.handle_input(expression, state, key)
+    if key in core.FORMAT_ONLY_KEYS:
+        result = core.format_only(expression, state)
+    else:
+        if is_expensive(expression, state):
+            result, ans = await pool.calculate_async(expression, state)
+        else:
+            # 普通表达式直接计算，避免进程间通信的开销
+            result, ans = core.calculate(expression, state)
+        core.commit_answer(state, key, ans)
+    return expression, result
@@ -0,0 +1,187 @@
+"""
+编译后程序的优化：把 Program 的指令还原为表达式 DAG，
+
+- 常量折叠：运算数都是常量的一元、二元运算在编译时求值，
+  求值出错的运算保留下来，执行到那里时照常报错
+- 公共子表达式消除：相同的子树只计算一次，如 (Ans+1)^2/(Ans+1)
+
+然后按原来的求值顺序生成寄存器程序。Random 每次读取的值不同，
+用户函数的函数体在执行时才确定，二者既不折叠也不合并。
+优化后的程序与原程序的结果和报错都相同，适合在 Ans、M
+或变量改变后重复执行的程序（按键的结果、计算表的单元格）。
+"""
+
+from decimal import Decimal, localcontext
+
+from evaluator import BINARY, CALL, FAIL, LOAD, PUSH, UNARY, Program
+
+
+class OptimizedProgram(Program):
+    """
+    寄存器程序：registers 为寄存器的初始值（折叠得到的常量，其余为 None），
+    code 中每条指令为 (类型, 参数, 运算数寄存器, 运算数寄存器, 目标寄存器)，
+    result 为结果所在的寄存器
+    """
+
+    __slots__ = ("registers", "result", "stats")
+
+    def __init__(self, program, registers, code, result, stats):
+        super().__init__(program.postfix, program.angle_mode, program.backend, code)
+        self.registers = registers
+        self.result = result
+        self.stats = stats
+        self.optimized = self
+
+    def _execute(self, state):
+        registers = list(self.registers)
+        for op, arg, a, b, target in self.code:
+            if op == BINARY:
+                registers[target] = arg(registers[a], registers[b])
+            elif op == UNARY:
+                registers[target] = arg(registers[a])
+            elif op == LOAD:
+                registers[target] = arg(state)
+            elif op == CALL:
+                registers[target] = self._call(arg, registers[a], state)
+            else:
+                raise ValueError(arg)
+        return registers[self.result]
+
+
+def optimize(program):
+    """
+    返回优化后的程序，每个 Program 只优化一次。
+    不完整的表达式（缺少运算数、运算符不足、空表达式）返回原程序，保持原来的报错。
+    """
+    if not program.optimized:
+        program.optimized = _build(program) or program
+    return program.optimized
+
+
+def reuse(program):
+    """
+    第一次执行返回原程序，同一程序再次执行时返回优化后的程序。
+    优化的代价约为执行一次的十几倍，只执行一次的表达式不必优化。
+    """
+    if program.optimized is None:
+        # False 表示执行过一次、尚未优化
+        program.optimized = False
+        return program
+    return optimize(program)
+
+
+def describe(program):
+    """优化前后的节点数，不能优化的程序前后相同"""
+    optimized = optimize(program)
+    if optimized is program:
+        count = len(program.code)
+        stats = {"before": count, "after": count, "instructions": count}
+        return {**stats, "folded": 0, "shared": 0, "optimized": False}
+    return {**optimized.stats, "optimized": True}
+
+
+def _constant_key(value):
+    """常量的合并键：1 与 1.0、0.0 与 -0.0、Decimal 的 1 与 1.0 显示不同，不能合并"""
+    if isinstance(value, (float, Decimal)):
+        return PUSH, type(value), str(value)
+    try:
+        hash(value)
+    except TypeError:
+        return None
+    return PUSH, type(value), value
+
+
+def _build(program):
+    if not program.code:
+        return None
+    context = program.backend.context
+    if context is None:
+        return _build_dag(program)
+    with localcontext(context):
+        return _build_dag(program)
+
+
+def _build_dag(program):
+    # 节点为 [类型, 参数, 子节点...]，按完成的先后编号，编号顺序即执行顺序
+    nodes = []
+    constants = {}  # 节点编号 -> 常量值
+    index = {}  # 合并键 -> 节点编号
+    stack = []
+    folded = shared = 0
+
+    def add(key, node, value=None, constant=False):
+        nonlocal shared
+        if key is not None:
+            existing = index.get(key)
+            if existing is not None:
+                if not constant:
+                    shared += 1
+                return existing
+        number = len(nodes)
+        nodes.append(node)
+        if constant:
+            constants[number] = value
+        if key is not None:
+            index[key] = number
+        return number
+
+    for token, (op, arg) in zip(program.postfix, program.code):
+        if op == PUSH:
+            stack.append(add(_constant_key(arg), None, arg, constant=True))
+        elif op == LOAD:
+            key = None if token.text == "Random" else (LOAD, arg)
+            stack.append(add(key, (LOAD, arg)))
+        elif op == FAIL:
+            stack.append(add(None, (FAIL, arg)))
+        else:
+            arity = 2 if op == BINARY else 1
+            if len(stack) < arity:
+                return None
+            children = tuple(stack[-arity:])
+            del stack[-arity:]
+            if op != CALL and all(child in constants for child in children):
+                try:
+                    value = arg(*(constants[child] for child in children))
+                except Exception:
+                    # 留到执行时报错
+                    pass
+                else:
+                    folded += 1
+                    stack.append(add(_constant_key(value), None, value, True))
+                    continue
+            key = None if op == CALL else (op, arg, children)
+            stack.append(add(key, (op, arg) + children))
+    if len(stack) != 1:
+        return None
+
+    # 折叠后不再使用的常量不占寄存器
+    live = set()
+    pending = [stack[0]]
+    while pending:
+        number = pending.pop()
+        if number in live:
+            continue
+        live.add(number)
+        if number not in constants:
+            pending.extend(nodes[number][2:])
+    order = sorted(live)
+    slot = {number: i for i, number in enumerate(order)}
+    registers = tuple(constants.get(number) for number in order)
+    code = []
+    for number in order:
+        if number in constants:
+            continue
+        op, arg, *children = nodes[number]
+        a = slot[children[0]] if children else None
+        b = slot[children[1]] if len(children) > 1 else None
+        code.append((op, arg, a, b, slot[number]))
+
+    # 优化前后的节点数：原程序每条指令一个节点，优化后每个寄存器一个节点
+    stats = {
+        "before": len(program.code),
+        "after": len(registers),
+        "instructions": len(code),
+        "folded": folded,
+        "shared": shared,
+    }
+    return OptimizedProgram(program, registers, tuple(code), slot[stack[0]], stats)
@@ -1,64 +1,60 @@
-from typing import Literal
-
-precedence = {
-    "!": 2,
-    "%": 2,
-    "^": 3,
-    "(+)": 4,
-    "(-)": 4,
-    "*": 5,
-    "/": 5,
-    "mod": 5,
-    "nPr": 5,
-    "nCr": 5,
-    "FUNC": 6,
-    "+": 7,
-    "-": 7,
-}
-
-function_names = {
-    "sqrt",
-    "cbrt",
-    "log",
-    "ln",
-    "abs",
-    "sin",
-    "cos",
-    "tan",
-    "arcsin",
-    "arccos",
-    "arctan",
-    "int",
-}
+import re
+from collections.abc import Sequence
+from itertools import islice
+from threading import Lock
 
-suffix_ops = {"!", "%"}
+from registry import (
+    CURSOR,
+    FUNCTION,
+    LEFT,
+    LEFT_PAREN,
+    LPAR,
+    MULTIPLY,
+    NUMBER,
+    OPERAND,
+    OPERATOR,
+    PREFIX,
+    RIGHT,
+    RIGHT_PAREN,
+    RPAR,
+    SCIENTIFIC_NUMBER,
+    SIGN,
+    SUFFIX,
+    TOKENS,
+    UNARY_MINUS,
+    UNARY_PLUS,
+    join_number,
+    lex,
+    lookup,
+    number_token,
+)
 
 
 def preprocess_tokens(tokens):
+    """查记号表并去掉光标后预处理按键 token 列表，见 preprocess_records"""
+    return preprocess_records(lex(tokens))
+
+
+def preprocess_records(tokens):
     """
-    预处理：
-      0) 去掉光标
+    预处理记录列表（lex 或 lex_text 的结果），返回新的记录列表：
       1) 自动合并相邻数字，形成单一数字 token。
       2) 修正不平衡的括号。
       3) 在相邻需要隐式乘法的地方插入 '*'
     """
-    # 0) 去掉光标
-    tokens = [t for t in tokens if t != "|"]
-
     # 1) 自动合并相邻数字
     merged = []
-    number_buffer = []
+    number = None
     for tk in tokens:
-        if all(c in ".0123456789" for c in tk):
-            number_buffer.append(tk)
+        if tk.kind == NUMBER:
+            number = tk.text if number is None else join_number(number, tk.text)
         else:
-            if number_buffer:
-                merged.append("".join(number_buffer))
-                number_buffer.clear()
+            if number is not None:
+                merged.append(_merge_number(number))
+                number = None
             merged.append(tk)
-    if number_buffer:
-        merged.append("".join(number_buffer))
-    merged = [".0" if t == "." else t for t in merged]
+    if number is not None:
+        merged.append(_merge_number(number))
 
     # 2) 修正括号
     corrected = []
@@ -66,236 +62,370 @@ def preprocess_tokens(tokens):
     unmatched_right = 0
 
     for tk in merged:
-        if tk == "(":
+        if tk.kind == LPAR:
             unpaired_left += 1
-            corrected.append(tk)
-        elif tk == ")":
+        elif tk.kind == RPAR:
             # 如果有匹配的 '(' 则与其配对。否则计为未匹配。
             if unpaired_left > 0:
                 unpaired_left -= 1
-                corrected.append(tk)
             else:
                 unmatched_right += 1
-                corrected.append(tk)
-        else:
-            corrected.append(tk)
+        corrected.append(tk)
     # 在开头插入与 unmatched_right 数量相等的 '('
-    corrected = ["("] * unmatched_right + corrected
+    corrected = [LEFT_PAREN] * unmatched_right + corrected
     # 如果还有未匹配的 '('，则在末尾添加对应的 ')'
-    while unpaired_left > 0:
-        corrected.append(")")
-        unpaired_left -= 1
+    corrected += [RIGHT_PAREN] * unpaired_left
 
     # 3) 插入隐式乘法
     res = []
 
-    def is_operand_or_rpar_or_suffix(t):
-        if t in suffix_ops:
-            return True
-        if t == ")":
-            return True
-        if t in function_names:
-            return False
-        if t in ("+", "-", "*", "/", "mod", "^", "(", "nPr", "nCr"):
-            return False
-        return True
-
-    def is_operand_or_lpar_or_function(t):
-        if t in suffix_ops:
-            return False
-        if t == "(":
-            return True
-        if t in function_names:
-            return True
-        if t in ("+", "-", "*", "/", "mod", "^", ")", "nPr", "nCr"):
-            return False
-        return True
-
     for i, tk in enumerate(corrected):
         res.append(tk)
-        if i < len(corrected) - 1:
-            nxt = corrected[i + 1]
-            if is_operand_or_rpar_or_suffix(tk) and is_operand_or_lpar_or_function(nxt):
-                res.append("*")
+        if i < len(corrected) - 1 and tk.closes and corrected[i + 1].opens:
+            res.append(MULTIPLY)
 
     return res
 
 
+def _merge_number(text):
+    return number_token(".0" if text == "." else text)
+
+
+def _pop_by_top(stack, output_queue, prec_tk):
+    """按栈顶运算符的结合性弹出优先级不低于 prec_tk 的运算符"""
+    while stack is not None:
+        top = stack[0]
+        if top.kind == LPAR:
+            break
+        top_assoc = top.associativity
+        if top_assoc == LEFT:
+            if top.precedence <= prec_tk:
+                output_queue.append(top)
+                stack = stack[1]
+            else:
+                break
+        elif top_assoc == RIGHT:
+            if top.precedence < prec_tk:
+                output_queue.append(top)
+                stack = stack[1]
+            else:
+                break
+        else:
+            break
+    return stack
+
+
+# 此后出现的 + - 为一元正负号
+_UNARY_CONTEXT = {None, OPERATOR, FUNCTION, LPAR}
+
+
+def shunt_token(tk, stack, output_queue, last_token_type):
+    """
+    调度场算法的单步，tk 为记号表中的记录。
+    stack 为持久化链表 (top, rest)，None 表示空栈，便于保存快照；
+    输出追加到 output_queue，返回新的 (stack, last_token_type)，
+    last_token_type 为 OPERAND、FUNCTION、LPAR、RPAR 或 OPERATOR。
+    """
+    kind = tk.kind
+    if kind == NUMBER or kind == OPERAND:
+        output_queue.append(tk)
+        return stack, OPERAND
+    elif kind == FUNCTION:
+        return (tk, stack), FUNCTION
+    elif kind == LPAR:
+        return (tk, stack), LPAR
+    elif kind == RPAR:
+        while stack is not None and stack[0].kind != LPAR:
+            output_queue.append(stack[0])
+            stack = stack[1]
+        if stack is not None:
+            stack = stack[1]
+        else:
+            raise ValueError("括号不匹配：多余的 ')'")
+        if stack is not None and stack[0].kind == FUNCTION:
+            output_queue.append(stack[0])
+            stack = stack[1]
+        return stack, RPAR
+    elif kind == SUFFIX:
+        stack = _pop_by_top(stack, output_queue, tk.precedence)
+        return (tk, stack), OPERATOR
+    elif kind == SIGN and last_token_type in _UNARY_CONTEXT:
+        unary_op = UNARY_PLUS if tk.text == "+" else UNARY_MINUS
+        stack = _pop_by_top(stack, output_queue, unary_op.precedence)
+        return (unary_op, stack), OPERATOR
+    elif kind == SIGN:
+        stack = _pop_by_top(stack, output_queue, tk.precedence)
+        return (tk, stack), OPERATOR
+    else:
+        prec_tk = tk.precedence
+        left_assoc = tk.associativity == LEFT
+        while stack is not None:
+            top = stack[0]
+            if top.kind == LPAR:
+                break
+            if left_assoc:
+                pop_condition = top.precedence <= prec_tk
+            else:
+                pop_condition = top.precedence < prec_tk
+            if pop_condition:
+                output_queue.append(top)
+                stack = stack[1]
+            else:
+                break
+        return (tk, stack), OPERATOR
+
+
+def drain_operators(stack, output_queue):
+    """将剩余的运算符全部弹出到输出队列"""
+    while stack is not None:
+        top = stack[0]
+        if top.kind == LPAR or top.kind == RPAR:
+            raise ValueError("括号不匹配：多余的括号")
+        output_queue.append(top)
+        stack = stack[1]
+
+
 def tokens_to_postfix(tokens):
     """
-    将修正和插入隐式乘法后的 token 转换为后缀表达式。
+    将 preprocess_tokens / preprocess_records 得到的记录列表转换为后缀表达式（记录列表）。
     注意一元 +/- 与后缀运算符。
     """
-    associativity = {
-        "!": "left",
-        "i": "left",
-        "%": "left",
-        "^": "right",
-        "(+)": "right",
-        "(-)": "right",
-        "*": "left",
-        "/": "left",
-        "mod": "left",
-        "FUNC": "right",
-        "+": "left",
-        "-": "left",
-    }
-
-    def get_precedence(op):
-        if op in function_names:
-            return precedence["FUNC"]
-        return precedence.get(op, None)
-
-    def get_associativity(op):
-        if op in function_names:
-            return associativity["FUNC"]
-        return associativity.get(op, None)
-
-    def is_number_or_var(tk):
-        if tk in function_names:
-            return False
-        if tk in precedence or tk in ("(", ")"):
-            return False
-        return True
-
-    def is_suffix_op(tk):
-        return tk in suffix_ops
-
     output_queue = []
-    op_stack = []
+    op_stack = None
     last_token_type = None
 
     for tk in tokens:
-        if is_number_or_var(tk):
-            output_queue.append(tk)
-            last_token_type = "operand"
-        elif tk in function_names:
-            op_stack.append(tk)
-            last_token_type = "function"
-        elif tk == "(":
-            op_stack.append(tk)
-            last_token_type = "lpar"
-        elif tk == ")":
-            while op_stack and op_stack[-1] != "(":
-                output_queue.append(op_stack.pop())
-            if op_stack and op_stack[-1] == "(":
-                op_stack.pop()
-            else:
-                raise ValueError("括号不匹配：多余的 ')'")
-            if op_stack and op_stack[-1] in function_names:
-                output_queue.append(op_stack.pop())
-            last_token_type = "rpar"
-        elif is_suffix_op(tk):
-            prec_tk = get_precedence(tk)
-            assoc_tk = get_associativity(tk)
-            while op_stack:
-                top = op_stack[-1]
-                if top == "(":
-                    break
-                top_prec = get_precedence(top)
-                top_assoc = get_associativity(top)
-                if top_prec is None:
-                    break
-                if top_assoc == "left":
-                    if top_prec <= prec_tk:
-                        output_queue.append(op_stack.pop())
-                    else:
-                        break
-                elif top_assoc == "right":
-                    if top_prec < prec_tk:
-                        output_queue.append(op_stack.pop())
-                    else:
-                        break
-                else:
-                    break
-            op_stack.append(tk)
-            last_token_type = "operator"
-        elif tk in ("+", "-"):
-            if last_token_type in (None, "operator", "function", "lpar"):
-                unary_op = "(+)" if tk == "+" else "(-)"
-                prec_tk = 4
-                assoc_tk = "right"
-                while op_stack:
-                    top = op_stack[-1]
-                    if top == "(":
-                        break
-                    top_prec = get_precedence(top)
-                    if top_prec is None:
-                        break
-                    top_assoc = get_associativity(top)
-                    if top_assoc == "left":
-                        if top_prec <= prec_tk:
-                            output_queue.append(op_stack.pop())
-                        else:
-                            break
-                    elif top_assoc == "right":
-                        if top_prec < prec_tk:
-                            output_queue.append(op_stack.pop())
-                        else:
-                            break
-                    else:
-                        break
-                op_stack.append(unary_op)
-                last_token_type = "operator"
+        op_stack, last_token_type = shunt_token(
+            tk, op_stack, output_queue, last_token_type
+        )
+
+    drain_operators(op_stack, output_queue)
+    return output_queue
+
+
+def postfix_texts(postfix):
+    """后缀表达式中各 token 的文本，便于显示与比较"""
+    return [tk.text for tk in postfix]
+
+
+# 文本表达式中的别名，映射到按键 token
+text_aliases = {
+    "×": "*",
+    "÷": "/",
+    "−": "-",
+    "**": "^",
+    "√": "sqrt",
+    "pi": "π",
+    "Ran#": "Random",
+    "asin": "arcsin",
+    "acos": "arccos",
+    "atan": "arctan",
+}
+
+_text_names = sorted(
+    {tk.text for tk in TOKENS.values() if tk.kind != NUMBER and tk.kind != PREFIX}
+    | set(text_aliases),
+    key=len,
+    reverse=True,
+)
+# 数字在名称之前匹配："1e3" 是科学计数法的一个数，而不是 1·e·3
+_text_token_re = re.compile(
+    r"\s*("
+    + SCIENTIFIC_NUMBER
+    + r"|\d+\.?\d*|\.\d+|"
+    + "|".join(re.escape(name) for name in _text_names)
+    + r"|\S)"
+)
+
+
+# 文本中的名称（含别名）与单个数字直接对应到记号表中的记录
+_text_records = {name: TOKENS[text_aliases.get(name, name)] for name in _text_names}
+_text_records.update((digit, TOKENS[digit]) for digit in "0123456789")
+
+
+def lex_text(text):
+    """
+    单次扫描把文本表达式（如 "12+sin(30)*3!"）切分为记号表中的记录。
+    正则的每次匹配只捕获一个 token：名称与单个数字查表，
+    其余的多字符匹配都是数字（含 "1e3"、"2.5E-4" 这样的科学计数法），
+    单个无法识别的字符报错。
+    """
+    records = []
+    append = records.append
+    get = _text_records.get
+    for tk in _text_token_re.findall(text):
+        record = get(tk)
+        if record is None:
+            if len(tk) == 1 and not tk.isdecimal():
+                raise ValueError(f"无法识别的字符: {tk}")
+            # 非 ASCII 的十进制数字按原样交给后端解析
+            record = number_token(tk) if tk.isascii() else lookup(tk)
+        append(record)
+    return records
+
+
+def tokenize_text(text):
+    """将文本表达式（如 "12+sin(30)*3!"）切分为按键 token 列表"""
+    return [tk.text for tk in lex_text(text)]
+
+
+class Postfix(Sequence):
+    """
+    IncrementalParser.parse 的结果：解析器输出队列的前 length 项，
+    再接上补全数字、右括号与运算符栈得到的 tail。前缀与解析器共享，不复制。
+    """
+
+    __slots__ = ("_shared", "_length", "_tail")
+
+    def __init__(self, shared, length, tail):
+        self._shared = shared
+        self._length = length
+        self._tail = tail
+
+    def __len__(self):
+        return self._length + len(self._tail)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("后缀表达式下标越界")
+        if index < self._length:
+            return self._shared[index]
+        return self._tail[index - self._length]
+
+    def __iter__(self):
+        yield from islice(self._shared, self._length)
+        yield from self._tail
+
+
+class IncrementalParser:
+    """
+    增量解析器：把预处理与调度场算法合并为逐 token 的流式过程，
+    并为表达式的每个前缀保存一个可恢复的快照。
+    新输入与上次输入共享前缀时，只处理编辑点之后的 token。
+
+    快照内容：(数字缓冲, 未配对 '(' 数, 未匹配 ')' 数, 上一个 token,
+              运算符栈, 输出队列长度, 上一个 token 类型)
+    运算符栈是持久化链表，输出队列只追加，因此每个快照都是 O(1) 的。
+
+    解析结果与输出队列共享前缀（见 Postfix）。已交出的部分不再原地修改：
+    编辑点之前的输出已经交出时改用新的列表，因此在末尾逐键输入时
+    每个按键均摊 O(1)，不复制输出队列。
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._tokens = []
+        self._output = []
+        # 输出队列中已经交给 Postfix 的长度
+        self._shared = 0
+        self._snapshots = [(None, 0, 0, None, None, 0, None)]
+        # 每次解析换一个新标记，ExpressionBuffer 据此判断上次解析的是否是它
+        self._mark = object()
+
+    def parse(self, tokens, source=None):
+        """
+        返回与 tokens_to_postfix(preprocess_tokens(tokens)) 相同的后缀表达式。
+        source 为产生 tokens（不含光标）的 ExpressionBuffer 时，若上次解析的也是它，
+        编辑点直接取缓冲区记录的最左修改位置，否则与上次的 token 逐个比较。
+        """
+        with self._lock:
+            mark, self._mark = self._mark, object()
+            start = None
+            if source is not None and len(source) == len(tokens):
+                start = source.take_edit_start(mark, self._mark)
+            if start is None:
+                tokens = [t for t in tokens if t != CURSOR]
+                start = self._common_prefix(tokens)
             else:
-                prec_tk = get_precedence(tk)
-                assoc_tk = get_associativity(tk)
-                while op_stack:
-                    top = op_stack[-1]
-                    if top == "(":
-                        break
-                    top_prec = get_precedence(top)
-                    if top_prec is None:
-                        break
-                    top_assoc = get_associativity(top)
-                    if top_assoc == "left":
-                        if top_prec <= prec_tk:
-                            output_queue.append(op_stack.pop())
-                        else:
-                            break
-                    elif top_assoc == "right":
-                        if top_prec < prec_tk:
-                            output_queue.append(op_stack.pop())
-                        else:
-                            break
-                    else:
-                        break
-                op_stack.append(tk)
-                last_token_type = "operator"
+                # 上次解析出错时只保存了出错之前的 token
+                start = min(start, len(self._tokens))
+            del self._snapshots[start + 1 :]
+            del self._tokens[start:]
+            state = self._snapshots[start]
+            self._truncate_output(state[5])
+            try:
+                for text in tokens[start:]:
+                    state = self._feed(state, lookup(text), self._output)
+                    self._snapshots.append(state)
+                    self._tokens.append(text)
+            finally:
+                del self._tokens[len(self._snapshots) - 1 :]
+            tail = []
+            self._finish(state, tail)
+            self._shared = len(self._output)
+            return Postfix(self._output, self._shared, tail)
+
+    def _truncate_output(self, length):
+        """把输出队列截短到 length；要删除的部分已经交出时换成新列表"""
+        if length < self._shared:
+            self._output = self._output[:length]
+            self._shared = 0
         else:
-            prec_tk = get_precedence(tk)
-            if prec_tk is None:
-                raise ValueError(f"无法识别的符号: {tk}")
-            assoc_tk = get_associativity(tk)
-            while op_stack:
-                top = op_stack[-1]
-                if top == "(":
-                    break
-                top_prec = get_precedence(top)
-                if top_prec is None:
-                    break
-                top_assoc = get_associativity(top)
-                pop_condition = False
-                if assoc_tk == "left":
-                    if top_prec <= prec_tk:
-                        pop_condition = True
-                else:
-                    if top_prec < prec_tk:
-                        pop_condition = True
-                if pop_condition:
-                    output_queue.append(op_stack.pop())
-                else:
-                    break
-            op_stack.append(tk)
-            last_token_type = "operator"
-
-    while op_stack:
-        top = op_stack.pop()
-        if top == "(" or top == ")":
-            raise ValueError("括号不匹配：多余的括号")
-        output_queue.append(top)
+            del self._output[length:]
 
-    return output_queue
+    def _common_prefix(self, tokens):
+        """计算新输入与已解析 token 的公共前缀长度"""
+        old = self._tokens
+        n = len(old)
+        # 常见情况：在末尾追加
+        if len(tokens) >= n and tokens[:n] == old:
+            return n
+        i = 0
+        for a, b in zip(old, tokens):
+            if a != b:
+                break
+            i += 1
+        return i
+
+    @staticmethod
+    def _emit(tk, prev, stack, output, last_type):
+        """插入隐式乘法后把 token 交给调度场算法"""
+        if prev is not None and prev.closes and tk.opens:
+            stack, last_type = shunt_token(MULTIPLY, stack, output, last_type)
+        stack, last_type = shunt_token(tk, stack, output, last_type)
+        return stack, last_type
+
+    def _flush_number(self, state, output):
+        """把数字缓冲作为一个 token 输出"""
+        number, left, right, prev, stack, _, last_type = state
+        number = number_token(".0" if number == "." else number)
+        stack, last_type = self._emit(number, prev, stack, output, last_type)
+        return (None, left, right, number, stack, len(output), last_type)
+
+    def _feed(self, state, tk, output):
+        if tk.kind == NUMBER:
+            number = tk.text if state[0] is None else join_number(state[0], tk.text)
+            return (number,) + state[1:]
+        if state[0] is not None:
+            state = self._flush_number(state, output)
+        _, left, right, prev, stack, _, last_type = state
+        if tk.kind == RPAR and left == 0:
+            # 未匹配的 ')' 与开头补上的 '(' 配对：弹出栈中全部运算符
+            # ')' 之前不会插入隐式乘法
+            while stack is not None:
+                output.append(stack[0])
+                stack = stack[1]
+            return (None, left, right + 1, tk, None, len(output), RPAR)
+        if tk.kind == LPAR:
+            left += 1
+        elif tk.kind == RPAR:
+            left -= 1
+        stack, last_type = self._emit(tk, prev, stack, output, last_type)
+        return (None, left, right, tk, stack, len(output), last_type)
+
+    def _finish(self, state, output):
+        """在不修改快照的前提下补全数字、右括号并清空运算符栈"""
+        if state[0] is not None:
+            state = self._flush_number(state, output)
+        _, left, _, prev, stack, _, last_type = state
+        for _ in range(left):
+            stack, last_type = self._emit(RIGHT_PAREN, prev, stack, output, last_type)
+            prev = RIGHT_PAREN
+        drain_operators(stack, output)
 
 
 if __name__ == "__main__":
@@ -314,7 +444,7 @@ if __name__ == "__main__":
             rpn = tokens_to_postfix(pre)
             print(f"Test {idx} =>")
             print(f"  Original: {tklist}")
-            print(f"  PreProc : {pre}")
-            print(f"  Postfix : {rpn}\n")
+            print(f"  PreProc : {postfix_texts(pre)}")
+            print(f"  Postfix : {postfix_texts(rpn)}\n")
         except ValueError as e:
             print(f"Test {idx} 出错: {e}\n")
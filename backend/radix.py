@@ -0,0 +1,136 @@
+"""
+进制转换：从精确的整数或有理数出发展开各位数字。
+
+- float、Decimal、Fraction 先转换为精确的有理数，大整数不再经过 float
+- 小数部分一次性乘以 base 的幂后整除得到全部位数，位数可配置
+- 可选定长补码输出（8/16/32/64 位）
+- 2 的幂进制使用内置的线性时间转换，其他进制的大整数按 base 的幂分治转换
+"""
+
+import math
+from fractions import Fraction
+
+BASES = {"Bin": 2, "Oct": 8, "Dec": 10, "Hex": 16}
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+DEFAULT_FRACTION_DIGITS = 15
+MAX_FRACTION_DIGITS = 1000
+WORD_SIZES = (8, 16, 32, 64)
+
+# 内置格式化支持的进制
+_BUILTIN_FORMATS = {2: "b", 8: "o", 16: "X"}
+# 小于 base ** _SMALL_DIGITS 的整数直接逐位转换
+_SMALL_DIGITS = 64
+
+
+def to_rational(number):
+    """把计算结果转换为精确的 int 或 Fraction"""
+    if isinstance(number, int):
+        return number
+    if isinstance(number, str):
+        number = Fraction(number)
+    elif isinstance(number, float) and not math.isfinite(number):
+        raise ValueError(f"无法转换进制: {number}")
+    else:
+        # float 与 Decimal 本身就是有限位的二进制/十进制小数，可以精确转换
+        try:
+            number = Fraction(number)
+        except (ValueError, OverflowError):
+            raise ValueError(f"无法转换进制: {number}")
+    return number.numerator if number.denominator == 1 else number
+
+
+def _small_to_digits(n, base):
+    digits = []
+    while n:
+        n, digit = divmod(n, base)
+        digits.append(DIGITS[digit])
+    return "".join(reversed(digits)) or "0"
+
+
+def int_to_digits(n, base, width=0):
+    """
+    把非负整数转换为 base 进制的数字串，不足 width 位时在左侧补 0。
+    大整数先按 base^(2^k) 一分为二，两半分别递归转换，
+    避免逐位 divmod 的平方级开销。
+    """
+    fmt = _BUILTIN_FORMATS.get(base)
+    if fmt is not None:
+        return format(n, fmt).rjust(width, "0")
+
+    cutoff = base**_SMALL_DIGITS
+    if n < cutoff:
+        return _small_to_digits(n, base).rjust(width, "0")
+
+    # powers[k] = base ** (_SMALL_DIGITS * 2^k)
+    powers = [cutoff]
+    while powers[-1] * powers[-1] <= n:
+        powers.append(powers[-1] * powers[-1])
+
+    def convert(n, k, width):
+        if not width:
+            # 最高的一段不补 0，先跳过比它大的幂
+            while k >= 0 and powers[k] > n:
+                k -= 1
+        if k < 0:
+            return _small_to_digits(n, base).rjust(width, "0")
+        high, low = divmod(n, powers[k])
+        size = _SMALL_DIGITS << k
+        return convert(high, k - 1, max(width - size, 0)) + convert(low, k - 1, size)
+
+    return convert(n, len(powers) - 1, width)
+
+
+def _fraction_digits(fraction, base, digits):
+    """展开 [0, 1) 内有理数的小数部分，截断到 digits 位，除尽时去掉末尾的 0"""
+    if not digits or not fraction:
+        return ""
+    scaled, remainder = divmod(fraction.numerator * base**digits, fraction.denominator)
+    text = int_to_digits(scaled, base, digits)
+    return text.rstrip("0") if not remainder else text
+
+
+def _is_int(value):
+    """state 中的位数必须是整数；bool 是 int 的子类，需要排除"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _twos_complement(value, base, word_size):
+    """定长补码：只取整数部分，超出该位数能表示的范围时报错"""
+    if not _is_int(word_size) or word_size not in WORD_SIZES:
+        raise ValueError(f"字长必须是 {', '.join(map(str, WORD_SIZES))} 之一")
+    n = math.trunc(value)
+    if not -(1 << (word_size - 1)) <= n < 1 << word_size:
+        raise ValueError(f"超出 {word_size} 位补码的表示范围")
+    width = math.ceil(word_size / math.log2(base))
+    return int_to_digits(n % (1 << word_size), base, width)
+
+
+def format_base(number, base, fraction_digits=DEFAULT_FRACTION_DIGITS, word_size=None):
+    """
+    按进制格式化数值。base 为 BASES 中的名称或 2~36 的整数；
+    fraction_digits 为小数部分最多保留的位数（截断）；
+    word_size 为 8/16/32/64 时输出该位宽的补码。
+    """
+    base = BASES.get(base, base)
+    if not isinstance(base, int) or not 2 <= base <= len(DIGITS):
+        raise ValueError(
+            f"进制必须是 {', '.join(BASES)} 之一或 2 到 {len(DIGITS)} 之间的整数"
+        )
+    if not _is_int(fraction_digits) or not 0 <= fraction_digits <= MAX_FRACTION_DIGITS:
+        raise ValueError(f"小数位数必须在 0 到 {MAX_FRACTION_DIGITS} 之间")
+
+    value = to_rational(number)
+    if word_size is not None:
+        return _twos_complement(value, base, word_size)
+
+    sign = "-" if value < 0 else ""
+    value = abs(value)
+    integer_part = math.trunc(value)
+    integer_str = int_to_digits(integer_part, base)
+    fractional_str = _fraction_digits(value - integer_part, base, fraction_digits)
+    if not integer_part and not fractional_str.strip("0"):
+        # 截断后全部为 0 的负数不显示负号，避免 "-0.000…"
+        sign = ""
+    if not fractional_str:
+        return f"{sign}{integer_str}"
+    return f"{sign}{integer_str}.{fractional_str}"
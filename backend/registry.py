@@ -0,0 +1,184 @@
+"""
+记号表：每个按键 token 在导入时登记为一条 Token 记录，
+包含 opcode、种类、优先级、结合性、元数，以及判断隐式乘法的两个标志。
+词法分析把 token 列表转换为记录列表，预处理、调度场算法与编译都直接比较
+记录中的整数字段，不再反复查询集合和元组。
+"""
+
+import re
+
+# 记号种类
+NUMBER = 0  # 数字或数字片段（"1"、"."、合并后的 "12.5"、文本中的 "1e3"）
+OPERAND = 1  # 常量、变量以及其他未登记的 token
+FUNCTION = 2  # 前缀函数，如 sin
+SUFFIX = 3  # 后缀运算符 ! %
+PREFIX = 4  # 一元正负号 (+) (-)，由 + - 在一元位置转换而来
+SIGN = 5  # + -，按上下文作二元或一元运算
+OPERATOR = 6  # 其余二元运算符
+LPAR = 7
+RPAR = 8
+
+# 结合性
+LEFT = 0
+RIGHT = 1
+
+# 未登记的 token 共用的 opcode
+NUMBER_OPCODE = 0
+OPERAND_OPCODE = 1
+
+CURSOR = "|"
+
+# 文本表达式中的科学计数法数字，如 "1e3"、"2.5E-4"
+SCIENTIFIC_NUMBER = r"(?:\d+\.?\d*|\.\d+)[eE][+-]?\d+"
+_scientific_re = re.compile(SCIENTIFIC_NUMBER)
+
+# 函数的优先级与结合性
+FUNCTION_PRECEDENCE = 6
+
+# 可以作为隐式乘法左侧 / 右侧的种类，如 "2(" 、")sin"、"!π"
+_CLOSES = {NUMBER, OPERAND, SUFFIX, PREFIX, RPAR}
+_OPENS = {NUMBER, OPERAND, FUNCTION, PREFIX, LPAR}
+
+
+class Token:
+    """一个 token 的记录，登记过的 token 全局只有一份"""
+
+    __slots__ = (
+        "text",
+        "opcode",
+        "kind",
+        "precedence",
+        "associativity",
+        "arity",
+        "closes",
+        "opens",
+    )
+
+    def __init__(
+        self, text, opcode, kind, precedence=None, associativity=None, arity=0
+    ):
+        self.text = text
+        self.opcode = opcode
+        self.kind = kind
+        self.precedence = precedence
+        # None 表示没有规定结合性（nPr、nCr），按右结合的方式比较优先级
+        self.associativity = associativity
+        self.arity = arity
+        self.closes = kind in _CLOSES
+        self.opens = kind in _OPENS
+
+    def __repr__(self):
+        return f"Token({self.text!r})"
+
+
+function_names = (
+    "sqrt",
+    "cbrt",
+    "log",
+    "ln",
+    "abs",
+    "sin",
+    "cos",
+    "tan",
+    "arcsin",
+    "arccos",
+    "arctan",
+    "int",
+)
+
+# 自由变量，由调用方在求值时绑定取值（如向量化求值中的 x、用户函数的参数）
+variable_names = ("x",)
+
+# 命名变量，取值保存在 state["variables"] 中，未赋值时为 0
+named_variables = ("A", "B", "C", "D", "E", "F", "X", "Y")
+
+# 用户函数，函数体为关于 x 的文本表达式，保存在 state["functions"] 中
+user_function_names = ("f", "g", "h")
+
+# (text, 种类, 优先级, 结合性, 元数)
+_OPERATORS = (
+    ("!", SUFFIX, 2, LEFT, 1),
+    ("%", SUFFIX, 2, LEFT, 1),
+    ("^", OPERATOR, 3, RIGHT, 2),
+    ("(+)", PREFIX, 4, RIGHT, 1),
+    ("(-)", PREFIX, 4, RIGHT, 1),
+    ("*", OPERATOR, 5, LEFT, 2),
+    ("/", OPERATOR, 5, LEFT, 2),
+    ("mod", OPERATOR, 5, LEFT, 2),
+    ("nPr", OPERATOR, 5, None, 2),
+    ("nCr", OPERATOR, 5, None, 2),
+    ("+", SIGN, 7, LEFT, 2),
+    ("-", SIGN, 7, LEFT, 2),
+)
+
+# 按 opcode 排列的全部记录，前两项为未登记 token 的占位
+TOKENS_BY_OPCODE = [
+    Token("", NUMBER_OPCODE, NUMBER),
+    Token("", OPERAND_OPCODE, OPERAND),
+]
+TOKENS = {}
+
+
+def _register(text, kind, precedence=None, associativity=None, arity=0):
+    token = Token(text, len(TOKENS_BY_OPCODE), kind, precedence, associativity, arity)
+    TOKENS_BY_OPCODE.append(token)
+    TOKENS[text] = token
+    return token
+
+
+for _text in ".0123456789":
+    _register(_text, NUMBER)
+for _text in ("Ans", "M", "Random", "π", "e") + variable_names + named_variables:
+    _register(_text, OPERAND)
+for _text in function_names + user_function_names:
+    _register(_text, FUNCTION, FUNCTION_PRECEDENCE, RIGHT, 1)
+for _args in _OPERATORS:
+    _register(*_args)
+LEFT_PAREN = _register("(", LPAR)
+RIGHT_PAREN = _register(")", RPAR)
+del _text, _args
+
+MULTIPLY = TOKENS["*"]
+UNARY_PLUS = TOKENS["(+)"]
+UNARY_MINUS = TOKENS["(-)"]
+
+
+def is_number_part(tk):
+    """判断 token 是否为数字的一部分（数字或小数点）"""
+    return all(c in ".0123456789" for c in tk)
+
+
+def has_exponent(text):
+    """判断数字 token 是否带指数（科学计数法）"""
+    return "e" in text or "E" in text
+
+
+def join_number(text, part):
+    """
+    把相邻的数字 part 接到 text 后面。带指数的数字已经完整，
+    与相邻数字之间保留空格，求值时作为语法错误报告，如 "1e3 2" 不会变成 1e32。
+    """
+    if has_exponent(text) or has_exponent(part):
+        return f"{text} {part}"
+    return text + part
+
+
+def number_token(text):
+    """合并后的数字 token"""
+    return Token(text, NUMBER_OPCODE, NUMBER)
+
+
+def lookup(text):
+    """查找 token 的记录，未登记的 token 按数字或操作数临时生成一条"""
+    token = TOKENS.get(text)
+    if token is not None:
+        return token
+    if is_number_part(text) or _scientific_re.fullmatch(text):
+        return Token(text, NUMBER_OPCODE, NUMBER)
+    return Token(text, OPERAND_OPCODE, OPERAND)
+
+
+def lex(tokens):
+    """把按键 token 列表转换为记录列表，并去掉光标"""
+    get = TOKENS.get
+    return [get(t) or lookup(t) for t in tokens if t != CURSOR]
@@ -1,70 +1,429 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import (
+    Flask,
+    Response,
+    g,
+    request,
+    jsonify,
+    stream_with_context,
+)
+import functools
+import math
 import os
 import sys
+import time
+import assets
 import core
+import metrics
+from session import SessionStore
 from typing import Any
 
 
-def create_app(static_folder):
-    app = Flask(__name__, static_folder=static_folder, static_url_path="/")
+def create_app(static_folder, instrument=True):
+    """instrument 为 False 时不记录各阶段耗时，/api/metrics 只有计数"""
+    # 静态文件由 AssetIndex 提供，不使用 Flask 的 static 路由
+    app = Flask(__name__, static_folder=None)
+    frontend = assets.AssetIndex(static_folder)
+    sessions = SessionStore()
+    registry = metrics.Metrics()
+
+    if instrument:
+
+        @app.before_request
+        def start_timing():
+            if not request.path.startswith("/api/") or request.path == "/api/metrics":
+                return
+            g.metrics_token = metrics.begin()
+            g.request_start = time.perf_counter()
+            if request.is_json:
+                # 提前解析请求体，接口中的 get_json 直接取缓存
+                with metrics.stage("decode"):
+                    request.get_json(silent=True)
+
+        @app.after_request
+        def add_server_timing(response):
+            if "metrics_token" in g:
+                timings = metrics.current()
+                timings["total"] = time.perf_counter() - g.request_start
+                response.headers["Server-Timing"] = metrics.server_timing(timings)
+            return response
+
+        # 视图抛出异常时不会执行 after_request，在 teardown 中结束记录，
+        # 否则 contextvar 会一直留在处理请求的线程中
+        @app.teardown_request
+        def finish_timing(exc):
+            token = g.pop("metrics_token", None)
+            if token is None:
+                return
+            timings = metrics.finish(token)
+            timings["total"] = time.perf_counter() - g.request_start
+            registry.observe(request.endpoint or "unknown", timings)
+
+    def state_error(state):
+        """检查请求中的 state（可以省略），无效时返回 400 响应，有效时返回 None"""
+        if state is None:
+            return None
+        try:
+            core.validate_state(state)
+        except ValueError as e:
+            return jsonify({"error": f"无效的输入: {e}"}), 400
+        return None
+
+    def count_key(key, result):
+        """统计按键类别与出错的结果"""
+        registry.count_key(core.key_type(key))
+        if isinstance(result, str) and result.startswith("Error"):
+            registry.count_error(result)
+
+    # Prometheus 格式的指标：各阶段耗时的分位数、按键类别与错误计数
+    @app.route("/api/metrics", methods=["GET"])
+    def get_metrics():
+        return Response(
+            registry.render(), mimetype="text/plain; version=0.0.4; charset=utf-8"
+        )
 
     # 处理按键输入
+    # 传入 keys 列表时依次处理多个按键（粘贴、宏），只返回最后的结果
     @app.route("/api/input", methods=["POST"])
     def handle_input():
         data = request.get_json()
-        if not data or "key" not in data or "expression" not in data:
+        if not isinstance(data, dict) or "expression" not in data:
+            return jsonify({"error": "无效的输入"}), 400
+        if "keys" in data:
+            keys: list[str] = data["keys"]
+            if not _is_token_list(keys) or not keys:
+                return jsonify({"error": "无效的按键列表"}), 400
+        elif isinstance(data.get("key"), str):
+            keys = [data["key"]]
+        else:
             return jsonify({"error": "无效的输入"}), 400
 
-        key: str = data["key"]
         expression: list[str] = data["expression"]
-        state: dict[str, Any] = data["state"]
-
-        expression: list[str] = core.handle_input(expression, state, key)
+        if not _is_token_list(expression):
+            return jsonify({"error": "无效的输入: 表达式必须是 token 列表"}), 400
+        state: dict[str, Any] = data.get("state")
+        error = state_error(state)
+        if error:
+            return error
+        # 省略的 state 或缺少的字段取初始值
+        state = {**core.initial_state(), **(state or {})}
 
-        # state ans：当前运算中使用的 Ans 变量值
-        # state _current_ans：最新完成（=）的运算结果
-        # state _previous_ans：最新预测的运算结果
-        if key in ["SCI", "S⇔D", "Dec", "Bin", "Oct", "Hex"]:
-            # 仅格式化
-            result = core.format_result(state["_predicted_ans"], state)
+        if len(keys) == 1:
+            expression, result = core.apply_key(expression, state, keys[0])
         else:
-            # 正常计算
-            result, ans = core.calculate(expression, state)
-            if key in ["=", "M+", "M-", "MC"]:
-                state["_current_ans"] = ans
-            if key == "M+":
-                state["memory"] += ans
-            if key == "M-":
-                state["memory"] -= ans
+            expression, result = core.apply_keys(expression, state, keys)
+        for key in keys[:-1]:
+            registry.count_key(core.key_type(key))
+        count_key(keys[-1], result)
+
+        with metrics.stage("encode"):
+            return jsonify({"expression": expression, "state": state, "result": result})
+
+    @functools.cache
+    def evaluation_pool():
+        # 第一次使用时才导入 asyncio 与 multiprocessing，缩短启动时间
+        import offload
+
+        return offload.EvaluationPool()
+
+    # 异步版本：耗时的表达式在进程池中计算，超时返回 "计算超时"
+    @app.route("/api/input/async", methods=["POST"])
+    async def handle_input_async():
+        import offload
+
+        data = request.get_json()
+        if not isinstance(data, dict) or not isinstance(data.get("key"), str):
+            return jsonify({"error": "无效的输入"}), 400
+        if not _is_token_list(data.get("expression")):
+            return jsonify({"error": "无效的输入: 表达式必须是 token 列表"}), 400
+
+        key: str = data["key"]
+        expression: list[str] = data["expression"]
+        state: dict[str, Any] = data.get("state")
+        error = state_error(state)
+        if error:
+            return error
+        state = {**core.initial_state(), **(state or {})}
+
+        expression, result = await offload.apply_key_async(
+            evaluation_pool(), expression, state, key
+        )
+        count_key(key, result)
 
         return jsonify({"expression": expression, "state": state, "result": result})
 
+    # 会话模式：表达式与状态保存在服务端，请求只携带会话 id 与按键
+    @app.route("/api/session", methods=["POST"])
+    def create_session():
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({"error": "无效的输入"}), 400
+        error = state_error(data.get("state"))
+        if error:
+            return error
+        session = sessions.create(data.get("state"))
+        return jsonify(session.snapshot())
+
+    @app.route("/api/session/<session_id>", methods=["GET"])
+    def get_session(session_id):
+        session = sessions.get(session_id)
+        if session is None:
+            return jsonify({"error": "会话不存在或已过期"}), 404
+        return jsonify(session.snapshot())
+
+    @app.route("/api/session/<session_id>", methods=["DELETE"])
+    def delete_session(session_id):
+        if not sessions.remove(session_id):
+            return jsonify({"error": "会话不存在或已过期"}), 404
+        return "", 204
+
+    @app.route("/api/session/<session_id>/input", methods=["POST"])
+    def handle_session_input(session_id):
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get("key"), str):
+            return jsonify({"error": "无效的输入"}), 400
+        session = sessions.get(session_id)
+        if session is None:
+            return jsonify({"error": "会话不存在或已过期"}), 404
+        # 只返回变化的部分：result 总是返回，expression 与 state 仅在改变时返回
+        delta = session.press(data["key"])
+        count_key(data["key"], delta.get("result"))
+        with metrics.stage("encode"):
+            return jsonify(delta)
+
+    # 计算文本表达式，如 {"expression": "12+sin(30)*3!"}
+    @app.route("/api/evaluate", methods=["POST"])
+    def evaluate_text():
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get("expression"), str):
+            return jsonify({"error": "无效的输入"}), 400
+
+        state: dict[str, Any] = data.get("state")
+        error = state_error(state)
+        if error:
+            return error
+
+        try:
+            result = core.evaluate_text(data["expression"], state)
+        except Exception as e:
+            registry.count_error(str(e))
+            return jsonify({"error": str(e)}), 400
+        with metrics.stage("encode"):
+            return jsonify(result)
+
+    # 调试：表达式（文本或按键 token 列表）优化前后的节点数
+    @app.route("/api/debug/optimize", methods=["POST"])
+    def debug_optimize():
+        import optimizer
+
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"error": "无效的输入"}), 400
+        expression = data.get("expression")
+        error = state_error(data.get("state"))
+        if error:
+            return error
+        state = core.evaluation_state(data.get("state"))
+        angle_mode = state["angle_mode"]
+        backend = core.get_backend(state)
+        try:
+            if isinstance(expression, str):
+                program = core.compile_text(expression, angle_mode, backend)
+            elif isinstance(expression, list):
+                tokens = core.strip_cursor(expression)
+                program = core.compile_expression(tokens, angle_mode, backend)
+            else:
+                return jsonify({"error": "无效的输入"}), 400
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify(
+            {
+                "postfix": [token.text for token in program.postfix],
+                **optimizer.describe(program),
+            }
+        )
+
+    # 计算表：命名变量（A–F、X、Y）、用户函数（f、g、h）与公式
+    @app.route("/api/session/<session_id>/sheet", methods=["GET"])
+    def get_sheet(session_id):
+        session = sessions.get(session_id)
+        if session is None:
+            return jsonify({"error": "会话不存在或已过期"}), 404
+        return jsonify({"sheet": session.snapshot()["sheet"]})
+
+    @app.route("/api/session/<session_id>/sheet/<name>", methods=["PUT"])
+    def define_cell(session_id, name):
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get("expression"), str):
+            return jsonify({"error": "无效的输入"}), 400
+        session = sessions.get(session_id)
+        if session is None:
+            return jsonify({"error": "会话不存在或已过期"}), 404
+        try:
+            # 只返回重算过的单元格与变化的 state
+            return jsonify(session.define(name, data["expression"]))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+    @app.route("/api/session/<session_id>/sheet/<name>", methods=["DELETE"])
+    def delete_cell(session_id, name):
+        session = sessions.get(session_id)
+        if session is None:
+            return jsonify({"error": "会话不存在或已过期"}), 404
+        delta = session.undefine(name)
+        if delta is None:
+            return jsonify({"error": "单元格不存在"}), 404
+        return jsonify(delta)
+
+    # 批量计算表达式
+    @app.route("/api/evaluate/batch", methods=["POST"])
+    def evaluate_batch():
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get("expressions"), list):
+            return jsonify({"error": "无效的输入"}), 400
+
+        expressions: list = data["expressions"]
+        state: dict[str, Any] = data.get("state")
+        # 流式响应开始后无法再返回错误状态，先检查整个请求
+        error = state_error(state)
+        if error:
+            return error
+        if not all(map(_is_expression, expressions)):
+            return jsonify({"error": "无效的输入: 表达式必须是 token 列表或文本"}), 400
+
+        if data.get("stream", False):
+            # 流式返回：每行一个 JSON 结果（NDJSON），大批量时无需整体缓存
+            def generate():
+                for item in core.iter_evaluate(expressions, state):
+                    # 使用应用的 JSON 序列化，Decimal 等数值与 jsonify 的结果一致
+                    yield app.json.dumps(item, ensure_ascii=False) + "\n"
+
+            return Response(
+                stream_with_context(generate()), mimetype="application/x-ndjson"
+            )
+
+        return jsonify({"results": core.evaluate_many(expressions, state)})
+
+    # 函数制表：自适应采样，返回原始数值
+    @app.route("/api/tabulate", methods=["POST"])
+    def tabulate_expression():
+        import tabulate
+
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or "expression" not in data:
+            return jsonify({"error": "无效的输入"}), 400
+        error = state_error(data.get("state"))
+        if error:
+            return error
+
+        try:
+            xs, ys, errors = tabulate.tabulate(
+                data["expression"],
+                data.get("variable", "x"),
+                float(data["start"]),
+                float(data["stop"]),
+                int(data.get("budget", 1000)),
+                data.get("state") or {},
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify({"error": f"无效的输入: {e}"}), 400
+        except RuntimeError as e:
+            return jsonify({"error": str(e)}), 501
+
+        if data.get("format") == "binary":
+            # 小端 float64：先是全部 x，再是全部 y（NaN 表示该点出错）
+            body = xs.astype("<f8").tobytes() + ys.astype("<f8").tobytes()
+            return Response(
+                body,
+                mimetype="application/octet-stream",
+                headers={"X-Sample-Count": str(len(xs))},
+            )
+
+        return jsonify(
+            {
+                "x": xs.tolist(),
+                # NaN 与 ±inf 不是合法的 JSON
+                "y": [y if math.isfinite(y) else None for y in ys.tolist()],
+                "errors": errors,
+            }
+        )
+
     # 默认路由，返回前端的入口页面
     @app.route("/", defaults={"path": ""})
     @app.route("/<path:path>")
     def serve_frontend(path):
-        assert app.static_folder is not None
-        if path != "" and os.path.exists(os.path.join(app.static_folder, path)):
-            return send_from_directory(app.static_folder, path)
-        else:
-            # 如果路径不存在，则返回 index.html
-            return send_from_directory(app.static_folder, "index.html")
+        # 如果路径不存在，则返回 index.html
+        asset = frontend.get(path)
+        if asset is None:
+            return jsonify({"error": "前端页面不存在"}), 404
+        status, body, headers = asset.respond(
+            request.headers.get("If-None-Match"),
+            request.headers.get("Accept-Encoding"),
+        )
+        return Response(body, status=status, headers=headers)
 
     return app
 
 
+def _is_token_list(value):
+    """由字符串组成的列表（按键或 token）"""
+    return isinstance(value, list) and all(isinstance(token, str) for token in value)
+
+
+def _is_expression(item):
+    """批量计算的一项：文本，或由字符串组成的 token 列表"""
+    return isinstance(item, str) or _is_token_list(item)
+
+
+def serve_production(app, host="127.0.0.1", port=5000, workers=8):
+    """
+    使用 waitress 多线程 WSGI 服务器运行应用。
+    收到 SIGINT/SIGTERM 时停止接受新连接，并等待正在处理的请求完成后退出。
+    会话保存在进程内存中，因此使用单进程、多线程的工作池。
+    """
+    import signal
+
+    try:
+        from waitress.server import create_server
+    except ImportError:
+        print("错误: 生产模式需要安装 waitress（uv sync --extra production）")
+        sys.exit(1)
+
+    server = create_server(app, host=host, port=port, threads=workers)
+
+    def shutdown(signum, frame):
+        # waitress 捕获 SystemExit 后会关闭监听并等待工作线程结束
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    print(f"生产模式: http://{host}:{server.effective_port}（{workers} 个工作线程）")
+    server.run()
+
+
 # 启动应用
 if __name__ == "__main__":
-    os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    static_folder_path = "../frontend/out"  # 默认静态文件路径
-    production_mode = False  # 默认开发模式
+    import argparse
 
-    if len(sys.argv) > 1:
-        static_folder_path = sys.argv[1]
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
-    if len(sys.argv) > 2 and sys.argv[2].lower() == "production":
-        production_mode = True
+    parser = argparse.ArgumentParser(description="科学计算器后端服务")
+    parser.add_argument(
+        "static_folder", nargs="?", default="../frontend/out", help="静态文件路径"
+    )
+    parser.add_argument(
+        "mode",
+        nargs="?",
+        default="development",
+        type=str.lower,
+        choices=["production", "development"],
+        help="运行模式，默认为 development",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=5000, help="监听端口")
+    parser.add_argument("--workers", type=int, default=8, help="生产模式下的工作线程数")
+    args = parser.parse_args()
 
+    static_folder_path = args.static_folder
     if not os.path.isabs(static_folder_path):
         # 将相对路径转换为绝对路径
         static_folder_path = os.path.abspath(static_folder_path)
@@ -74,7 +433,7 @@ if __name__ == "__main__":
         sys.exit(1)
 
     app = create_app(static_folder_path)
-    app.run(debug=not production_mode)
-
-    print("用法: python app.py [静态文件路径] [模式]")
-    print("[模式] 可以是 'production' 或 'development'，默认为 'development'")
+    if args.mode == "production":
+        serve_production(app, args.host, args.port, args.workers)
+    else:
+        app.run(debug=True, host=args.host, port=args.port)
@@ -0,0 +1,134 @@
+import secrets
+import time
+from collections import OrderedDict
+from threading import Lock
+
+import core
+from buffer import ExpressionBuffer
+from metrics import stage
+from sheet import Sheet
+
+
+class Session:
+    """一个计算器会话：服务端保存的表达式、状态、计算表与最近一次显示结果"""
+
+    __slots__ = ("id", "buffer", "state", "sheet", "result", "last_used", "lock")
+
+    def __init__(self, session_id, state):
+        self.id = session_id
+        self.buffer = ExpressionBuffer()
+        self.state = state
+        self.sheet = Sheet()
+        self.result = ""
+        self.last_used = time.monotonic()
+        self.lock = Lock()
+
+    def press(self, key):
+        """处理一次按键，只返回发生变化的部分"""
+        with self.lock:
+            old_version = self.buffer.version
+            old_state = dict(self.state)
+            self.result = core.press_key(self.buffer, self.state, key)
+            delta = {"result": self.result}
+            if self.buffer.version != old_version:
+                delta["expression"] = self.buffer.to_wire()
+            # Ans、M 或角度模式改变时重算依赖它们的单元格
+            with stage("sheet"):
+                sheet = self.sheet.refresh(self.state)
+            if sheet:
+                delta["sheet"] = sheet
+            self._add_state_changes(delta, old_state)
+            return delta
+
+    def define(self, name, text):
+        """定义或修改计算表中的单元格，返回重算过的单元格与变化的 state"""
+        with self.lock:
+            old_state = dict(self.state)
+            delta = {"sheet": self.sheet.define(name, text, self.state)}
+            self._add_state_changes(delta, old_state)
+            return delta
+
+    def undefine(self, name):
+        """删除计算表中的单元格，单元格不存在时返回 None"""
+        with self.lock:
+            old_state = dict(self.state)
+            sheet = self.sheet.remove(name, self.state)
+            if sheet is None:
+                return None
+            delta = {"sheet": sheet}
+            self._add_state_changes(delta, old_state)
+            return delta
+
+    def _add_state_changes(self, delta, old_state):
+        changed = {
+            name: value
+            for name, value in self.state.items()
+            if name not in old_state or old_state[name] != value
+        }
+        if changed:
+            delta["state"] = changed
+
+    def snapshot(self):
+        """返回会话的完整内容"""
+        with self.lock:
+            return {
+                "session_id": self.id,
+                "expression": self.buffer.to_wire(),
+                "state": dict(self.state),
+                "result": self.result,
+                "sheet": self.sheet.results(),
+            }
+
+
+class SessionStore:
+    """内存中的会话表，按最近使用排序，淘汰空闲过久或超出数量上限的会话"""
+
+    def __init__(self, max_sessions=1000, idle_timeout=30 * 60):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = OrderedDict()
+        self._lock = Lock()
+
+    def create(self, state=None):
+        """
+        创建会话，并像前端初始化一样先按一次 AC。
+        state 中的字段覆盖初始状态，无效时抛出 ValueError（见 core.validate_state）。
+        """
+        if state is not None:
+            core.validate_state(state)
+        session = Session(
+            secrets.token_urlsafe(16), {**core.initial_state(), **(state or {})}
+        )
+        session.press("AC")
+        with self._lock:
+            self._evict(time.monotonic())
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def get(self, session_id):
+        """查找会话并刷新其最近使用时间，不存在或已过期时返回 None"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id)
+            if session is not None:
+                session.last_used = now
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def remove(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def _evict(self, now):
+        """淘汰空闲超时的会话（最久未使用的排在最前）"""
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_used <= self.idle_timeout:
+                break
+            self._sessions.popitem(last=False)
+
+    def __len__(self):
+        return len(self._sessions)
@@ -0,0 +1,255 @@
+"""
+计算表：命名变量、用户函数与公式组成的一组单元格。
+
+- 单元格名为命名变量（A–F、X、Y）时，结果写入 state["variables"]，
+  其他单元格和按键输入中的该变量都读取它
+- 单元格名为用户函数（f、g、h）时，内容是关于 x 的函数体，写入 state["functions"]
+- 其他名称的单元格是普通公式，只保存结果
+
+每个单元格只编译、优化一次（编译结果按文本、角度模式与数值后端缓存），
+并记录它引用的变量、函数、Ans 与 M。修改一个单元格后，
+只按拓扑顺序重算直接或间接依赖它的单元格。
+"""
+
+from core import format_value
+from evaluator import compile_text
+from numeric import get_backend, split_exact
+from optimizer import optimize
+from registry import named_variables, user_function_names
+
+MAX_CELLS = 1000
+MAX_NAME_LENGTH = 64
+
+# 单元格可以依赖的名称
+_REFERABLE = frozenset(named_variables + user_function_names + ("Ans", "M"))
+
+
+class Cell:
+    """一个单元格：文本、编译后的程序、引用的名称与最近一次的结果"""
+
+    __slots__ = ("text", "program", "refs", "result")
+
+    def __init__(self, text):
+        self.text = text
+        self.program = None
+        self.refs = frozenset()
+        self.result = {}
+
+
+class Sheet:
+    """
+    单元格与依赖图。dependents[name] 为直接引用 name 的单元格集合；
+    被引用的名称不必已经定义（未定义的变量为 0，未定义的函数在求值时报错）。
+    """
+
+    __slots__ = ("cells", "dependents", "_env")
+
+    def __init__(self):
+        self.cells = {}
+        self.dependents = {}
+        # 上次求值时的 (角度模式, 后端, Ans, 精确 Ans, M)
+        self._env = None
+
+    def define(self, name, text, state):
+        """定义或修改单元格，返回重算过的单元格 {名称: 结果}"""
+        if not isinstance(name, str) or not 0 < len(name) <= MAX_NAME_LENGTH:
+            raise ValueError("无效的单元格名称")
+        if not isinstance(text, str):
+            raise ValueError("单元格内容必须是文本")
+        if name not in self.cells and len(self.cells) >= MAX_CELLS:
+            raise ValueError(f"单元格数量不能超过 {MAX_CELLS}")
+
+        changed = self.refresh(state)
+        # 先编译，出错时不修改已有的单元格
+        program = compile_text(text, state.get("angle_mode", "Deg"), get_backend(state))
+        refs = self._references(program)
+        if self._reaches(refs, name):
+            raise ValueError(f"循环引用: {name}")
+
+        cell = self.cells.get(name)
+        if cell is None:
+            cell = self.cells[name] = Cell(text)
+        else:
+            self._unlink(name, cell.refs)
+            cell.text = text
+        cell.program = program
+        cell.refs = refs
+        for ref in refs:
+            self.dependents.setdefault(ref, set()).add(name)
+        if name in user_function_names:
+            _assign(state, "functions", name, text)
+
+        changed.update(self._recompute({name}, state))
+        return changed
+
+    def remove(self, name, state):
+        """删除单元格，返回重算过的单元格；被删除的变量恢复为 0"""
+        cell = self.cells.pop(name, None)
+        if cell is None:
+            return None
+        self._unlink(name, cell.refs)
+        _assign(state, "variables", name, None)
+        _assign(state, "functions", name, None)
+        changed = self.refresh(state)
+        changed.update(self._recompute({name}, state))
+        return changed
+
+    def refresh(self, state):
+        """
+        按键之后调用：角度模式或数值后端改变时重算全部单元格，
+        Ans 或 M 改变时只重算依赖它们的单元格
+        """
+        env = (
+            state.get("angle_mode", "Deg"),
+            get_backend(state).key,
+            state.get("_current_ans"),
+            state.get("_current_exact"),
+            state.get("memory", 0),
+        )
+        old, self._env = self._env, env
+        if old is None or not self.cells or old == env:
+            return {}
+        if old[:2] != env[:2]:
+            return self._recompute(self.cells, state, recompile=True)
+        names = set()
+        if old[2:4] != env[2:4]:
+            names.add("Ans")
+        if old[4] != env[4]:
+            names.add("M")
+        return self._recompute(names, state)
+
+    def results(self):
+        """全部单元格的内容与结果"""
+        return {
+            name: {"expression": cell.text, **cell.result}
+            for name, cell in self.cells.items()
+        }
+
+    @staticmethod
+    def _references(program):
+        return frozenset(
+            token.text for token in program.postfix if token.text in _REFERABLE
+        )
+
+    def _reaches(self, refs, target):
+        """从 refs 出发沿引用关系能否到达 target"""
+        stack = list(refs)
+        seen = set()
+        while stack:
+            name = stack.pop()
+            if name == target:
+                return True
+            if name in seen:
+                continue
+            seen.add(name)
+            cell = self.cells.get(name)
+            if cell is not None:
+                stack.extend(cell.refs)
+        return False
+
+    def _unlink(self, name, refs):
+        for ref in refs:
+            dependents = self.dependents.get(ref)
+            if dependents is not None:
+                dependents.discard(name)
+                if not dependents:
+                    del self.dependents[ref]
+
+    def _affected(self, names):
+        """names 中的单元格与所有直接或间接依赖 names 的单元格，按拓扑顺序排列"""
+        affected = set()
+        stack = list(names)
+        while stack:
+            name = stack.pop()
+            if name in affected:
+                continue
+            if name in self.cells:
+                affected.add(name)
+            stack.extend(self.dependents.get(name, ()))
+
+        # Kahn 算法：只统计 affected 内部的引用
+        pending = {
+            name: sum(ref in affected for ref in self.cells[name].refs)
+            for name in affected
+        }
+        ready = [name for name, count in pending.items() if not count]
+        order = []
+        while ready:
+            name = ready.pop()
+            order.append(name)
+            for dependent in self.dependents.get(name, ()):
+                if dependent in pending:
+                    pending[dependent] -= 1
+                    if not pending[dependent]:
+                        ready.append(dependent)
+        return order
+
+    def _recompute(self, names, state, recompile=False):
+        """
+        重算 names 中的单元格，以及引用了结果发生变化的单元格的单元格。
+        names 中不是单元格的名称（Ans、M、被删除的单元格）视为已经变化。
+        """
+        changed = {}
+        angle_mode = state.get("angle_mode", "Deg")
+        backend = get_backend(state)
+        forced = set(names)
+        touched = {name for name in forced if name not in self.cells}
+        for name in self._affected(forced):
+            cell = self.cells[name]
+            if name not in forced and touched.isdisjoint(cell.refs):
+                # 引用的单元格结果都没有变化
+                continue
+            if recompile:
+                cell.program = compile_text(cell.text, angle_mode, backend)
+            result = self._evaluate(name, cell, state)
+            # 函数体的修改没有结果可比较，总是通知依赖者
+            if result != cell.result or name in user_function_names:
+                touched.add(name)
+            if result != cell.result:
+                cell.result = result
+                changed[name] = result
+        return changed
+
+    def _evaluate(self, name, cell, state):
+        """计算单元格；变量单元格的值写入 state["variables"]"""
+        for ref in cell.refs:
+            ref_cell = self.cells.get(ref)
+            if ref_cell is not None and "error" in ref_cell.result:
+                result = {"error": f"引用的 {ref} 有误"}
+                break
+        else:
+            if name in user_function_names:
+                # 函数体只在调用时计算
+                return {}
+            try:
+                value = optimize(cell.program).run(state)
+                result = {
+                    "value": split_exact(value)[0],
+                    "result": format_value(value, state),
+                }
+            except Exception as e:
+                result = {"error": str(e)}
+
+        if name in named_variables:
+            if "error" in result:
+                _assign(state, "variables", name, None)
+            else:
+                plain, exact = split_exact(value)
+                # 精确的分数以 "分子/分母" 保存，其他后端读取时再转换
+                _assign(state, "variables", name, plain if exact is None else exact)
+        return result
+
+
+def _assign(state, key, name, value):
+    """
+    修改 state[key][name]，value 为 None 时删除。
+    总是替换为新的字典，会话按浅比较找出变化的 state 项
+    """
+    entries = dict(state.get(key) or {})
+    if value is None:
+        if name not in entries:
+            return
+        del entries[name]
+    else:
+        entries[name] = value
+    state[key] = entries
@@ -0,0 +1,90 @@
+"""
+函数制表：在给定区间上对含自由变量的表达式自适应采样。
+
+先均匀采样，再反复把点加密到曲线弯曲明显、跳变或定义域断开
+（如 tan 的极点）的区间中点，直到用完点数预算。
+"""
+
+import math
+
+from preprocess import preprocess_tokens, tokenize_text, tokens_to_postfix
+from vector import import_numpy, evaluate_postfix_vector
+
+MAX_BUDGET = 100_000
+
+
+def _interval_scores(np, xs, ys, min_width):
+    """计算每个区间的加密优先级"""
+    finite = np.isfinite(ys)
+    scale = np.ptp(ys[finite]) if finite.any() else 0.0
+    if not scale:
+        scale = 1.0
+
+    # 每个内点偏离相邻两点连线的程度（弯曲程度）
+    bend = np.zeros(len(xs))
+    if len(xs) > 2:
+        left, mid, right = slice(None, -2), slice(1, -1), slice(2, None)
+        t = (xs[mid] - xs[left]) / (xs[right] - xs[left])
+        linear = ys[left] + (ys[right] - ys[left]) * t
+        bend[1:-1] = np.abs(ys[mid] - linear) / scale
+
+    # 区间两端的跳变幅度
+    jump = np.abs(np.diff(ys)) / scale
+    scores = np.maximum(bend[:-1], bend[1:]) + jump
+
+    # 一端有定义、另一端无定义：存在定义域边界，优先加密
+    scores = np.where(finite[:-1] != finite[1:], np.inf, scores)
+    scores = np.where(~finite[:-1] & ~finite[1:], 0.0, scores)
+    scores = np.nan_to_num(scores, nan=0.0)
+    # 区间已足够窄时不再加密
+    return np.where(np.diff(xs) <= min_width, -1.0, scores)
+
+
+def tabulate(expression, variable, start, stop, budget, state=None):
+    """
+    在 [start, stop] 上采样表达式，最多 budget 个点。
+    返回 (xs, ys, errors)：xs、ys 为按 x 排序的 float64 数组，
+    出错的点 y 为 NaN，errors 为 {错误信息: 出错点数}。
+    """
+    np = import_numpy()
+    # NaN 与任何数比较都为假，必须先单独检查；区间长度溢出时 linspace 也无法采样
+    if not (math.isfinite(start) and math.isfinite(stop)):
+        raise ValueError("区间端点必须是有限数")
+    if not math.isfinite(stop - start):
+        raise ValueError("区间过大")
+    if not start < stop:
+        raise ValueError("区间起点必须小于终点")
+    if not 2 <= budget <= MAX_BUDGET:
+        raise ValueError(f"采样点数必须在 2 到 {MAX_BUDGET} 之间")
+
+    if isinstance(expression, str):
+        expression = tokenize_text(expression)
+    postfix = tokens_to_postfix(preprocess_tokens(expression))
+
+    def sample(x):
+        result = evaluate_postfix_vector(postfix, {variable: x}, state)
+        return result.values, result.errors
+
+    xs = np.linspace(start, stop, max(2, min(budget, max(16, budget // 4))))
+    ys, errors = sample(xs)
+    error_counts = {message: int(mask.sum()) for message, mask in errors.items()}
+    min_width = (stop - start) * 1e-9
+
+    while len(xs) < budget:
+        scores = _interval_scores(np, xs, ys, min_width)
+        candidates = np.flatnonzero(scores > 1e-6)
+        if not len(candidates):
+            break
+        # 每轮最多把点数翻倍，优先加密得分最高的区间
+        count = min(budget - len(xs), len(xs), len(candidates))
+        chosen = candidates[np.argsort(scores[candidates])[::-1][:count]]
+        new_xs = (xs[chosen] + xs[chosen + 1]) / 2
+        new_ys, new_errors = sample(new_xs)
+        for message, mask in new_errors.items():
+            error_counts[message] = error_counts.get(message, 0) + int(mask.sum())
+
+        order = np.argsort(np.concatenate([xs, new_xs]), kind="stable")
+        xs = np.concatenate([xs, new_xs])[order]
+        ys = np.concatenate([ys, new_ys])[order]
+
+    return xs, ys, error_counts
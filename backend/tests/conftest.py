@@ -0,0 +1,14 @@
+import pytest
+
+from server import create_app
+
+
+@pytest.fixture
+def app(tmp_path):
+    (tmp_path / "index.html").write_text("<!DOCTYPE html><html></html>")
+    return create_app(str(tmp_path))
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
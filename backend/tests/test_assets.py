@@ -0,0 +1,101 @@
+import gzip
+
+import pytest
+
+import assets
+from assets import AssetIndex, accepted_encodings
+
+HTML = "<!DOCTYPE html><html>" + "<p>计算器</p>" * 200 + "</html>"
+
+
+@pytest.fixture
+def index(tmp_path):
+    (tmp_path / "index.html").write_text(HTML, encoding="utf-8")
+    static = tmp_path / "_next" / "static"
+    static.mkdir(parents=True)
+    (static / "app.js").write_text("console.log(1)")
+    (tmp_path / "image.png").write_bytes(bytes(range(256)) * 2048)
+    return AssetIndex(str(tmp_path))
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, set()),
+        ("gzip, br", {"gzip", "br"}),
+        ("GZIP;q=0.5, br;q=0", {"gzip"}),
+        ("gzip;q=x, identity", {"identity"}),
+    ],
+)
+def test_accepted_encodings(header, expected):
+    assert accepted_encodings(header) == expected
+
+
+def test_unknown_paths_fall_back_to_index(index, tmp_path):
+    assert index.get("calculator/history") is index.get("index.html")
+    assert AssetIndex(str(tmp_path / "_next")).get("missing") is None
+
+
+def test_cache_control(index):
+    assert index.get("_next/static/app.js").cache_control == assets.IMMUTABLE_CACHE
+    assert index.get("index.html").cache_control == assets.REVALIDATE_CACHE
+
+
+def test_compressed_variant(index):
+    asset = index.get("index.html")
+    status, body, headers = asset.respond(accept_encoding="gzip, deflate")
+    assert status == 200
+    assert headers["Content-Encoding"] == "gzip"
+    assert headers["Content-Type"] == "text/html; charset=utf-8"
+    assert headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(body).decode() == HTML
+    assert headers["ETag"] != asset.etag
+
+    status, body, headers = asset.respond(accept_encoding="gzip;q=0")
+    assert "Content-Encoding" not in headers
+    assert body.decode() == HTML
+    assert headers["ETag"] == asset.etag
+
+
+def test_small_files_are_not_compressed(index):
+    status, body, headers = index.get("_next/static/app.js").respond(
+        accept_encoding="gzip"
+    )
+    assert body == b"console.log(1)"
+    assert "Vary" not in headers and "Content-Encoding" not in headers
+
+
+def test_not_modified_only_for_the_served_variant(index):
+    asset = index.get("index.html")
+    _, _, headers = asset.respond(accept_encoding="gzip")
+    gzip_etag = headers["ETag"]
+
+    status, body, headers = asset.respond(gzip_etag, "gzip")
+    assert (status, body) == (304, b"")
+    assert headers["Vary"] == "Accept-Encoding"
+    assert asset.respond(f"W/{gzip_etag}", "gzip")[0] == 304
+
+    # 缓存的是 gzip 版本，但本次请求不接受 gzip：必须返回原文
+    status, body, headers = asset.respond(gzip_etag)
+    assert status == 200
+    assert body.decode() == HTML
+    assert asset.respond(f'"other", {asset.etag}')[0] == 304
+    assert asset.respond("*", "gzip")[0] == 304
+
+
+def test_large_binary_files_are_streamed(index):
+    asset = index.get("image.png")
+    status, body, headers = asset.respond(accept_encoding="gzip")
+    assert not isinstance(body, bytes)
+    chunks = list(body)
+    assert len(chunks) == 8
+    assert b"".join(chunks) == bytes(range(256)) * 2048
+    assert headers["Content-Length"] == str(256 * 2048)
+    assert headers["Content-Type"] == "image/png"
+
+
+def test_route(client):
+    response = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    response = client.get("/", headers={"If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
@@ -0,0 +1,62 @@
+from buffer import ExpressionBuffer
+
+
+def test_wire_round_trip():
+    buffer = ExpressionBuffer.from_wire(["1", "+", "|", "2", "|"])
+    assert buffer.cursor == 2
+    assert buffer.tokens() == ("1", "+", "2", "|")
+    assert buffer.to_wire() == ["1", "+", "|", "2", "|"]
+    assert ExpressionBuffer.from_wire(["1"]).to_wire() == ["1", "|"]
+
+
+def test_editing_at_cursor():
+    buffer = ExpressionBuffer(["1", "2"], cursor=1)
+    buffer.insert("+")
+    assert buffer.to_wire() == ["1", "+", "|", "2"]
+    assert buffer.delete_right()
+    assert not buffer.move_right()
+    assert buffer.move_left()
+    assert buffer.delete_left() and not buffer.delete_left()
+    assert buffer.to_wire() == ["|", "+"]
+    assert not buffer.delete_left()
+    assert len(buffer) == 1
+
+
+def test_version_counts_changes():
+    buffer = ExpressionBuffer()
+    buffer.clear()
+    assert buffer.version == 0
+    buffer.insert("1")
+    buffer.move_left()
+    buffer.move_left()
+    assert buffer.version == 2
+    buffer.clear()
+    assert buffer.version == 3
+
+
+def test_edit_start_since_last_parse():
+    buffer = ExpressionBuffer(["1", "2", "3", "4"])
+    first, second, third = object(), object(), object()
+    # 第一次解析之前没有可用的编辑点
+    assert buffer.take_edit_start(object(), first) is None
+    assert buffer.take_edit_start(first, second) == 4
+    buffer.move_left()
+    buffer.move_left()
+    buffer.insert("+")
+    buffer.move_left()
+    buffer.delete_left()
+    assert buffer.tokens() == ("1", "+", "3", "4")
+    assert buffer.take_edit_start(second, third) == 1
+    # 标记不同：上次解析的不是这个缓冲区
+    assert buffer.take_edit_start(first, object()) is None
+
+
+def test_edit_start_after_clear_and_delete_right():
+    buffer = ExpressionBuffer(["1", "2"], cursor=1)
+    mark = object()
+    buffer.take_edit_start(object(), mark)
+    buffer.delete_right()
+    assert buffer.take_edit_start(mark, mark) == 1
+    buffer.clear()
+    buffer.insert("5")
+    assert buffer.take_edit_start(mark, mark) == 0
@@ -0,0 +1,77 @@
+import pytest
+
+import core
+from cache import CachedResult, LRUCache
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache and "a" in cache and "c" in cache
+    assert cache.get("b", "missing") == "missing"
+    assert cache.stats() == {
+        "size": 2,
+        "maxsize": 2,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+    }
+
+
+def test_put_existing_key_refreshes_it():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("a", 3)
+    cache.put("c", 4)
+    assert cache.get("a") == 3
+    assert "b" not in cache
+
+
+def test_clear_resets_counters():
+    cache = LRUCache()
+    cache.put("a", 1)
+    cache.get("a")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.stats()["hits"] == 0
+
+
+@pytest.mark.parametrize("maxsize", [0, -1])
+def test_maxsize_must_be_positive(maxsize):
+    with pytest.raises(ValueError, match="maxsize"):
+        LRUCache(maxsize)
+
+
+def test_cached_result_renders_each_mode_once():
+    calls = []
+
+    def formatter(value):
+        calls.append(value)
+        return str(value)
+
+    cached = CachedResult(value=0.5)
+    assert cached.render("Dec", formatter) == "0.5"
+    assert cached.render("Dec", formatter) == "0.5"
+    assert cached.render("S⇔D", lambda value: "1/2") == "1/2"
+    assert calls == [0.5]
+
+
+def test_result_cache_keys_on_referenced_values():
+    state = core.initial_state()
+    core.result_cache.clear()
+    assert core.calculate(["Ans", "+", "1"], state)[1] == 1
+    state["_current_ans"] = 2
+    # Ans 改变后不能命中旧结果
+    assert core.calculate(["Ans", "+", "1"], state)[1] == 3
+    hits = core.result_cache.hits
+    assert core.calculate(["|", "Ans", "+", "1"], state)[1] == 3
+    assert core.result_cache.hits == hits + 1
+
+
+def test_random_is_never_cached():
+    state = core.initial_state()
+    assert core.result_key(("Random",), state, core.get_backend(state)) is None
@@ -0,0 +1,87 @@
+import io
+import json
+
+import pytest
+
+import cli
+
+
+def outputs(lines, state=None):
+    return [json.loads(line) for line in cli.iter_lines(lines, state)]
+
+
+def test_iter_lines():
+    lines = [
+        '"1+2"\n',
+        "\n",
+        '["2", "^", "3"]\n',
+        '{"id": 7, "expression": "sin(30)"}\n',
+        '{"id": 8}\n',
+        "not json\n",
+        '"1/0"\n',
+        "5\n",
+    ]
+    results = outputs(lines)
+    assert results[:3] == [
+        {"value": 3.0, "result": "3"},
+        {"value": 8.0, "result": "8"},
+        {"id": 7, "value": 0.49999999999999994, "result": "0.5"},
+    ]
+    assert results[3] == {"id": 8, "error": "表达式必须是 token 列表或文本"}
+    assert results[4]["error"].startswith("无效的 JSON")
+    assert results[5:] == [
+        {"error": "除数不能为零"},
+        {"error": "表达式必须是 token 列表或文本"},
+    ]
+
+
+def test_iter_lines_uses_state():
+    lines = ['"sin(π/2)"\n', '"1/3+1/6"\n']
+    state = {"angle_mode": "Rad", "numeric_backend": "decimal", "precision": 5}
+    assert [r["result"] for r in outputs(lines, state)] == ["1", "0.5"]
+
+
+def test_decimal_values_are_written_as_strings():
+    (line,) = cli.iter_lines(['"1/4"'], {"numeric_backend": "decimal"})
+    assert json.loads(line) == {"value": "0.25", "result": "0.25"}
+
+
+def test_run_with_workers_keeps_input_order():
+    lines = [f'"{i}*2"\n' for i in range(50)]
+    output = io.StringIO()
+    cli.run(lines, output, workers=2, chunk_size=7)
+    values = [json.loads(line)["value"] for line in output.getvalue().splitlines()]
+    assert values == [i * 2.0 for i in range(50)]
+
+
+def test_main_reads_and_writes_files(tmp_path):
+    source = tmp_path / "in.ndjson"
+    source.write_text('"2^10"\n{"n": 1, "expression": "π"}\n', encoding="utf-8")
+    target = tmp_path / "out.ndjson"
+    cli.main(
+        [str(source), "-o", str(target), "--state", '{"numeric_backend": "exact"}']
+    )
+    results = [
+        json.loads(line) for line in target.read_text(encoding="utf-8").splitlines()
+    ]
+    assert results == [
+        {"value": 1024, "result": "1024"},
+        {"n": 1, "value": 3.141592653589793, "result": "3.14159265358979"},
+    ]
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    [
+        (["--state", "{"], "无效的 state"),
+        (["--state", "[]"], "state 必须是对象"),
+        (["--state", '{"numeric_backend": "quad"}'], "未知的数值后端"),
+        (["--state", '{"numeric_backend": "decimal", "precision": 0}'], "精度必须是"),
+        (["--chunk-size", "0"], "chunk-size 必须大于 0"),
+    ],
+)
+def test_main_rejects_invalid_arguments(args, message, capsys):
+    with pytest.raises(SystemExit) as exc_info:
+        cli.main(args)
+    assert exc_info.value.code == 2
+    assert message in capsys.readouterr().err
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+import core
+from buffer import ExpressionBuffer
+
+# 不含 Ran#（结果随机）与 Exit
+KEYS = (
+    list("0123456789")
+    + ["+", "-", "*", "/", "(", ")", ".", "x^2", "x^-1", "x!", "sin", "sqrt"]
+    + ["Ans", "M", "MR", "=", "M+", "M-", "MC", "DEL", "AC", "←", "→"]
+    + ["SCI", "S⇔D", "Dec", "Hex", "Deg", "Rad"]
+)
+
+
+def fold_press_key(expression, state, keys):
+    """逐个按键处理，apply_keys 的结果应与之完全相同"""
+    buffer = ExpressionBuffer.from_wire(expression)
+    for key in keys:
+        result = core.press_key(buffer, state, key)
+    return buffer.to_wire(), result
+
+
+def compare(keys, backend):
+    state = {**core.initial_state(), "numeric_backend": backend}
+    expected_state = dict(state)
+    expected = fold_press_key([], expected_state, keys)
+    assert core.apply_keys([], state, keys) == expected
+    assert state == expected_state
+
+
+@pytest.mark.parametrize("backend", ["float", "exact", "decimal"])
+@pytest.mark.parametrize(
+    "keys",
+    [
+        ["1", "/", "3", "DEL", "DEL", "+"],
+        ["1", "/", "3", "DEL", "DEL", "+", "2"],
+        ["1", "/", "3", "S⇔D", "2", "DEL", "DEL", "*"],
+        ["2", "/", "3", "=", "1", "+"],
+        ["1", "/", "0", "Hex", "M+", "("],
+        ["Ans", "M+", "3", "/", "4", "M-", "MR", "*"],
+    ],
+)
+def test_apply_keys_matches_press_key(keys, backend):
+    compare(keys, backend)
+
+
+@pytest.mark.parametrize("backend", ["float", "exact", "decimal"])
+@pytest.mark.parametrize("seed", range(20))
+def test_apply_keys_matches_press_key_random(backend, seed):
+    rng = random.Random(seed)
+    compare([rng.choice(KEYS) for _ in range(rng.randint(1, 30))], backend)
+
+
+def test_apply_keys_requires_keys():
+    with pytest.raises(ValueError, match="没有按键"):
+        core.apply_keys([], core.initial_state(), [])
@@ -0,0 +1,111 @@
+import pytest
+
+import core
+import optimizer
+from evaluator import compile_text
+from numeric import EXACT
+from optimizer import OptimizedProgram
+
+
+def run_both(text, state):
+    """原程序与优化后的程序结果相同"""
+    program = compile_text(text)
+    value = program.run(state)
+    assert optimizer.optimize(program).run(state) == value
+    return value
+
+
+def test_compile_text_is_cached_per_backend():
+    assert compile_text("1/3") is compile_text("1/3")
+    assert compile_text("1/3", backend=EXACT) is not compile_text("1/3")
+    assert str(compile_text("1/3", backend=EXACT).run({})) == "1/3"
+
+
+def test_empty_expression_is_zero():
+    assert compile_text("").run({}) == 0
+
+
+@pytest.mark.parametrize(
+    "text, state, message",
+    [
+        ("1+", {}, "缺少操作数"),
+        ("1.2.3+1", {}, "语法错误: 1.2.3"),
+        ("g(2)", {"functions": {}}, "函数 g 未定义"),
+        ("f(2)", {"functions": {"f": "f(x)"}}, "函数嵌套过深"),
+    ],
+)
+def test_run_errors(text, state, message):
+    with pytest.raises(ValueError, match=message):
+        compile_text(text).run(state)
+
+
+def test_constant_folding():
+    stats = optimizer.describe(compile_text("2*3+Ans"))
+    assert stats == {
+        "before": 5,
+        "after": 3,
+        "instructions": 2,
+        "folded": 1,
+        "shared": 0,
+        "optimized": True,
+    }
+    assert run_both("2*3+Ans", {"_current_ans": 1}) == 7
+
+
+def test_common_subexpressions_are_shared():
+    stats = optimizer.describe(compile_text("(Ans+1)^2/(Ans+1)"))
+    assert stats["shared"] == 2 and stats["after"] < stats["before"]
+    assert run_both("(Ans+1)^2/(Ans+1)", {"_current_ans": 3}) == 4
+
+
+def test_random_is_not_shared():
+    assert optimizer.describe(compile_text("Random+Random"))["shared"] == 0
+
+
+def test_folding_errors_are_raised_at_run_time():
+    program = optimizer.optimize(compile_text("1/0+Ans"))
+    assert isinstance(program, OptimizedProgram)
+    assert program.stats["folded"] == 0
+    with pytest.raises(ValueError, match="除数不能为零"):
+        program.run({"_current_ans": 1})
+
+
+def test_incomplete_expression_is_not_optimized():
+    program = compile_text("1+")
+    assert optimizer.optimize(program) is program
+    assert optimizer.describe(program)["optimized"] is False
+
+
+def test_reuse_optimizes_on_second_run():
+    program = compile_text("Ans*2+1")
+    program.optimized = None
+    assert optimizer.reuse(program) is program
+    assert isinstance(optimizer.reuse(program), OptimizedProgram)
+
+
+def test_optimized_results_match_key_presses():
+    state = core.initial_state()
+    for _ in range(3):
+        result, value = core.calculate(["Ans", "+", "1", "/", "2"], state)
+        state["_current_ans"] = value
+    assert value == 1.5
+
+
+def test_debug_optimize_endpoint(client):
+    response = client.post("/api/debug/optimize", json={"expression": "2*3+Ans"})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["postfix"] == ["2", "3", "*", "Ans", "+"]
+    assert data["folded"] == 1 and data["optimized"] is True
+
+    response = client.post(
+        "/api/debug/optimize", json={"expression": ["1", "+", "|", "2"]}
+    )
+    assert response.get_json()["postfix"] == ["1", "2", "+"]
+
+
+@pytest.mark.parametrize("body", [[], {"expression": 5}, {"expression": None}])
+def test_debug_optimize_rejects_invalid_input(client, body):
+    response = client.post("/api/debug/optimize", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "无效的输入"
@@ -0,0 +1,104 @@
+import pytest
+
+import metrics
+
+
+def test_stage_is_untimed_outside_a_request():
+    with metrics.stage("parse"):
+        pass
+    assert metrics.current() == {}
+
+
+def test_stages_accumulate_until_finish():
+    token = metrics.begin()
+    with metrics.stage("parse"):
+        pass
+    with metrics.stage("parse"):
+        pass
+    with metrics.stage("format"):
+        pass
+    assert set(metrics.current()) == {"parse", "format"}
+    timings = metrics.finish(token)
+    assert set(timings) == {"parse", "format"}
+    assert metrics.current() == {}
+
+
+def test_server_timing_header():
+    header = metrics.server_timing({"parse": 0.0012, "total": 0.5})
+    assert header == "parse;dur=1.200, total;dur=500.000"
+
+
+@pytest.mark.parametrize(
+    "message, label",
+    [
+        ("Error: 语法错误: 1..2", "语法错误"),
+        ("除数不能为零", "除数不能为零"),
+        ("Error: ", "未知错误"),
+    ],
+)
+def test_error_label(message, label):
+    assert metrics.error_label(message) == label
+
+
+def test_render():
+    registry = metrics.Metrics(window=4)
+    for seconds in (0.1, 0.2, 0.3, 0.4, 0.5):
+        registry.observe("evaluate", {"parse": seconds})
+    registry.count_key("digit")
+    registry.count_error('Error: a"b: c')
+    text = registry.render()
+    # 分位数只取最近 window 次，总数与总耗时包含全部
+    assert (
+        'calculator_stage_seconds{endpoint="evaluate",stage="parse",quantile="0.5"} 0.400000000'
+        in text
+    )
+    assert 'calculator_stage_seconds_count{endpoint="evaluate",stage="parse"} 5' in text
+    assert 'calculator_keys_total{type="digit"} 1' in text
+    assert 'calculator_errors_total{message="a\\"b"} 1' in text
+
+
+def test_error_labels_are_bounded():
+    registry = metrics.Metrics()
+    for i in range(metrics.MAX_ERROR_LABELS + 10):
+        registry.count_error(f"错误 {i}")
+    assert 'calculator_errors_total{message="其他"} 10' in registry.render()
+
+
+def server_timing_stages(response):
+    return {
+        part.split(";")[0] for part in response.headers["Server-Timing"].split(", ")
+    }
+
+
+def test_evaluate_records_stages(client):
+    response = client.post("/api/evaluate", json={"expression": "1+2"})
+    assert server_timing_stages(response) == {
+        "decode",
+        "parse",
+        "evaluate",
+        "format",
+        "encode",
+        "total",
+    }
+    text = client.get("/api/metrics").get_data(as_text=True)
+    assert 'endpoint="evaluate_text",stage="evaluate"' in text
+
+
+@pytest.mark.parametrize("propagate", [False, True])
+def test_timing_is_reset_when_a_view_raises(app, propagate):
+    @app.route("/api/fail", methods=["POST"])
+    def fail():
+        with metrics.stage("evaluate"):
+            raise RuntimeError("fail")
+
+    # 调试模式下异常直接抛出，不会执行 after_request
+    app.config["PROPAGATE_EXCEPTIONS"] = propagate
+    client = app.test_client()
+    if propagate:
+        with pytest.raises(RuntimeError):
+            client.post("/api/fail", json={})
+    else:
+        assert client.post("/api/fail", json={}).status_code == 500
+    assert metrics.current() == {}
+    text = client.get("/api/metrics").get_data(as_text=True)
+    assert 'calculator_stage_seconds_count{endpoint="fail",stage="evaluate"} 1' in text
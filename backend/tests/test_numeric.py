@@ -0,0 +1,134 @@
+import math
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+import core
+from numeric import (
+    EXACT,
+    FLOAT,
+    MAX_PRECISION,
+    decimal_backend,
+    get_backend,
+    parse_fraction,
+    split_exact,
+)
+
+BACKENDS = ["float", "exact", "decimal"]
+
+
+def evaluate(text, backend, **state):
+    return core.evaluate_text(text, {"numeric_backend": backend, **state})["result"]
+
+
+def test_get_backend():
+    assert get_backend({}) is FLOAT
+    assert get_backend({"numeric_backend": "exact"}) is EXACT
+    backend = get_backend({"numeric_backend": "decimal", "precision": 40})
+    assert backend.key == ("decimal", 40)
+    # 同一精度共用一个后端
+    assert decimal_backend(40) is backend
+
+
+@pytest.mark.parametrize(
+    "state, message",
+    [
+        ({"numeric_backend": "quad"}, "未知的数值后端"),
+        ({"numeric_backend": "decimal", "precision": 0}, "精度必须是"),
+        ({"numeric_backend": "decimal", "precision": MAX_PRECISION + 1}, "精度必须是"),
+        ({"numeric_backend": "decimal", "precision": 2.5}, "精度必须是"),
+        ({"numeric_backend": "decimal", "precision": True}, "精度必须是"),
+    ],
+)
+def test_get_backend_rejects_invalid_settings(state, message):
+    with pytest.raises(ValueError, match=message):
+        get_backend(state)
+
+
+@pytest.mark.parametrize(
+    "text, results",
+    [
+        ("0.1+0.2", ["0.3", "0.3", "0.3"]),
+        ("1/4*4", ["1", "1", "1"]),
+        (
+            "30!",
+            [
+                "2.65252859812191e+32",
+                "2.65252859812191e+32",
+                "265252859812191058636308480000000",
+            ],
+        ),
+        ("10nCr3", ["120", "120", "120"]),
+        (
+            "2^0.5",
+            [
+                "1.4142135623731",
+                "1.4142135623731",
+                "1.41421356237309504880168872420969807857",
+            ],
+        ),
+    ],
+)
+def test_backends_agree_on_displayed_results(text, results):
+    assert [evaluate(text, b, precision=40) for b in BACKENDS] == results
+
+
+def test_decimal_precision():
+    assert evaluate("1/7", "decimal", precision=5) == "0.14286"
+    assert evaluate("π", "decimal", precision=30) == "3.14159265358979323846264338328"
+    assert evaluate("sin(30)", "decimal") == "0.5"
+
+
+def test_exact_backend_keeps_fractions():
+    state = {**core.initial_state(), "numeric_backend": "exact", "use_fraction": True}
+    result, value = core.calculate(["1", "/", "3", "+", "1", "/", "6"], state)
+    assert value == Fraction(1, 2)
+    assert result == "Ans (predicted) = 1/2"
+    assert state["_predicted_exact"] == "1/2"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ("1/0", "除数不能为零"),
+        ("5 mod 0", "除数不能为零"),
+        ("sqrt(-1)", "平方根的参数不能为负数"),
+        ("ln(0)", "对数的参数必须为正数"),
+        ("(-1)!", "阶乘只能用于非负整数"),
+        ("2nCr3", "组合数的第二个参数不能大于第一个参数"),
+        ("(-8)^(1/3)", "结果不是实数"),
+        ("(2-10)^0.5", "结果不是实数"),
+    ],
+)
+def test_errors_are_the_same_on_every_backend(backend, text, message):
+    with pytest.raises(ValueError, match=message):
+        core.evaluate_text(text, {"numeric_backend": backend})
+
+
+@pytest.mark.parametrize("backend", ["float", "exact"])
+def test_power_overflow(backend):
+    with pytest.raises(ValueError, match="结果过大"):
+        core.evaluate_text("2^10000", {"numeric_backend": backend})
+
+
+def test_coerce_values_from_other_backends():
+    assert FLOAT.coerce("1/4") == 0.25
+    assert FLOAT.coerce(Decimal("0.5")) == 0.5
+    assert EXACT.coerce("1/3") == Fraction(1, 3)
+    assert decimal_backend(10).coerce(0.1) == Decimal("0.1")
+    assert decimal_backend(10).coerce("1/4") == Decimal("0.25")
+    for backend in (FLOAT, EXACT, decimal_backend(10)):
+        assert math.isinf(backend.coerce("-inf"))
+
+
+def test_split_exact():
+    assert split_exact(Fraction(1, 3)) == (1 / 3, "1/3")
+    assert split_exact(Fraction(4, 2)) == (2, None)
+    assert split_exact(0.5) == (0.5, None)
+    assert split_exact(float("nan")) == ("nan", None)
+    # 过大的整数只保留前导有效数字
+    plain, exact = split_exact(10**5000)
+    assert isinstance(plain, str) and plain.startswith("1") and exact is None
+    assert parse_fraction("-2/6") == Fraction(-1, 3)
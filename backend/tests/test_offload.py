@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+import core
+import offload
+
+
+@pytest.mark.parametrize(
+    "expression, state, expensive",
+    [
+        (["5", "!"], {}, True),
+        (["10", "nCr", "3"], {}, True),
+        (["int", "(", "2", ")", "^", "3"], {}, True),
+        (["2", "^", "3"], {}, False),
+        (["f", "(", "5", ")"], {"functions": {"f": "g(x)", "g": "x!"}}, True),
+        (["f", "(", "5", ")"], {"functions": {"f": "f(x)"}}, False),
+        (["1", "+"], {}, False),
+    ],
+)
+def test_is_expensive(expression, state, expensive):
+    assert offload.is_expensive(expression, state) is expensive
+
+
+@pytest.fixture
+def pool():
+    pool = offload.EvaluationPool(size=1, timeout=30)
+    yield pool
+    while not pool._idle.empty():
+        pool._idle.get().kill()
+
+
+def test_pool_calculates_and_updates_state(pool):
+    state = core.initial_state()
+    result, ans = pool.calculate(["5", "!"], state)
+    assert (result, ans) == ("Ans (predicted) = 120", 120)
+    assert state["_predicted_ans"] == 120
+    # 工作进程可以重复使用
+    assert pool.calculate(["3", "!"], state)[1] == 6
+    assert pool._started == 1
+
+
+def test_pool_timeout_replaces_worker(pool):
+    pool.timeout = 0
+    assert pool.calculate(["5", "!"], core.initial_state()) == (
+        offload.TIMEOUT_RESULT,
+        0,
+    )
+    assert pool._started == 0
+
+
+def test_apply_key_async_keeps_cheap_expressions_local(pool):
+    state = core.initial_state()
+    pool.timeout = 0
+    expression, result = asyncio.run(offload.apply_key_async(pool, ["1"], state, "+"))
+    assert core.strip_cursor(expression) == ("1", "+")
+    assert result != offload.TIMEOUT_RESULT
+    assert pool._started == 0
@@ -0,0 +1,134 @@
+import pytest
+
+import core
+from buffer import ExpressionBuffer
+from preprocess import (
+    IncrementalParser,
+    lex_text,
+    preprocess_tokens,
+    tokenize_text,
+    tokens_to_postfix,
+)
+
+
+def postfix(tokens):
+    return [tk.text for tk in tokens_to_postfix(preprocess_tokens(tokens))]
+
+
+def test_scientific_literal_is_one_token():
+    assert tokenize_text("1e3+2.5E-4") == ["1e3", "+", "2.5E-4"]
+    assert core.evaluate_text("3E2")["value"] == 300
+
+
+@pytest.mark.parametrize("text", ["1e3 2", "2 1e3", "3e2.5", "1 2 1e3"])
+def test_scientific_literal_is_not_merged_with_digits(text):
+    # 不能悄悄拼成 1e32、21e3 这样的另一个数
+    with pytest.raises(ValueError, match="语法错误"):
+        core.evaluate_text(text)
+
+
+def test_syntax_error_keeps_evaluation_order():
+    with pytest.raises(ValueError, match="除数不能为零"):
+        core.evaluate_text("1/0+1e3 2")
+
+
+@pytest.mark.parametrize(
+    "tokens",
+    [["1e3", "2"], ["2", "1e3"], ["1", "2", "1e3", "3", "4"], ["1e3", "(", "2", ")"]],
+)
+def test_incremental_parser_matches_preprocess(tokens):
+    assert [tk.text for tk in IncrementalParser().parse(tokens)] == postfix(tokens)
+
+
+def texts(result):
+    return [tk.text for tk in result]
+
+
+def test_incremental_parser_reuses_common_prefix():
+    parser = IncrementalParser()
+    for tokens in (
+        ["1", "+", "2", "*", "3"],
+        ["1", "+", "2"],
+        ["1", "+", "2", "(", "4"],
+        ["5", "+", "2"],
+        ["(", "1", "-", "2", ")", "!"],
+    ):
+        assert texts(parser.parse(tokens)) == postfix(tokens)
+
+
+def test_incremental_parser_ignores_cursor():
+    parser = IncrementalParser()
+    parser.parse(["1", "+", "2"])
+    assert texts(parser.parse(["1", "|", "+", "2", "3"])) == postfix(["1", "+", "23"])
+
+
+def test_incremental_parser_takes_edit_position_from_buffer():
+    parser = IncrementalParser()
+    buffer = ExpressionBuffer()
+    other = ExpressionBuffer(["7", "*", "8"])
+    edits = [
+        ("insert", "1"),
+        ("insert", "+"),
+        ("insert", "2"),
+        ("insert", "3"),
+        ("move_left",),
+        ("move_left",),
+        ("insert", "("),
+        ("other",),
+        ("delete_right",),
+        ("insert", "sin"),
+        ("move_right",),
+        ("delete_left",),
+        ("clear",),
+        ("insert", "4"),
+    ]
+    for name, *args in edits:
+        if name == "other":
+            # 期间解析了其他表达式，只能逐个比较
+            assert texts(parser.parse(other.tokens(), other)) == postfix(
+                ["7", "*", "8"]
+            )
+            continue
+        getattr(buffer, name)(*args)
+        tokens = buffer.tokens()
+        assert texts(parser.parse(tokens, buffer)) == postfix(tokens)
+
+
+def test_incremental_results_are_not_modified_by_later_parses():
+    parser = IncrementalParser()
+    first = parser.parse(["1", "2", "+", "3", "*", "4"])
+    expected = texts(first)
+    parser.parse(["1", "2", "-", "5"])
+    parser.parse(["1", "2", "-", "5", "/", "6"])
+    assert texts(first) == expected
+    assert len(first) == len(expected)
+    assert first[0].text == "12" and first[-1].text == "+"
+    assert texts(first[1:3]) == expected[1:3]
+    with pytest.raises(IndexError):
+        first[len(expected)]
+
+
+def test_keypad_scientific_literal_is_not_merged():
+    state = core.initial_state()
+    result, _ = core.calculate(["1e3", "2"], state)
+    assert result == "Error: 语法错误: 1e3 2"
+
+
+def test_adjacent_digits_are_merged():
+    assert postfix(["1", "2", ".", "5", "+", "3"]) == ["12.5", "3", "+"]
+    assert core.evaluate_text("12 34")["value"] == 1234
+
+
+def test_implicit_multiplication():
+    assert postfix(["2", "(", "3", ")"]) == ["2", "3", "*"]
+    assert postfix(["2", "sin", "3"]) == ["2", "3", "sin", "*"]
+
+
+def test_unbalanced_parentheses_are_closed():
+    assert postfix(["(", "1", "+", "2"]) == ["1", "2", "+"]
+    assert postfix(["1", "+", "2", ")", "4"]) == ["1", "2", "+", "4", "*"]
+
+
+def test_unknown_character_is_rejected():
+    with pytest.raises(ValueError, match="无法识别的字符"):
+        lex_text("1 # 2")
@@ -0,0 +1,75 @@
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from radix import MAX_FRACTION_DIGITS, format_base, int_to_digits, to_rational
+
+
+@pytest.mark.parametrize(
+    "number, base, expected",
+    [
+        (255, "Hex", "FF"),
+        (255, "Bin", "11111111"),
+        (-8, "Oct", "-10"),
+        (0.5, "Bin", "0.1"),
+        (Fraction(1, 3), 3, "0.1"),
+        (Decimal("2.25"), "Hex", "2.4"),
+        (35, 36, "Z"),
+    ],
+)
+def test_format_base(number, base, expected):
+    assert format_base(number, base) == expected
+
+
+def test_fraction_digits_are_truncated():
+    assert format_base(Fraction(1, 3), "Bin", 4) == "0.0101"
+    assert format_base(Fraction(1, 3), "Bin", 0) == "0"
+
+
+def test_large_integer_is_exact():
+    n = 3**500
+    assert int(format_base(n, "Dec"), 10) == n
+    assert int(int_to_digits(n, 7), 7) == n
+
+
+@pytest.mark.parametrize(
+    "number, word_size, expected",
+    [(-1, 8, "FF"), (255, 8, "FF"), (-2, 16, "FFFE"), (1.9, 32, "00000001")],
+)
+def test_twos_complement(number, word_size, expected):
+    assert format_base(number, "Hex", word_size=word_size) == expected
+
+
+def test_twos_complement_range():
+    with pytest.raises(ValueError, match="补码"):
+        format_base(256, "Hex", word_size=8)
+
+
+def test_tiny_negative_value_has_no_sign():
+    assert format_base(-1e-20, "Bin") == "0." + "0" * 15
+    assert format_base(-0.5, "Bin") == "-0.1"
+
+
+@pytest.mark.parametrize("base", ["Foo", 1, 37, 2.0, None])
+def test_invalid_base(base):
+    with pytest.raises(ValueError, match="进制必须是"):
+        format_base(1, base)
+
+
+@pytest.mark.parametrize("digits", ["3", 3.0, True, -1, MAX_FRACTION_DIGITS + 1])
+def test_invalid_fraction_digits(digits):
+    with pytest.raises(ValueError, match="小数位数"):
+        format_base(1, "Bin", digits)
+
+
+@pytest.mark.parametrize("word_size", ["8", 8.0, True, 0, 12])
+def test_invalid_word_size(word_size):
+    with pytest.raises(ValueError, match="字长"):
+        format_base(1, "Hex", word_size=word_size)
+
+
+@pytest.mark.parametrize("number", [float("inf"), float("nan"), Decimal("NaN")])
+def test_non_finite_values_are_rejected(number):
+    with pytest.raises(ValueError, match="无法转换进制"):
+        to_rational(number)
@@ -0,0 +1,199 @@
+import json
+
+import pytest
+
+import core
+
+
+def test_evaluate(client):
+    response = client.post("/api/evaluate", json={"expression": "12+sin(30)*3!"})
+    assert response.status_code == 200
+    assert response.get_json() == {"value": 15.0, "result": "15"}
+
+
+def test_evaluate_failure_is_400(client):
+    response = client.post("/api/evaluate", json={"expression": "1/0"})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "除数不能为零"}
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        [],
+        [1],
+        {"expression": 12},
+        {"expression": "1+2", "state": []},
+        {"expression": "1+2", "state": "Rad"},
+    ],
+)
+def test_evaluate_rejects_invalid_input(client, body):
+    response = client.post("/api/evaluate", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("无效的输入")
+
+
+@pytest.mark.parametrize("key", ["=", "Hex"])
+def test_invalid_display_settings_are_reported(client, key):
+    state = {**core.initial_state(), "number_base": "Bin", "base_fraction_digits": "3"}
+    response = client.post(
+        "/api/input", json={"key": key, "expression": ["1", "/", "3"], "state": state}
+    )
+    assert response.status_code == 200
+    assert response.get_json()["result"] == "Error: 小数位数必须在 0 到 1000 之间"
+
+
+def press(client, key, expression=(), state=None):
+    body = {"key": key, "expression": list(expression)}
+    if state is not None:
+        body["state"] = state
+    return client.post("/api/input", json=body)
+
+
+def test_input_fills_in_missing_state_fields(client):
+    response = press(client, "=", ["1", "+", "2"], {"angle_mode": "Rad"})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["result"] == "Ans = 3"
+    assert data["state"]["angle_mode"] == "Rad"
+    assert data["state"]["_current_ans"] == 3
+    assert data["state"]["showing_answer"] is True
+
+
+@pytest.mark.parametrize(
+    "state",
+    [
+        [],
+        "Deg",
+        {"numeric_backend": "bignum"},
+        {"numeric_backend": "decimal", "precision": 0},
+        {"numeric_backend": "decimal", "precision": 1001},
+        {"numeric_backend": "decimal", "precision": "50"},
+        {"angle_mode": ["Deg"]},
+        {"functions": ["x^2"]},
+    ],
+)
+@pytest.mark.parametrize("key", ["=", "M+", "M-", "Hex"])
+def test_input_rejects_invalid_state(client, state, key):
+    response = press(client, key, ["2"], state)
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("无效的输入")
+
+
+def test_input_decimal_precision(client):
+    state = {"numeric_backend": "decimal", "precision": 30}
+    data = press(client, "=", ["1", "/", "3"], state).get_json()
+    assert data["result"] == "Ans = 0." + "3" * 30
+
+
+@pytest.mark.parametrize(
+    "path, body",
+    [
+        ("/api/debug/optimize", {"expression": "1+2", "state": []}),
+        (
+            "/api/debug/optimize",
+            {
+                "expression": "1",
+                "state": {"numeric_backend": "decimal", "precision": -1},
+            },
+        ),
+        (
+            "/api/tabulate",
+            {"expression": "x", "start": 0, "stop": 1, "state": {"numeric_backend": 1}},
+        ),
+    ],
+)
+def test_state_is_validated_on_every_endpoint(client, path, body):
+    response = client.post(path, json=body)
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("无效的输入")
+
+
+def test_evaluate_batch(client):
+    body = {
+        "expressions": ["1+2", ["2", "^", "2"], "1/0"],
+        "state": {"angle_mode": "Rad"},
+    }
+    data = client.post("/api/evaluate/batch", json=body).get_json()
+    assert data["results"] == [
+        {"value": 3.0, "result": "3"},
+        {"value": 4.0, "result": "4"},
+        {"error": "除数不能为零"},
+    ]
+
+
+def test_evaluate_batch_stream(client):
+    body = {"expressions": ["1+2", "sqrt(-1)"], "stream": True}
+    response = client.post("/api/evaluate/batch", json=body)
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines == [{"value": 3.0, "result": "3"}, {"error": "平方根的参数不能为负数"}]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize(
+    "body",
+    [
+        [1],
+        {"expressions": "1+2"},
+        {"expressions": ["1"], "state": []},
+        {"expressions": ["1"], "state": {"numeric_backend": "q"}},
+        {"expressions": ["1", 5]},
+        {"expressions": [{"expression": "1"}]},
+        {"expressions": [["1", 2]]},
+    ],
+)
+def test_evaluate_batch_rejects_invalid_input(client, body, stream):
+    if isinstance(body, dict):
+        body = {**body, "stream": stream}
+    response = client.post("/api/evaluate/batch", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("无效的输入")
+
+
+def strict_json(response):
+    return json.loads(response.get_data(as_text=True), parse_constant=pytest.fail)
+
+
+def test_non_finite_results_are_valid_json(client):
+    response = client.post("/api/evaluate", json={"expression": "1e308*10-1e308*10"})
+    assert strict_json(response) == {"value": "nan", "result": "nan"}
+    response = press(client, "M+", ["1e308", "*", "10"])
+    state = strict_json(response)["state"]
+    assert state["memory"] == "inf"
+    data = strict_json(press(client, "=", ["-", "M"], state))
+    assert data["result"] == "Ans = -inf"
+    assert data["state"]["_current_ans"] == "-inf"
+
+
+def test_input_applies_several_keys(client):
+    body = {"keys": ["1", "+", "2", "="], "expression": []}
+    data = client.post("/api/input", json=body).get_json()
+    assert data["result"] == "Ans = 3"
+    assert data["expression"] == ["1", "+", "2", "|"]
+
+
+INVALID_KEY_BODIES = [
+    {"key": 5, "expression": []},
+    {"key": None, "expression": []},
+    {"key": ["1"], "expression": []},
+    {"key": "1", "expression": "12"},
+    {"key": "1", "expression": [1]},
+    {"key": "1"},
+]
+
+
+@pytest.mark.parametrize(
+    "path, body",
+    [("/api/input", body) for body in INVALID_KEY_BODIES]
+    + [("/api/input/async", body) for body in INVALID_KEY_BODIES]
+    + [
+        ("/api/input", {"keys": [1, "2"], "expression": []}),
+        ("/api/input", {"keys": "12", "expression": []}),
+        ("/api/input", {"keys": [], "expression": []}),
+    ],
+)
+def test_input_rejects_non_string_keys(client, path, body):
+    response = client.post(path, json=body)
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("无效的")
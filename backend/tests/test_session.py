@@ -0,0 +1,151 @@
+import pytest
+
+from session import SessionStore
+
+
+def test_create_applies_state_and_presses_ac():
+    session = SessionStore().create({"angle_mode": "Rad"})
+    snapshot = session.snapshot()
+    assert snapshot["state"]["angle_mode"] == "Rad"
+    assert snapshot["expression"] == ["|"]
+
+
+@pytest.mark.parametrize(
+    "state",
+    [
+        [],
+        "Deg",
+        {"numeric_backend": "x"},
+        {"numeric_backend": "decimal", "precision": 0},
+    ],
+)
+def test_create_rejects_invalid_state(state):
+    store = SessionStore()
+    with pytest.raises(ValueError):
+        store.create(state)
+    assert len(store) == 0
+
+
+def test_press_returns_only_changes():
+    session = SessionStore().create()
+    delta = session.press("1")
+    assert delta["expression"] == ["1", "|"]
+    assert set(delta["state"]) == {"_predicted_ans"}
+    # 光标移动不改变结果与状态
+    delta = session.press("←")
+    assert delta == {"result": "Ans (predicted) = 1", "expression": ["|", "1"]}
+
+
+def test_store_evicts_least_recently_used():
+    store = SessionStore(max_sessions=2)
+    first = store.create()
+    second = store.create()
+    store.get(first.id)
+    store.create()
+    assert store.get(first.id) is first
+    assert store.get(second.id) is None
+
+
+def test_store_evicts_idle_sessions():
+    store = SessionStore(idle_timeout=0)
+    session = store.create()
+    session.last_used -= 1
+    assert store.get(session.id) is None
+
+
+def test_sheet_recomputes_dependents():
+    session = SessionStore().create()
+    session.define("A", "2")
+    delta = session.define("B", "A*3")
+    assert delta["sheet"]["B"]["value"] == 6
+    delta = session.define("A", "5")
+    assert {name: cell["value"] for name, cell in delta["sheet"].items()} == {
+        "A": 5,
+        "B": 15,
+    }
+    assert session.state["variables"]["A"] == 5
+
+
+def test_sheet_user_function_is_visible_to_keys():
+    session = SessionStore().create()
+    session.define("f", "x^2+1")
+    for key in ("f", "3", ")"):
+        delta = session.press(key)
+    assert delta["result"] == "Ans (predicted) = 10"
+
+
+def test_sheet_rejects_cycles():
+    session = SessionStore().create()
+    session.define("A", "B+1")
+    with pytest.raises(ValueError, match="循环引用"):
+        session.define("B", "A+1")
+    assert "B" not in session.snapshot()["sheet"]
+
+
+def test_sheet_remove_restores_variable():
+    session = SessionStore().create()
+    session.define("A", "7")
+    session.define("C", "A+1")
+    delta = session.undefine("A")
+    assert delta["sheet"]["C"]["value"] == 1
+    assert session.undefine("A") is None
+
+
+def test_session_routes(client):
+    data = client.post("/api/session", json={"state": {"angle_mode": "Rad"}}).get_json()
+    session_id = data["session_id"]
+    assert data["state"]["angle_mode"] == "Rad"
+    delta = client.post(
+        f"/api/session/{session_id}/input", json={"key": "2"}
+    ).get_json()
+    assert delta["result"] == "Ans (predicted) = 2"
+    response = client.put(
+        f"/api/session/{session_id}/sheet/A", json={"expression": "1+1"}
+    )
+    assert response.get_json()["sheet"]["A"]["value"] == 2
+    assert (
+        client.get(f"/api/session/{session_id}/sheet").get_json()["sheet"]["A"][
+            "expression"
+        ]
+        == "1+1"
+    )
+    assert client.delete(f"/api/session/{session_id}").status_code == 204
+    assert client.get(f"/api/session/{session_id}").status_code == 404
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        [1],
+        {"state": []},
+        {"state": {"numeric_backend": "bignum"}},
+        {"state": {"numeric_backend": "decimal", "precision": 5000}},
+    ],
+)
+def test_create_session_rejects_invalid_input(client, body):
+    response = client.post("/api/session", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("无效的输入")
+
+
+@pytest.mark.parametrize("body", [{}, {"key": 5}, {"key": ["1"]}, {"key": None}, [1]])
+def test_session_input_rejects_non_string_keys(client, body):
+    session_id = client.post("/api/session", json={}).get_json()["session_id"]
+    response = client.post(f"/api/session/{session_id}/input", json=body)
+    assert response.status_code == 400
+    assert client.get(f"/api/session/{session_id}").get_json()["expression"] == ["|"]
+
+
+def test_unknown_session_is_404(client):
+    response = client.post("/api/session/nope/input", json={"key": "1"})
+    assert response.status_code == 404
+
+
+def test_define_cell_errors(client):
+    session_id = client.post("/api/session", json={}).get_json()["session_id"]
+    url = f"/api/session/{session_id}/sheet/A"
+    assert client.put(url, json={"expression": 5}).status_code == 400
+    response = client.put(url, json={"expression": "1+#"})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "无法识别的字符: #"
+    assert client.delete(url).status_code == 404
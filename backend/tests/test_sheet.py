@@ -0,0 +1,113 @@
+import pytest
+
+import core
+import sheet
+from sheet import Sheet
+
+
+@pytest.fixture
+def state():
+    return core.initial_state()
+
+
+def values(changed):
+    return {
+        name: cell.get("value", cell.get("error")) for name, cell in changed.items()
+    }
+
+
+def test_only_changed_results_are_reported(state):
+    cells = Sheet()
+    cells.define("A", "2", state)
+    cells.define("B", "A+1", state)
+    cells.define("C", "7", state)
+    # 结果不变时不通知依赖者
+    assert cells.define("A", "1+1", state) == {}
+    assert values(cells.define("A", "3", state)) == {"A": 3, "B": 4}
+    assert state["variables"] == {"A": 3, "B": 4, "C": 7}
+
+
+def test_errors_propagate_to_dependents(state):
+    cells = Sheet()
+    cells.define("A", "2", state)
+    cells.define("B", "A+1", state)
+    assert values(cells.define("A", "1/0", state)) == {
+        "A": "除数不能为零",
+        "B": "引用的 A 有误",
+    }
+    # 出错的变量不写入 state
+    assert "A" not in state["variables"]
+    assert cells.results()["B"] == {"expression": "A+1", "error": "引用的 A 有误"}
+
+
+def test_refresh_recomputes_cells_using_ans_and_memory(state):
+    cells = Sheet()
+    cells.define("A", "Ans*2", state)
+    cells.define("B", "M+1", state)
+    cells.define("C", "5", state)
+    assert cells.refresh(state) == {}
+    state["_current_ans"] = 5
+    assert values(cells.refresh(state)) == {"A": 10}
+    state["memory"] = 2
+    assert values(cells.refresh(state)) == {"B": 3}
+
+
+def test_angle_mode_change_recompiles_every_cell(state):
+    cells = Sheet()
+    cells.define("A", "sin(90)", state)
+    state["angle_mode"] = "Rad"
+    assert cells.refresh(state)["A"]["value"] == pytest.approx(0.8939966636)
+
+
+def test_function_cells(state):
+    cells = Sheet()
+    assert cells.define("f", "x+1", state) == {}
+    assert state["functions"] == {"f": "x+1"}
+    cells.define("A", "f(2)", state)
+    assert values(cells.define("f", "x*10", state)) == {"A": 20}
+    cells.remove("f", state)
+    assert "f" not in state["functions"]
+    assert "A" in cells.results()
+
+
+def test_exact_values_are_stored_as_fractions():
+    state = {**core.initial_state(), "numeric_backend": "exact"}
+    cells = Sheet()
+    cells.define("A", "1/3", state)
+    assert state["variables"]["A"] == "1/3"
+    assert cells.define("B", "A*3", state)["B"]["result"] == "1"
+
+
+def test_cycles_are_rejected_without_changes(state):
+    cells = Sheet()
+    cells.define("A", "1", state)
+    cells.define("B", "A+1", state)
+    with pytest.raises(ValueError, match="循环引用: A"):
+        cells.define("A", "B+1", state)
+    with pytest.raises(ValueError, match="循环引用: C"):
+        cells.define("C", "C+1", state)
+    assert cells.results()["A"] == {"expression": "1", "value": 1.0, "result": "1"}
+
+
+@pytest.mark.parametrize(
+    "name, text, message",
+    [
+        ("", "1", "无效的单元格名称"),
+        (5, "1", "无效的单元格名称"),
+        ("a" * (sheet.MAX_NAME_LENGTH + 1), "1", "无效的单元格名称"),
+        ("A", 5, "单元格内容必须是文本"),
+    ],
+)
+def test_define_rejects_invalid_input(state, name, text, message):
+    with pytest.raises(ValueError, match=message):
+        Sheet().define(name, text, state)
+
+
+def test_cell_limit(state, monkeypatch):
+    monkeypatch.setattr(sheet, "MAX_CELLS", 2)
+    cells = Sheet()
+    cells.define("p", "1", state)
+    cells.define("q", "2", state)
+    cells.define("q", "3", state)
+    with pytest.raises(ValueError, match="单元格数量不能超过 2"):
+        cells.define("r", "4", state)
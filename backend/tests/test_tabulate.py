@@ -0,0 +1,96 @@
+import math
+import struct
+
+import pytest
+
+from tabulate import MAX_BUDGET, tabulate
+
+np = pytest.importorskip("numpy")
+
+
+def test_samples_are_sorted_within_budget():
+    xs, ys, errors = tabulate("x^2", "x", -1, 1, 200)
+    assert 16 <= len(xs) <= 200
+    assert xs[0] == -1 and xs[-1] == 1
+    assert np.all(np.diff(xs) > 0)
+    assert np.allclose(ys, xs**2)
+    assert errors == {}
+
+
+def test_refines_around_domain_boundary():
+    xs, ys, errors = tabulate("sqrt(x)", "x", -1, 1, 100)
+    assert errors == {"平方根的参数不能为负数": int(np.isnan(ys).sum())}
+    # 定义域边界 x=0 两侧的间距应远小于初始的均匀步长 2/24
+    defined = xs[~np.isnan(ys)]
+    undefined = xs[np.isnan(ys)]
+    assert defined.min() - undefined.max() < 2 / 24 / 4
+
+
+def test_uses_state_settings():
+    xs, ys, _ = tabulate(["sin", "(", "x", ")"], "x", 0, 90, 16, {"angle_mode": "Deg"})
+    assert ys[-1] == pytest.approx(1)
+
+
+@pytest.mark.parametrize(
+    "start, stop, budget, message",
+    [
+        (1, 1, 10, "区间起点必须小于终点"),
+        (2, 1, 10, "区间起点必须小于终点"),
+        (math.nan, 1, 10, "区间端点必须是有限数"),
+        (0, math.inf, 10, "区间端点必须是有限数"),
+        (-math.inf, math.inf, 10, "区间端点必须是有限数"),
+        (-1e308, 1e308, 10, "区间过大"),
+        (0, 1, 1, "采样点数必须在"),
+        (0, 1, MAX_BUDGET + 1, "采样点数必须在"),
+    ],
+)
+def test_rejects_invalid_range(start, stop, budget, message):
+    with pytest.raises(ValueError, match=message):
+        tabulate("x", "x", start, stop, budget)
+
+
+def test_route_returns_json(client):
+    body = {"expression": "1/x", "start": -1, "stop": 1, "budget": 17}
+    data = client.post("/api/tabulate", json=body).get_json()
+    assert len(data["x"]) == len(data["y"]) <= 17
+    # x=0 处除数为零，以 null 表示
+    assert data["y"][data["x"].index(0.0)] is None
+    assert data["errors"] == {"除数不能为零": 1}
+
+
+def test_route_returns_binary(client):
+    body = {"expression": "2*x", "start": 0, "stop": 1, "budget": 16}
+    body["format"] = "binary"
+    response = client.post("/api/tabulate", json=body)
+    count = int(response.headers["X-Sample-Count"])
+    values = struct.unpack(f"<{2 * count}d", response.data)
+    xs, ys = values[:count], values[count:]
+    assert [2 * x for x in xs] == pytest.approx(ys)
+
+
+@pytest.mark.parametrize(
+    "start, stop",
+    [("nan", 1), (0, "inf"), ("-Infinity", 0), (0, "1e400"), ("a", 1)],
+)
+def test_route_rejects_non_finite_range(client, start, stop):
+    body = {"expression": "x", "start": start, "stop": stop}
+    response = client.post("/api/tabulate", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["error"].startswith("无效的输入")
+
+
+def test_route_rejects_nan_literal(client):
+    response = client.post(
+        "/api/tabulate",
+        data='{"expression": "x", "start": NaN, "stop": 1}',
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+
+
+def test_route_never_emits_non_finite_json(client):
+    body = {"expression": "10^x", "start": 300, "stop": 400, "budget": 16}
+    response = client.post("/api/tabulate", json=body)
+    data = response.get_json()
+    assert "Infinity" not in response.get_data(as_text=True)
+    assert data["y"][-1] is None
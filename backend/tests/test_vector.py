@@ -0,0 +1,36 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from vector import evaluate_vector  # noqa: E402
+
+
+def test_domain_errors_are_masked_per_element():
+    result = evaluate_vector("sqrt(x)+1/x", {"x": np.array([-1.0, 0.0, 4.0])})
+    assert np.isnan(result.values[:2]).all() and result.values[2] == 2.25
+    assert result.valid.tolist() == [False, False, True]
+    assert result.errors["平方根的参数不能为负数"].tolist() == [True, False, False]
+    assert result.errors["除数不能为零"].tolist() == [False, True, False]
+
+
+def test_factorial():
+    result = evaluate_vector("x!", {"x": [3, 2.5, 200]})
+    assert result.values[0] == 6
+    assert result.errors["阶乘只能用于非负整数"].tolist() == [False, True, False]
+    assert result.errors["结果过大"].tolist() == [False, False, True]
+
+
+def test_matches_scalar_evaluation_with_state():
+    state = {"functions": {"f": "x^2"}, "_current_ans": 2, "angle_mode": "Deg"}
+    result = evaluate_vector("f(x)*Ans+sin(90)", {"x": [1, 2]}, state)
+    assert result.values.tolist() == [3.0, 9.0]
+
+
+def test_tokens_are_accepted():
+    result = evaluate_vector(["x", "*", "2"], {"x": np.arange(3)})
+    assert result.values.tolist() == [0.0, 2.0, 4.0]
+
+
+def test_incomplete_expression_raises():
+    with pytest.raises(ValueError, match="缺少操作数"):
+        evaluate_vector("1+", {"x": [1, 2]})
@@ -0,0 +1,380 @@
+"""
+向量化求值：把一个表达式在整组变量取值上一次性算完。
+
+运算符映射到 NumPy 的 ufunc，组成一个数值后端（numeric.Backend），
+与标量求值一样由 evaluator 按 opcode 生成分派表并编译，
+命名变量、用户函数、Ans、M 与语法错误的处理和标量路径相同。
+定义域错误不再中断计算，而是按元素记录为掩码，出错元素的值为 NaN。
+NumPy 是可选依赖，只在首次使用时导入。
+"""
+
+import math
+from functools import cache
+
+from evaluator import (
+    BINARY,
+    CALL,
+    LOAD,
+    MAX_CALL_DEPTH,
+    PUSH,
+    UNARY,
+    compile_postfix,
+    compile_text,
+)
+from numeric import FLOAT, Backend
+from preprocess import preprocess_tokens, tokenize_text, tokens_to_postfix
+
+
+def import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("向量化求值需要安装 numpy")
+    return numpy
+
+
+class VectorResult:
+    """
+    向量化求值结果：
+    values 为数值数组，errors 为 {错误信息: 布尔掩码}，valid 为未出错元素的掩码
+    """
+
+    __slots__ = ("values", "errors", "valid")
+
+    def __init__(self, values, errors, valid):
+        self.values = values
+        self.errors = errors
+        self.valid = valid
+
+
+class _VectorMachine:
+    """
+    在数组上执行编译后的指令。
+    向量后端的运算以 (machine, 参数...) 调用，通过 fail 按元素记录错误。
+    """
+
+    def __init__(self, np, shape, angle_mode):
+        self.np = np
+        self.shape = shape
+        self.angle_mode = angle_mode
+        self.failed = np.zeros(shape, dtype=bool)
+        self.errors = {}
+
+    def fail(self, mask, message, values):
+        """记录 mask 中首次出错的元素，并把这些元素的值置为 NaN"""
+        np = self.np
+        new = np.broadcast_to(mask, self.shape) & ~self.failed
+        if new.any():
+            if message in self.errors:
+                self.errors[message] |= new
+            else:
+                self.errors[message] = new.copy()
+            self.failed |= new
+        return np.where(mask, np.nan, values)
+
+    def overflow(self, values, *inputs):
+        """有限输入得到无穷结果时记为溢出"""
+        np = self.np
+        mask = np.isinf(values)
+        for x in inputs:
+            mask &= np.isfinite(x)
+        return mask
+
+    def execute(self, code, state):
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        for op, arg in code:
+            if op == PUSH:
+                push(arg)
+            elif op == UNARY:
+                if not stack:
+                    raise ValueError("缺少操作数")
+                push(arg(self, pop()))
+            elif op == BINARY:
+                if len(stack) < 2:
+                    raise ValueError("缺少操作数")
+                b = pop()
+                push(arg(self, pop(), b))
+            elif op == LOAD:
+                push(arg(state))
+            elif op == CALL:
+                if not stack:
+                    raise ValueError("缺少操作数")
+                push(self._call(arg, pop(), state))
+            else:
+                raise ValueError(arg)
+
+        if not stack:
+            return self.np.float64(0)
+        if len(stack) > 1:
+            raise ValueError("操作符不足")
+        return stack[0]
+
+    def _call(self, name, argument, state):
+        """以 x = argument 在数组上执行用户函数的函数体，与 evaluator 中的调用相同"""
+        body = state.get("functions", {}).get(name)
+        if body is None:
+            raise ValueError(f"函数 {name} 未定义")
+        depth = state.get("_call_depth", 0)
+        if depth >= MAX_CALL_DEPTH:
+            raise ValueError("函数嵌套过深")
+        program = compile_text(body, self.angle_mode, vector_backend())
+        return self.execute(
+            program.code,
+            {
+                **state,
+                "variables": {**state.get("variables", {}), "x": argument},
+                "_call_depth": depth + 1,
+            },
+        )
+
+
+# 向量后端的运算：与 numeric 中 float 后端的同名运算对应，参数与结果为数组
+
+
+def _factorial(m, x):
+    np = m.np
+    bad = (x < 0) | (x != np.trunc(x))
+    table = _factorial_table(np)
+    index = np.where(bad | ~np.isfinite(x), 0, np.minimum(x, 171))
+    y = np.where(x > 170, np.inf, table[index.astype(np.int64)])
+    y = np.where(np.isnan(x), np.nan, y)
+    y = m.fail(bad, "阶乘只能用于非负整数", y)
+    return m.fail(m.overflow(y, x), "结果过大", y)
+
+
+def _sqrt(m, x):
+    np = m.np
+    bad = x < 0
+    return m.fail(bad, "平方根的参数不能为负数", np.sqrt(np.where(bad, 0, x)))
+
+
+def _logarithm(name):
+    def log(m, x):
+        np = m.np
+        bad = x <= 0
+        y = getattr(np, name)(np.where(bad, 1, x))
+        return m.fail(bad, "对数的参数必须为正数", y)
+
+    return log
+
+
+def _trig(name, degrees):
+    """三角函数，degrees 为 True 时参数以角度为单位"""
+
+    def trig(m, x):
+        if degrees:
+            x = x * math.pi / 180
+        return getattr(m.np, name)(x)
+
+    return trig
+
+
+def _inverse_trig(name, degrees):
+    """反三角函数，degrees 为 True 时结果换算为角度；arcsin、arccos 的参数须在 [-1, 1] 内"""
+
+    def inverse(m, x):
+        np = m.np
+        if name == "arctan":
+            y = np.arctan(x)
+        else:
+            bad = np.abs(x) > 1
+            y = getattr(np, name)(np.where(bad, 0, x))
+            y = m.fail(bad, "math domain error", y)
+        return y * 180 / math.pi if degrees else y
+
+    return inverse
+
+
+def _hyperbolic(name):
+    def hyperbolic(m, x):
+        y = getattr(m.np, name)(x)
+        return m.fail(m.overflow(y, x), "math range error", y)
+
+    return hyperbolic
+
+
+def _arccosh(m, x):
+    np = m.np
+    bad = x < 1
+    return m.fail(bad, "math domain error", np.arccosh(np.where(bad, 1.0, x)))
+
+
+def _arctanh(m, x):
+    np = m.np
+    bad = np.abs(x) >= 1
+    return m.fail(bad, "math domain error", np.arctanh(np.where(bad, 0.0, x)))
+
+
+def _divide(m, a, b):
+    bad = b == 0
+    return m.fail(bad, "除数不能为零", a / m.np.where(bad, 1, b))
+
+
+def _mod(m, a, b):
+    np = m.np
+    bad = b == 0
+    return m.fail(bad, "除数不能为零", np.mod(a, np.where(bad, 1, b)))
+
+
+def _power(m, a, b):
+    np = m.np
+    y = np.power(a, b)
+    zero = (a == 0) & (b < 0)
+    y = m.fail(zero, "0.0 cannot be raised to a negative power", y)
+    complex_ = np.isnan(y) & ~np.isnan(a) & ~np.isnan(b) & ~zero
+    y = m.fail(complex_, "结果不是实数", y)
+    return m.fail(m.overflow(y, a, b), "结果过大", y)
+
+
+def _combinatorics(name, choose):
+    """排列数或组合数：n <= 170 时用阶乘表，更大的 n 用 lgamma 近似"""
+
+    def combinatorics(m, a, b):
+        np = m.np
+        bad = (a < 0) | (b < 0) | (a != np.trunc(a)) | (b != np.trunc(b))
+        a = m.fail(bad, f"{name}的参数必须是非负整数", a)
+        a = m.fail(b > a, f"{name}的第二个参数不能大于第一个参数", a)
+        n = np.where(np.isfinite(a), a, 0)
+        r = np.where(np.isfinite(b) & (b <= n), b, 0)
+        table = _factorial_table(np)
+        small = np.minimum(n, 170).astype(np.int64)
+        k = np.minimum(r, small).astype(np.int64)
+        y = table[small] / table[small - k]
+        if choose:
+            y /= table[k]
+        large = n > 170
+        if large.any():
+            lgamma = np.vectorize(math.lgamma, otypes=[float])
+            log_y = lgamma(n + 1) - lgamma(n - r + 1)
+            if choose:
+                log_y -= lgamma(r + 1)
+            y = np.where(large, np.exp(log_y), y)
+        y = np.round(y)
+        y = np.where(np.isnan(a) | np.isnan(b), np.nan, y)
+        return m.fail(m.overflow(y, a, b), "结果过大", y)
+
+    return combinatorics
+
+
+def _trig_table(degrees):
+    return {
+        name: (_inverse_trig if name.startswith("arc") else _trig)(name, degrees)
+        for name in ("sin", "cos", "tan", "arcsin", "arccos", "arctan")
+    }
+
+
+@cache
+def vector_backend():
+    """NumPy 数组上的数值后端，第一次使用时创建"""
+    np = import_numpy()
+
+    def coerce(value):
+        # 绑定的变量已经是数组；Ans、内存等外部值按 float 后端的规则转换
+        if isinstance(value, np.ndarray):
+            return value
+        return np.float64(FLOAT.coerce(value))
+
+    def parse(token):
+        return np.float64(float(token))
+
+    common = {
+        "!": _factorial,
+        "%": lambda m, x: x / 100,
+        "abs": lambda m, x: m.np.abs(x),
+        "int": lambda m, x: m.np.trunc(x),
+        "sqrt": _sqrt,
+        "cbrt": lambda m, x: m.np.cbrt(x),
+        "log": _logarithm("log10"),
+        "ln": _logarithm("log"),
+        "(+)": lambda m, x: x,
+        "(-)": lambda m, x: -x,
+    }
+    trig = {
+        "Deg": _trig_table(True),
+        "Rad": _trig_table(False),
+        "Hyp": {
+            "sin": _hyperbolic("sinh"),
+            "cos": _hyperbolic("cosh"),
+            "tan": _hyperbolic("tanh"),
+            "arcsin": lambda m, x: m.np.arcsinh(x),
+            "arccos": _arccosh,
+            "arctan": _arctanh,
+        },
+    }
+    return Backend(
+        name="vector",
+        digits=None,
+        context=None,
+        parse=parse,
+        coerce=coerce,
+        constants={"π": np.float64(math.pi), "e": np.float64(math.e)},
+        unary_ops={mode: {**common, **ops} for mode, ops in trig.items()},
+        binary_ops={
+            "+": lambda m, a, b: a + b,
+            "-": lambda m, a, b: a - b,
+            "*": lambda m, a, b: a * b,
+            "/": _divide,
+            "mod": _mod,
+            "^": _power,
+            "nPr": _combinatorics("排列数", False),
+            "nCr": _combinatorics("组合数", True),
+        },
+        loaders={
+            # 随机数按元素生成，形状由 evaluate_postfix_vector 写入 state
+            "Random": lambda state: np.random.random(state["_shape"]),
+            "Ans": lambda state: coerce(state["_current_ans"]),
+            "M": lambda state: coerce(state.get("memory", 0)),
+        },
+    )
+
+
+_factorial_cache = []
+
+
+def _factorial_table(np):
+    """0! 到 170! 的浮点表，最后一项为 inf（171! 超出 float 范围）"""
+    if not _factorial_cache:
+        table = [float(math.factorial(n)) for n in range(171)] + [math.inf]
+        _factorial_cache.append(np.array(table))
+    return _factorial_cache[0]
+
+
+def evaluate_vector(expression, variables, state=None):
+    """
+    在数组上计算表达式。
+    expression 为 token 列表或文本；variables 把变量名（如 "x"、"Ans"）
+    绑定到可广播的数组。返回 VectorResult。
+    """
+    if isinstance(expression, str):
+        expression = tokenize_text(expression)
+    postfix = tokens_to_postfix(preprocess_tokens(expression))
+    return evaluate_postfix_vector(postfix, variables, state)
+
+
+def evaluate_postfix_vector(postfix, variables, state=None):
+    """在数组上计算已解析的后缀表达式，便于同一表达式多次求值"""
+    np = import_numpy()
+    state = {"_current_ans": 0, "memory": 0, "angle_mode": "Deg", **(state or {})}
+    variables = {
+        name: np.asarray(value, dtype=float) for name, value in variables.items()
+    }
+    shape = np.broadcast_shapes(*(v.shape for v in variables.values()))
+    program = compile_postfix(postfix, state["angle_mode"], vector_backend())
+    # 绑定的变量优先于同名 token 原有的含义
+    code = [
+        (PUSH, variables[token.text]) if token.text in variables else instruction
+        for token, instruction in zip(program.postfix, program.code)
+    ]
+    state = {
+        **state,
+        "variables": {**state.get("variables", {}), **variables},
+        "_shape": shape,
+    }
+    machine = _VectorMachine(np, shape, state["angle_mode"])
+    with np.errstate(all="ignore"):
+        result = machine.execute(code, state)
+    values = np.array(np.broadcast_to(result, shape), dtype=float)
+    values[machine.failed] = np.nan
+    return VectorResult(values, machine.errors, ~machine.failed)
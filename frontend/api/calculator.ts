@@ -1,4 +1,10 @@
-import { CalculatorResponse } from "@/types";
+import {
+  CalculatorDelta,
+  CalculatorResponse,
+  CalculatorSession,
+  CalculatorState,
+  SheetDelta,
+} from "@/types";
 
 const API_BASE_URL = "";
 
@@ -25,3 +31,114 @@ export const sendInput = async (
 
   return response.json();
 };
+
+// 一次请求依次处理多个按键（粘贴、宏），结果与逐个发送相同
+export const sendInputs = async (
+  keys: string[],
+  expression: string[],
+  state: Record<string, any> = {}
+): Promise<CalculatorResponse> => {
+  const response = await fetch(`${API_BASE_URL}/api/input`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({
+      keys,
+      expression,
+      state,
+    }),
+  });
+
+  if (!response.ok) {
+    throw new Error("计算失败");
+  }
+
+  return response.json();
+};
+
+// 会话模式：表达式与状态保存在后端，每次按键只发送会话 id 与按键
+export const createSession = async (
+  state: Partial<CalculatorState> = {}
+): Promise<CalculatorSession> => {
+  const response = await fetch(`${API_BASE_URL}/api/session`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify({ state }),
+  });
+
+  if (!response.ok) {
+    throw new Error("创建会话失败");
+  }
+
+  return response.json();
+};
+
+export const sendSessionInput = async (
+  sessionId: string,
+  key: string
+): Promise<CalculatorDelta> => {
+  const response = await fetch(
+    `${API_BASE_URL}/api/session/${encodeURIComponent(sessionId)}/input`,
+    {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ key }),
+    }
+  );
+
+  if (!response.ok) {
+    throw new Error("计算失败");
+  }
+
+  return response.json();
+};
+
+// 计算表：定义或修改单元格，name 为命名变量、用户函数或任意公式名
+export const defineSheetCell = async (
+  sessionId: string,
+  name: string,
+  expression: string
+): Promise<SheetDelta> => {
+  const response = await fetch(
+    `${API_BASE_URL}/api/session/${encodeURIComponent(
+      sessionId
+    )}/sheet/${encodeURIComponent(name)}`,
+    {
+      method: "PUT",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ expression }),
+    }
+  );
+
+  const data = await response.json();
+  if (!response.ok) {
+    throw new Error(data.error ?? "定义失败");
+  }
+
+  return data;
+};
+
+export const removeSheetCell = async (
+  sessionId: string,
+  name: string
+): Promise<SheetDelta> => {
+  const response = await fetch(
+    `${API_BASE_URL}/api/session/${encodeURIComponent(
+      sessionId
+    )}/sheet/${encodeURIComponent(name)}`,
+    { method: "DELETE" }
+  );
+
+  if (!response.ok) {
+    throw new Error("删除失败");
+  }
+
+  return response.json();
+};
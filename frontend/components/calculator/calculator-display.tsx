@@ -5,6 +5,9 @@ import { VariableDisplay } from "./variable-display";
 import { CalculatorState } from "@/types";
 import { useEffect, useRef } from "react";
 
+// 命名变量，取值来自计算表
+const NAMED_VARIABLES = ["A", "B", "C", "D", "E", "F", "X", "Y"];
+
 interface CalculatorDisplayProps {
   currentValue: string[];
   previousValue: string;
@@ -83,6 +86,15 @@ export default function CalculatorDisplay({
             isAnswerState={state.showing_answer}
           />
         );
+      } else if (NAMED_VARIABLES.includes(tk)) {
+        return (
+          <VariableDisplay
+            key={`tk-${idx}`}
+            name={tk}
+            value={(state.variables?.[tk] ?? 0).toString()}
+            isAnswerState={state.showing_answer}
+          />
+        );
       } else if (tk === "nPr") {
         return (
           <span key={`tk-${idx}`} className="font-black">
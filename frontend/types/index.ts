@@ -14,16 +14,45 @@ export interface CalculatorResponse {
   state: CalculatorState;
 }
 
+// decimal 后端下数值以字符串传输，保留全部有效数字
+export type CalculatorNumber = number | string;
+
 export interface CalculatorState {
   showing_answer: boolean;
-  ans: number;
-  _current_ans: number;
-  _predicted_ans: number;
+  ans: CalculatorNumber;
+  _current_ans: CalculatorNumber;
+  _predicted_ans: CalculatorNumber;
   use_scientific: boolean;
   use_fraction: boolean;
-  memory: number;
+  memory: CalculatorNumber;
   number_base: "Dec" | "Bin" | "Oct" | "Hex";
+  // 进制显示的小数位数，缺省为 15
+  base_fraction_digits?: number;
+  // 以定长补码显示的位宽，缺省按带符号数显示
+  word_size?: 8 | 16 | 32 | 64 | null;
   angle_mode: "Deg" | "Rad" | "Hyp";
+  // 数值后端，缺省为 float
+  numeric_backend?: "float" | "decimal" | "exact";
+  // decimal 后端的有效数字位数，缺省为 50
+  precision?: number;
+  // exact 后端下结果为分数时的精确值，形如 "分子/分母"
+  _predicted_exact?: string | null;
+  _current_exact?: string | null;
+  // 命名变量（A–F、X、Y）的值，由计算表中的同名单元格写入
+  variables?: Record<string, CalculatorNumber>;
+  // 用户函数（f、g、h）的函数体，为关于 x 的文本表达式
+  functions?: Record<string, string>;
+}
+
+// 计算表中一个单元格的结果：成功时有 value 与 result，否则有 error
+export interface SheetCellResult {
+  value?: CalculatorNumber;
+  result?: string;
+  error?: string;
+}
+
+export interface SheetCell extends SheetCellResult {
+  expression: string;
 }
 
 export interface CalculatorResponse {
@@ -31,3 +60,23 @@ export interface CalculatorResponse {
   result: string;
   state: CalculatorState;
 }
+
+export interface CalculatorSession extends CalculatorResponse {
+  session_id: string;
+  sheet: Record<string, SheetCell>;
+}
+
+// 会话模式下的按键响应：expression 与 state 只在发生变化时返回
+export interface CalculatorDelta {
+  result: string;
+  expression?: string[];
+  state?: Partial<CalculatorState>;
+  // 因 Ans、M 或角度模式改变而重算过的单元格
+  sheet?: Record<string, SheetCellResult>;
+}
+
+// 修改计算表的响应：只包含重算过的单元格与变化的 state
+export interface SheetDelta {
+  sheet: Record<string, SheetCellResult>;
+  state?: Partial<CalculatorState>;
+}